@@ -0,0 +1,118 @@
+"""
+HTML 表格解析效能比較
+
+以 twse_html_data_20251023.json 的表頭與資料組出約 1000 列的 T86 HTML 表格
+（格式與 response=html 相同），比較：
+- bs4：原本的 BeautifulSoup(html.parser) + find_all / get_text
+- stream：html_table 的串流解析（僅標準函式庫）
+- lxml：html_table 的 lxml 解析（需安裝 lxml）
+
+每個方法的結果都會和 bs4 比對，確認輸出完全相同。
+
+執行方式：python bench_html_table.py --rows 1000 --repeat 5
+"""
+import argparse
+import html
+import json
+import os
+import time
+
+from html_table import extract_table
+
+SAMPLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "twse_html_data_20251023.json")
+
+
+def build_html(rows):
+    """以範例資料重複組出 rows 列的 HTML 表格"""
+    with open(SAMPLE_FILE, "r", encoding="utf-8") as f:
+        sample = json.load(f)
+    title, fields = sample["params"]["headers"]
+    base = sample["data"]
+
+    lines = [
+        '<html><head><meta charset="UTF-8"></head><body><main>',
+        '<table class="table-striped">',
+        "  <thead>",
+        f'    <tr><th colspan="{len(fields)}"><div>{html.escape(title[0])}</div></th></tr>',
+        "    <tr>" + "".join(f"<th>{html.escape(f)}</th>" for f in fields) + "</tr>",
+        "  </thead>",
+        "  <tbody>",
+    ]
+    for i in range(rows):
+        row = list(base[i % len(base)])
+        row[0] = f"{row[0]}-{i}"
+        lines.append("    <tr>" + "".join(f"<td>\n      {html.escape(v)}\n    </td>" for v in row) + "</tr>")
+    lines += ["  </tbody>", "</table>", "</main></body></html>"]
+    return "\n".join(lines)
+
+
+def extract_bs4(text):
+    """原本爬蟲的解析方式"""
+    from bs4 import BeautifulSoup
+
+    table = BeautifulSoup(text, "html.parser").find("table")
+    if not table:
+        return None
+    headers_data, data_rows = [], []
+    thead = table.find("thead")
+    if thead:
+        for row in thead.find_all("tr"):
+            row_data = [th.get_text(strip=True) for th in row.find_all(["th", "td"])]
+            if row_data:
+                headers_data.append(row_data)
+    tbody = table.find("tbody")
+    if tbody:
+        for row in tbody.find_all("tr"):
+            row_data = [td.get_text(strip=True) for td in row.find_all("td")]
+            if row_data:
+                data_rows.append(row_data)
+    return headers_data, data_rows
+
+
+def best_of(fn, text, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(text)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比較 HTML 表格解析方式")
+    parser.add_argument("--rows", type=int, default=1000, help="表格資料列數")
+    parser.add_argument("--repeat", type=int, default=5, help="每個方法執行次數（取最快一次）")
+    args = parser.parse_args()
+
+    text = build_html(args.rows)
+    print(f"HTML 大小: {len(text.encode('utf-8')):,} bytes，資料列數: {args.rows}")
+
+    methods = []
+    try:
+        import bs4  # noqa: F401
+        methods.append(("bs4", extract_bs4))
+    except ImportError:
+        print("未安裝 beautifulsoup4，略過 bs4 比較")
+    methods.append(("stream", lambda t: extract_table(t, backend="stream")))
+    try:
+        import lxml  # noqa: F401
+        methods.append(("lxml", lambda t: extract_table(t, backend="lxml")))
+    except ImportError:
+        print("未安裝 lxml，略過 lxml 比較")
+
+    baseline_time, baseline_result = None, None
+    for name, fn in methods:
+        seconds, result = best_of(fn, text, args.repeat)
+        if baseline_result is None:
+            baseline_time, baseline_result = seconds, result
+        elif result != baseline_result:
+            raise SystemExit(f"✗ {name} 的解析結果與 {methods[0][0]} 不同")
+        speedup = baseline_time / seconds if seconds else float("inf")
+        print(f"{name:>8}: {seconds * 1000:9.2f} ms  ({args.rows / seconds:,.0f} 列/秒, {speedup:.1f}x)")
+
+    print("✓ 所有方法的解析結果一致")
+
+
+if __name__ == "__main__":
+    main()
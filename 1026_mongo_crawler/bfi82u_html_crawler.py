@@ -1,10 +1,11 @@
 import requests
-from bs4 import BeautifulSoup
 import json
 import urllib3
 from pymongo import MongoClient
 from datetime import datetime
 
+from html_table import extract_table
+
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -39,48 +40,15 @@ def fetch_bfi82u_html_data(date_str):
         response = requests.get(url, params=params, headers=headers, verify=False)
         response.raise_for_status()
 
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # 尋找表格
-        table = soup.find('table')
+        # 解析第一個表格（有 lxml 時使用 lxml，否則使用串流解析）
+        table = extract_table(response.text)
 
         if not table:
             print("未找到表格數據")
             return None
 
-        # 抓取<thead>中的所有<tr>
-        print("正在抓取表頭...")
-        thead = table.find('thead')
-        headers_data = []
-
-        if thead:
-            thead_rows = thead.find_all('tr')
-            for row in thead_rows:
-                row_data = []
-                # 找所有th標籤
-                ths = row.find_all(['th', 'td'])
-                for th in ths:
-                    row_data.append(th.get_text(strip=True))
-                if row_data:
-                    headers_data.append(row_data)
-
-            print(f"找到 {len(headers_data)} 列表頭")
-
-        # 抓取<tbody>中的所有<tr>內所有<td>的資料
-        print("正在抓取表格資料...")
-        tbody = table.find('tbody')
-        data_rows = []
-
-        if tbody:
-            tbody_rows = tbody.find_all('tr')
-            for row in tbody_rows:
-                row_data = []
-                tds = row.find_all('td')
-                for td in tds:
-                    row_data.append(td.get_text(strip=True))
-                if row_data:
-                    data_rows.append(row_data)
+        headers_data, data_rows = table
+        print(f"找到 {len(headers_data)} 列表頭")
 
         print(f"總共抓取到 {len(data_rows)} 筆資料")
 
@@ -8,6 +8,16 @@ from pymongo import MongoClient
 import time
 from bfi82u_html_crawler import fetch_bfi82u_html_data, save_to_mongo
 
+_client = None
+
+
+def get_records_collection():
+    """查詢範例共用同一個 MongoClient（連線池），不再每次查詢都重新連線"""
+    global _client
+    if _client is None:
+        _client = MongoClient('mongodb://localhost:27017/')
+    return _client['twse_db']['bfi82u_records']
+
 
 def example_single_date():
     """範例一：抓取單一日期並儲存到MongoDB"""
@@ -52,9 +62,7 @@ def example_query_mongo():
     print("範例三：查詢MongoDB中的資料")
     print("=" * 80)
 
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['twse_db']
-    collection = db['bfi82u_records']
+    collection = get_records_collection()
 
     # 查詢特定日期的所有資料
     date = '20241223'
@@ -77,8 +85,6 @@ def example_query_mongo():
         print(f"  賣出金額: {foreign_record['賣出金額']}")
         print(f"  買賣差額: {foreign_record['買賣差額']}")
 
-    client.close()
-
 
 def example_aggregate_analysis():
     """範例四：使用MongoDB聚合分析"""
@@ -86,9 +92,7 @@ def example_aggregate_analysis():
     print("範例四：MongoDB聚合分析 - 查看資料庫統計")
     print("=" * 80)
 
-    client = MongoClient('mongodb://localhost:27017/')
-    db = client['twse_db']
-    collection = db['bfi82u_records']
+    collection = get_records_collection()
 
     # 統計總資料筆數
     total_count = collection.count_documents({})
@@ -108,8 +112,6 @@ def example_aggregate_analysis():
         print(f"\n最新資料日期: {latest_record['query_date']}")
         print(f"插入時間: {latest_record['inserted_at']}")
 
-    client.close()
-
 
 def example_custom_mongo_config():
     """範例五：使用自訂MongoDB配置"""
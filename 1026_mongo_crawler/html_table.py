@@ -0,0 +1,232 @@
+"""
+共用的 HTML 表格擷取（TWSE rwd 端點 response=html 的回應）
+
+取出第一個 <table> 的表頭與資料，結果與原本 BeautifulSoup 版本相同：
+- headers：<thead> 內每個 <tr> 的 <th>/<td> 文字
+- data：<tbody> 內每個 <tr> 的 <td> 文字
+- 文字等同 get_text(strip=True)：每段文字去除空白後直接相接
+- 沒有任何儲存格的列會略過
+
+有安裝 lxml 時使用 lxml（C 實作）；否則使用標準函式庫 HTMLParser 逐一讀取 token，
+只保留 thead/tbody 內儲存格的文字，不建立整份文件的樹狀結構。
+串流解析假設 TWSE 的表格格式：thead / tbody 有正確結束，表格內沒有巢狀表格。
+
+iter_table() 逐段餵入 HTML（例如 response.iter_content），每解析完一列就產生該列，
+不保留整份表格，供 NDJSON 串流輸出使用。
+"""
+
+from html.parser import HTMLParser
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # lxml 為選用套件
+    lxml = None
+
+
+def _join_text(pieces):
+    """get_text(strip=True)：每段文字 strip 後相接，略過空白段落"""
+    return "".join(p for p in (s.strip() for s in pieces) if p)
+
+
+class _TableParser(HTMLParser):
+    """只處理第一個 <table> 的 thead/tbody 儲存格"""
+
+    def __init__(self, on_row=None):
+        super().__init__(convert_charrefs=True)
+        self.on_row = on_row     # 指定時每列交給 on_row(kind, cells)，不累積在 headers / data
+        self.headers = []
+        self.data = []
+        self.found = False
+        self._depth = 0          # 目前所在的 table 巢狀層數（第一個 table 為 1）
+        self._done = False
+        self._section = None     # "thead" / "tbody"
+        self._seen = set()       # 與 table.find() 相同，只取第一個 thead / tbody
+        self._row = None
+        self._cell = None        # 目前儲存格已完成的文字段落
+        self._text = []          # 目前文字節點（兩個標籤之間）的內容
+
+    def _flush_text(self):
+        if self._cell is not None and self._text:
+            self._cell.append("".join(self._text))
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if self._done:
+            return
+        self._flush_text()
+        if tag == "table":
+            self._depth += 1
+            self.found = True
+            return
+        if self._depth != 1:
+            return
+        if tag in ("thead", "tbody") and self._section is None and tag not in self._seen:
+            self._section = tag
+            self._seen.add(tag)
+        elif tag == "tr" and self._section:
+            self._end_row()
+            self._row = []
+        elif self._row is not None and (tag == "td" or (tag == "th" and self._section == "thead")):
+            self._end_cell()
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if self._done:
+            return
+        self._flush_text()
+        if tag == "table":
+            if self._depth == 1:
+                self._end_row()
+                self._done = True
+            self._depth = max(0, self._depth - 1)
+            return
+        if self._depth != 1:
+            return
+        if tag in ("td", "th"):
+            self._end_cell()
+        elif tag == "tr":
+            self._end_row()
+        elif tag == self._section:
+            self._end_row()
+            self._section = None
+
+    def handle_data(self, data):
+        if self._cell is not None and not self._done:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def _end_cell(self):
+        self._flush_text()
+        if self._cell is not None and self._row is not None:
+            self._row.append(_join_text(self._cell))
+        self._cell = None
+
+    def _end_row(self):
+        self._end_cell()
+        if self._row:
+            kind = "header" if self._section == "thead" else "data"
+            if self.on_row is not None:
+                self.on_row(kind, self._row)
+            else:
+                (self.headers if kind == "header" else self.data).append(self._row)
+        self._row = None
+
+
+def _extract_stream(html):
+    parser = _TableParser()
+    parser.feed(html)
+    parser.close()
+    if not parser.found:
+        return None
+    return parser.headers, parser.data
+
+
+def _cell_text(cell):
+    return _join_text(cell.itertext())
+
+
+def _extract_lxml(html):
+    root = lxml.html.fromstring(html)
+    table = next(root.iter("table"), None)
+    if table is None:
+        return None
+    headers, data = [], []
+    thead = next(table.iter("thead"), None)
+    if thead is not None:
+        for tr in thead.iter("tr"):
+            row = [_cell_text(c) for c in tr.iter("th", "td")]
+            if row:
+                headers.append(row)
+    tbody = next(table.iter("tbody"), None)
+    if tbody is not None:
+        for tr in tbody.iter("tr"):
+            row = [_cell_text(c) for c in tr.iter("td")]
+            if row:
+                data.append(row)
+    return headers, data
+
+
+def _iter_stream(chunks):
+    pending = []
+    parser = _TableParser(on_row=lambda kind, cells: pending.append((kind, cells)))
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from pending
+        pending.clear()
+    parser.close()
+    yield from pending
+
+
+def _iter_lxml(chunks):
+    parser = lxml.etree.HTMLPullParser(events=("start", "end"), tag=("table", "tr"))
+    state = {"table": None, "done": False, "sections": {}}
+
+    def drain():
+        for event, el in parser.read_events():
+            if state["done"]:
+                continue
+            if el.tag == "table":
+                if event == "start" and state["table"] is None:
+                    state["table"] = el
+                elif event == "end" and el is state["table"]:
+                    state["done"] = True
+                continue
+            if event != "end" or state["table"] is None:
+                continue
+            section = el.getparent()
+            if section is None or section.tag not in ("thead", "tbody"):
+                continue
+            if state["sections"].setdefault(section.tag, section) is not section:
+                continue   # 只取第一個 thead / tbody
+            if next(el.iterancestors("table"), None) is not state["table"]:
+                continue   # 巢狀表格的列
+            if section.tag == "thead":
+                row = [_cell_text(c) for c in el.iter("th", "td")]
+            else:
+                row = [_cell_text(c) for c in el.iter("td")]
+            # 已輸出的列不再保留在樹中
+            el.clear(keep_tail=True)
+            while el.getprevious() is not None:
+                del section[0]
+            if row:
+                yield ("header" if section.tag == "thead" else "data"), row
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+
+
+def iter_table(chunks, backend="auto"):
+    """
+    逐段解析第一個表格，依序產生 ("header", cells) / ("data", cells)。
+
+    chunks: HTML 文字片段（例如 response.iter_content(decode_unicode=True)），或整份 HTML 字串的 list
+    backend: 與 extract_table() 相同；找不到表格時不產生任何列
+    """
+    if backend == "auto":
+        backend = "lxml" if lxml is not None else "stream"
+    if backend == "lxml":
+        if lxml is None:
+            raise ImportError("需要安裝 lxml：pip install lxml")
+        return _iter_lxml(chunks)
+    return _iter_stream(chunks)
+
+
+def extract_table(html, backend="auto"):
+    """
+    擷取第一個表格的 (headers, data)；找不到表格時回傳 None。
+
+    backend: "auto"（有 lxml 就用 lxml）、"lxml" 或 "stream"
+    """
+    if backend == "auto":
+        backend = "lxml" if lxml is not None else "stream"
+    if backend == "lxml":
+        if lxml is None:
+            raise ImportError("需要安裝 lxml：pip install lxml")
+        return _extract_lxml(html)
+    return _extract_stream(html)
@@ -0,0 +1,78 @@
+"""
+表格列的 NDJSON 串流輸出（可選 gzip 壓縮）
+
+每筆資料寫成一行精簡 JSON（不縮排），以最後一列表頭為欄位名稱並加上 query_date：
+
+    {"query_date":"20251023","證券代號":"0050","證券名稱":"元大台灣50",...}
+
+搭配 html_table.iter_table() 邊解析邊寫入，不在記憶體保留整份表格；
+預設不在終端機逐筆顯示。檔名以 .gz 結尾時以 gzip 壓縮。
+"""
+import contextlib
+import gzip
+import json
+import os
+
+_encode = json.JSONEncoder(ensure_ascii=False, separators=(",", ":")).encode
+
+
+def ndjson_path(prefix, compress=False):
+    """例如 ndjson_path("twse_html_data_20251023", True) -> twse_html_data_20251023.ndjson.gz"""
+    return f"{prefix}.ndjson.gz" if compress else f"{prefix}.ndjson"
+
+
+def open_ndjson(path, compress=None):
+    """compress 未指定時依副檔名（.gz）決定"""
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+    return open(path, "w", encoding="utf-8")
+
+
+def write_table_ndjson(rows, path, query_date, echo=False):
+    """
+    將 iter_table() 產生的列寫成 NDJSON
+
+    先寫入 path + ".tmp"，完成後才改名，中途失敗不會留下不完整的檔案；
+    沒有任何資料列時不建立檔案。
+
+    Args:
+        rows: ("header", cells) / ("data", cells) 的序列
+        path: 輸出檔名（.ndjson 或 .ndjson.gz）
+        query_date: 每筆資料的 query_date
+        echo: 是否同時在終端機顯示每筆資料
+
+    Returns:
+        {"query_date", "headers", "rows", "output_file"}；沒有資料時 output_file 為 None
+    """
+    headers = []
+    count = 0
+    tmp_path = path + ".tmp"
+    try:
+        with open_ndjson(tmp_path, compress=path.endswith(".gz")) as f:
+            for kind, cells in rows:
+                if kind == "header":
+                    headers.append(cells)
+                    continue
+                names = headers[-1] if headers else []
+                record = {"query_date": query_date}
+                for i, value in enumerate(cells):
+                    record[names[i] if i < len(names) else f"欄位{i}"] = value
+                line = _encode(record)
+                f.write(line)
+                f.write("\n")
+                count += 1
+                if echo:
+                    print(f"第 {count} 筆資料: {line}")
+    except BaseException:
+        # open_ndjson() 本身失敗時暫存檔不存在，保留原本的例外
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+    if not count:
+        os.remove(tmp_path)
+        return {"query_date": query_date, "headers": headers, "rows": 0, "output_file": None}
+    os.replace(tmp_path, path)
+    return {"query_date": query_date, "headers": headers, "rows": count, "output_file": path}
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+html_table 測試：串流解析、lxml 與原本 BeautifulSoup 版本（bench_html_table.extract_bs4）
+的結果相同，iter_table() 不論怎麼切段都與 extract_table() 相同（不需網路）。
+
+沒有安裝 lxml / beautifulsoup4 時只比較已安裝的實作。
+"""
+import os
+
+import html_table
+from bench_html_table import build_html, extract_bs4
+from html_table import extract_table, iter_table
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGE_FIXTURE = os.path.join(HERE, "twse_html_synthetic_20251023.html")
+
+# TWSE 頁面會出現、或解析器容易出錯的結構
+EDGE_CASES = {
+    "entities_and_br": """<table><thead><tr><th>證券<br>代號</th><th> A&amp;B </th></tr></thead>
+        <tbody><tr><td> 2330 </td><td>1,000<!-- note -->&nbsp;</td></tr></tbody></table>""",
+    "empty_rows_and_th_in_tbody": """<table><thead><tr></tr><tr><td>h1</td><th>h2</th></tr></thead>
+        <tbody><tr></tr><tr><th>ignored</th><td>1</td></tr></tbody></table>""",
+    "second_tbody_and_table": """<table><thead><tr><th>a</th></tr></thead>
+        <tbody><tr><td>1</td></tr></tbody><tbody><tr><td>2</td></tr></tbody></table>
+        <table><tbody><tr><td>other</td></tr></tbody></table>""",
+    "no_thead": "<div><table><tbody><tr><td>1</td><td>2</td></tr></tbody></table></div>",
+}
+
+# TWSE 表格內沒有巢狀表格（見 html_table 說明）；串流解析只取外層表格的列，
+# BeautifulSoup / lxml 的 extract_table 則會把內層的列也算進去，因此不列入一致性比較
+NESTED_TABLE = """<table><thead><tr><th>a</th></tr></thead><tbody>
+    <tr><td>x<table><tbody><tr><td>inner</td></tr></tbody></table>y</td></tr>
+    <tr><td>z</td></tr></tbody></table>"""
+
+
+def _backends():
+    return ["stream"] + (["lxml"] if html_table.lxml is not None else [])
+
+
+def _pages():
+    with open(PAGE_FIXTURE, "r", encoding="utf-8") as f:
+        yield "synthetic_page", f.read()
+    yield "bench_300_rows", build_html(300)
+    yield from EDGE_CASES.items()
+
+
+def _bs4_available():
+    try:
+        import bs4  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def test_backends_agree():
+    for name, page in _pages():
+        results = {backend: extract_table(page, backend) for backend in _backends()}
+        if _bs4_available():
+            results["bs4"] = extract_bs4(page)
+        first = next(iter(results.values()))
+        assert first is not None and first[1], name
+        for backend, result in results.items():
+            assert result == first, (name, backend)
+
+
+def test_edge_case_results():
+    assert extract_table(EDGE_CASES["entities_and_br"], "stream") == ([["證券代號", "A&B"]], [["2330", "1,000"]])
+    assert extract_table(NESTED_TABLE, "stream")[1] == [["xinnery"], ["z"]]
+    assert extract_table(EDGE_CASES["second_tbody_and_table"], "stream") == ([["a"]], [["1"]])
+
+
+def test_iter_table_matches_extract_table_for_any_chunking():
+    for name, page in _pages():
+        for backend in _backends():
+            headers, data = extract_table(page, backend)
+            expected = [("header", h) for h in headers] + [("data", d) for d in data]
+            for size in (1, 7, 64, len(page)):
+                chunks = [page[i:i + size] for i in range(0, len(page), size)]
+                assert list(iter_table(chunks, backend)) == expected, (name, backend, size)
+
+
+def test_no_table():
+    for backend in _backends():
+        assert extract_table("<html><body>很抱歉，沒有符合條件的資料!</body></html>", backend) is None
+        assert list(iter_table(["<p>沒有", "表格</p>"], backend)) == []
+
+
+if __name__ == "__main__":
+    test_backends_agree()
+    test_edge_case_results()
+    test_iter_table_matches_extract_table_for_any_chunking()
+    test_no_table()
+    print("✓ 串流解析、lxml" + ("、BeautifulSoup" if _bs4_available() else "") + " 的結果相同")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+ndjson_output 測試：寫入中途失敗時移除暫存檔並拋出原本的例外；
+暫存檔無法建立時（例如沒有寫入權限）也拋出原本的例外，而不是 FileNotFoundError。
+"""
+import gzip
+import os
+import tempfile
+
+import ndjson_output
+from ndjson_output import write_table_ndjson
+
+ROWS = [("header", ["證券代號", "證券名稱"]), ("data", ["0050", "元大台灣50"]), ("data", ["2330", "台積電"])]
+
+
+def _raises(exc_type, fn):
+    try:
+        fn()
+    except exc_type as e:
+        return e
+    raise AssertionError(f"{exc_type.__name__} not raised")
+
+
+def test_round_trip_plain_and_gzip():
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, opener in (("t86.ndjson", open), ("t86.ndjson.gz", gzip.open)):
+            path = os.path.join(tmp, name)
+            summary = write_table_ndjson(iter(ROWS), path, "20251023")
+            assert summary["rows"] == 2 and summary["output_file"] == path
+            with opener(path, "rt", encoding="utf-8") as f:
+                assert f.read().splitlines()[1] == '{"query_date":"20251023","證券代號":"2330","證券名稱":"台積電"}'
+
+
+def test_failure_while_writing_removes_the_temporary_file():
+    def rows():
+        yield from ROWS[:2]
+        raise ConnectionError("connection reset")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "t86.ndjson")
+        _raises(ConnectionError, lambda: write_table_ndjson(rows(), path, "20251023"))
+        assert os.listdir(tmp) == []
+
+
+def test_open_failure_keeps_the_original_error():
+    original = ndjson_output.open_ndjson
+
+    def denied(path, compress=None):
+        raise PermissionError(13, "Permission denied", path)
+
+    ndjson_output.open_ndjson = denied
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            e = _raises(PermissionError, lambda: write_table_ndjson(iter(ROWS), os.path.join(tmp, "t86.ndjson"),
+                                                                    "20251023"))
+            assert e.filename.endswith(".tmp")
+    finally:
+        ndjson_output.open_ndjson = original
+
+
+if __name__ == "__main__":
+    test_round_trip_plain_and_gzip()
+    test_failure_while_writing_removes_the_temporary_file()
+    test_open_failure_keeps_the_original_error()
+    print("✓ NDJSON 輸出失敗時不留下暫存檔，並保留原本的例外")
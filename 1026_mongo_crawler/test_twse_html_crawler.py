@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+直接請求模式的解析、請求與串流測試（不需網路、不需瀏覽器）
+
+twse_html_synthetic_20251023.html 是合成的測試頁面（不是端點的實際擷取）：由
+twse_html_data_20251023.json 的 params.headers / data 依 response=html 頁面的結構
+重建。這裡只確認解析與輸出流程能處理該結構，不能證明與 TWSE 實際頁面或原本
+Selenium 版本的結果一致。
+"""
+import gzip
+import json
+import os
+import tempfile
+
+import requests
+
+import twse_html_crawler
+from twse_html_crawler import fetch_direct, parse_t86_page, stream_direct
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PAGE_FIXTURE = os.path.join(HERE, "twse_html_synthetic_20251023.html")
+EXPECTED_FIXTURE = os.path.join(HERE, "twse_html_data_20251023.json")
+
+
+class _FixtureResponse:
+    def __init__(self, text):
+        self.text = text
+        self.encoding = "utf-8"
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=1, decode_unicode=False):
+        for i in range(0, len(self.text), chunk_size):
+            yield self.text[i:i + chunk_size]
+
+    def close(self):
+        pass
+
+
+class _FixtureSession:
+    """代替 requests，回傳已儲存的頁面並記錄請求參數"""
+
+    def __init__(self, text, ssl_error=False):
+        self.text = text
+        self.ssl_error = ssl_error   # 模擬憑證驗證失敗的環境
+        self.calls = []
+        self.verify = []
+
+    def get(self, url, params=None, verify=True, **kwargs):
+        self.verify.append(verify)
+        if verify and self.ssl_error:
+            raise requests.exceptions.SSLError("certificate verify failed")
+        self.calls.append((url, params))
+        return _FixtureResponse(self.text)
+
+
+def _load():
+    with open(PAGE_FIXTURE, "r", encoding="utf-8") as f:
+        page = f.read()
+    with open(EXPECTED_FIXTURE, "r", encoding="utf-8") as f:
+        expected = json.load(f)
+    return page, expected
+
+
+def test_parse_synthetic_page():
+    """合成頁面的表頭與前 10 列解析回建立它的 JSON 資料"""
+    page, expected = _load()
+    result = parse_t86_page(page, "2025/10/23")
+
+    assert result["params"]["query_date"] == "2025/10/23"
+    assert result["params"]["headers"] == expected["params"]["headers"]
+    assert result["data"] == expected["data"]
+
+
+def test_fetch_direct_request():
+    """直接模式以 YYYYMMDD 請求 T86 端點的 HTML 回應"""
+    page, expected = _load()
+    session = _FixtureSession(page)
+    result = fetch_direct("2025/10/23", session=session)
+
+    url, params = session.calls[0]
+    assert url.endswith("/rwd/zh/fund/T86")
+    assert params == {"date": "20251023", "selectType": "ALL", "response": "html"}
+    assert session.verify == [True]   # 預設驗證憑證
+    assert result["data"] == expected["data"]
+
+
+def test_ssl_failure_falls_back_once_per_host(monkeypatch):
+    """憑證驗證失敗時改用 verify=False，之後同一主機直接使用非驗證連線"""
+    monkeypatch.setattr(twse_html_crawler, "_insecure_hosts", set())
+    page, expected = _load()
+    session = _FixtureSession(page, ssl_error=True)
+    assert fetch_direct("2025/10/23", session=session)["data"] == expected["data"]
+    with tempfile.TemporaryDirectory() as tmp:
+        stream_direct("2025/10/23", os.path.join(tmp, "t86.ndjson"), session=session)
+    assert session.verify == [True, False, False]
+
+
+def test_stream_direct_ndjson():
+    """NDJSON 串流模式：每筆資料一行，以最後一列表頭為欄位名稱，gzip 結果相同"""
+    page, expected = _load()
+    names = expected["params"]["headers"][-1]
+    expected_records = [{"query_date": "2025/10/23", **dict(zip(names, row))} for row in expected["data"]]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, opener in (("t86.ndjson", open), ("t86.ndjson.gz", gzip.open)):
+            path = os.path.join(tmp, name)
+            summary = stream_direct("2025/10/23", path, session=_FixtureSession(page))
+            with opener(path, "rt", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+
+            assert summary["rows"] == len(expected["data"])
+            assert summary["headers"] == expected["params"]["headers"]
+            assert [json.loads(line) for line in lines] == expected_records
+            assert not os.path.exists(path + ".tmp")
+
+        empty = os.path.join(tmp, "empty.ndjson")
+        summary = stream_direct("2025/10/25", empty, session=_FixtureSession("<html><body>查無資料</body></html>"))
+        assert summary["rows"] == 0 and summary["output_file"] is None
+        assert not os.path.exists(empty)
+
+
+def test_no_table():
+    assert parse_t86_page("<html><body>很抱歉，沒有符合條件的資料!</body></html>", "2025/10/25") is None
+
+
+if __name__ == "__main__":
+    test_parse_synthetic_page()
+    test_fetch_direct_request()
+    test_stream_direct_ndjson()
+    test_no_table()
+    print("✓ 直接請求模式可解析合成頁面並輸出 JSON / NDJSON")
@@ -1,135 +1,239 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
+import argparse
 import json
-import time
+from datetime import datetime
+from urllib.parse import urlsplit
 
-def fetch_twse_html_data(date_str):
+import requests
+import urllib3
+
+from html_table import extract_table, iter_table
+from ndjson_output import ndjson_path, write_table_ndjson
+
+# 禁用SSL警告（僅在憑證驗證失敗、改用 verify=False 時會出現）
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+T86_API_URL = "https://www.twse.com.tw/rwd/zh/fund/T86"
+T86_PAGE_URL = "https://www.twse.com.tw/zh/trading/foreign/t86.html"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+
+def build_result(date_str, headers, data_rows):
+    """組成與原本 Selenium 版本相同的 JSON 結構"""
+    return {
+        "params": {
+            "query_date": date_str,
+            "headers": headers
+        },
+        "data": data_rows[:10] if len(data_rows) > 10 else data_rows  # 取前10筆
+    }
+
+
+def parse_t86_page(html, date_str):
     """
-    使用HTML標籤抓取台灣證券交易所三大法人買賣超日報
+    解析 rwd/zh/fund/T86 的 HTML 回應
 
     Args:
-        date_str: 日期格式 YYYY/MM/DD (例如: 2025/10/23)
+        html: response=html 的回應內容
+        date_str: 日期格式 YYYY/MM/DD，原樣放入 params.query_date
 
     Returns:
-        包含表頭和資料的字典
+        包含表頭和資料的字典；查無表格或資料時回傳 None
     """
-    # 設定Chrome選項
-    chrome_options = Options()
-    chrome_options.add_argument('--headless')  # 無頭模式
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-    chrome_options.add_argument('--disable-gpu')
-    chrome_options.add_argument('--window-size=1920,1080')
-    chrome_options.add_argument('user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36')
+    table = extract_table(html)
+    if not table:
+        return None
+    headers, data_rows = table
+    if not data_rows:
+        return None
+    return build_result(date_str, headers, data_rows)
+
+
+def _t86_params(date_str):
+    return {
+        'date': date_str.replace('/', ''),
+        'selectType': 'ALL',
+        'response': 'html'
+    }
+
+
+_insecure_hosts = set()
 
-    driver = None
 
+def _get_t86(session, date_str, **kwargs):
+    """
+    以 certifi 驗證請求 T86 端點；驗證失敗時改用 verify=False，
+    之後同一主機不再重試驗證（與 1102_twse_crawler/transport.py 相同）
+    """
+    get = session.get if session is not None else requests.get
+    host = urlsplit(T86_API_URL).netloc
+    request = dict(params=_t86_params(date_str), headers={'User-Agent': USER_AGENT}, timeout=30, **kwargs)
+    if host not in _insecure_hosts:
+        try:
+            return get(T86_API_URL, verify=True, **request)
+        except requests.exceptions.SSLError:
+            print(f"⚠️ {host} SSL 憑證驗證失敗，之後改用非驗證連線（verify=False）")
+            _insecure_hosts.add(host)
+    return get(T86_API_URL, verify=False, **request)
+
+
+def fetch_direct(date_str, session=None):
+    """直接請求 T86 端點（不需瀏覽器）"""
+    response = _get_t86(session, date_str)
+    response.raise_for_status()
+    return parse_t86_page(response.text, date_str)
+
+
+def stream_direct(date_str, output_file, session=None, echo=False):
+    """
+    直接請求 T86 端點，邊下載邊解析，完整表格寫成 NDJSON
+
+    Returns:
+        write_table_ndjson() 的摘要 {"query_date", "headers", "rows", "output_file"}
+    """
+    response = _get_t86(session, date_str, stream=True)
     try:
-        print(f"正在啟動瀏覽器...")
-        driver = webdriver.Chrome(options=chrome_options)
+        response.raise_for_status()
+        if response.encoding is None:
+            response.encoding = "utf-8"
+        rows = iter_table(response.iter_content(chunk_size=65536, decode_unicode=True))
+        return write_table_ndjson(rows, output_file, date_str, echo=echo)
+    finally:
+        response.close()
+
+
+class BrowserSession:
+    """
+    Selenium 備援：同一個 headless Chrome 依序查詢多個日期，結束時才關閉
+
+        with BrowserSession() as browser:
+            for d in dates:
+                result = browser.fetch(d)
+    """
+
+    def __init__(self, timeout=15):
+        self.timeout = timeout
+        self.driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-        # 訪問網頁
-        url = "https://www.twse.com.tw/zh/trading/foreign/t86.html"
-        print(f"正在訪問網頁: {url}")
-        driver.get(url)
+    def _start(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
 
-        # 等待頁面載入
-        time.sleep(3)
+        # 設定Chrome選項
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')  # 無頭模式
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument(f'user-agent={USER_AGENT}')
+
+        print("正在啟動瀏覽器...")
+        self.driver = webdriver.Chrome(options=chrome_options)
+
+    def fetch(self, date_str):
+        return parse_t86_page(self.fetch_html(date_str), date_str)
+
+    def fetch_html(self, date_str):
+        """查詢 date_str，回傳結果表格的 outerHTML"""
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+
+        if self.driver is None:
+            self._start()
+        driver = self.driver
+        wait = WebDriverWait(driver, self.timeout)
+
+        print(f"正在訪問網頁: {T86_PAGE_URL}")
+        driver.get(T86_PAGE_URL)
 
         # 輸入查詢日期
         print(f"設定查詢日期: {date_str}")
-        date_input = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "input_date"))
-        )
+        date_input = wait.until(EC.presence_of_element_located((By.ID, "input_date")))
+        driver.execute_script("arguments[0].value = arguments[1];", date_input, date_str)
 
-        # 清空並輸入日期
-        date_input.clear()
-        driver.execute_script(f"arguments[0].value = '{date_str}';", date_input)
-
-        # 點擊查詢按鈕
+        # 點擊查詢按鈕，等待表格載入（取代固定秒數的 sleep）
         print("點擊查詢按鈕...")
         search_button = driver.find_element(By.CSS_SELECTOR, "button.btn-primary[type='button']")
         driver.execute_script("arguments[0].click();", search_button)
+        table = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "main table")))
+        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "main table tbody tr")))
+
+        # 一次取出表格 HTML，交給與直接模式相同的解析
+        return table.get_attribute("outerHTML")
+
+    def close(self):
+        if self.driver is not None:
+            print("\n關閉瀏覽器...")
+            self.driver.quit()
+            self.driver = None
+
 
-        # 等待表格載入
-        print("等待數據載入...")
-        WebDriverWait(driver, 15).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "main table tbody tr"))
-        )
-
-        time.sleep(2)  # 額外等待確保數據完全載入
-
-        # 抓取<thead>中的表頭資料
-        print("正在抓取表頭資料...")
-        thead_rows = driver.find_elements(By.CSS_SELECTOR, "main table thead tr")
-        headers = []
-
-        for row in thead_rows:
-            row_data = []
-            ths = row.find_elements(By.TAG_NAME, "th")
-            for th in ths:
-                row_data.append(th.text.strip())
-            if row_data:  # 只加入非空的行
-                headers.append(row_data)
-
-        print(f"找到 {len(headers)} 列表頭")
-
-        # 抓取<tbody>中的所有<tr>內所有<td>的資料
-        print("正在抓取表格資料...")
-        tbody_rows = driver.find_elements(By.CSS_SELECTOR, "main table tbody tr")
-
-        data_rows = []
-        for row in tbody_rows:
-            row_data = []
-            tds = row.find_elements(By.TAG_NAME, "td")
-            for td in tds:
-                row_data.append(td.text.strip())
-            if row_data:  # 只加入非空的行
-                data_rows.append(row_data)
-
-        print(f"總共抓取到 {len(data_rows)} 筆資料")
-
-        # 組織成JSON格式
-        result = {
-            "params": {
-                "query_date": date_str,
-                "headers": headers
-            },
-            "data": data_rows[:10] if len(data_rows) > 10 else data_rows  # 取前10筆
-        }
-
-        # 顯示結果
-        print("\n" + "=" * 100)
-        print("表頭資訊:")
-        print("=" * 100)
-        for idx, header_row in enumerate(headers):
-            print(f"表頭第{idx + 1}列: {header_row}")
-
-        print("\n" + "=" * 100)
-        print(f"資料內容（前10筆）:")
-        print("=" * 100)
-
-        for idx, row in enumerate(result["data"], 1):
-            print(f"\n第 {idx} 筆資料:")
-            for i, value in enumerate(row):
-                # 如果有表頭，使用表頭名稱
-                if headers and len(headers[-1]) > i:  # 使用最後一列表頭
-                    print(f"  {headers[-1][i]}: {value}")
-                else:
-                    print(f"  欄位{i}: {value}")
-            print("-" * 100)
-
-        # 儲存為JSON檔案
-        output_file = f"twse_data_{date_str.replace('/', '')}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(result, f, ensure_ascii=False, indent=2)
-
-        print(f"\n✓ 資料已儲存至: {output_file}")
+def show_and_save(result):
+    """顯示結果並儲存為JSON檔案"""
+    headers = result["params"]["headers"]
 
+    print("\n" + "=" * 100)
+    print("表頭資訊:")
+    print("=" * 100)
+    for idx, header_row in enumerate(headers):
+        print(f"表頭第{idx + 1}列: {header_row}")
+
+    print("\n" + "=" * 100)
+    print(f"資料內容（前10筆）:")
+    print("=" * 100)
+
+    for idx, row in enumerate(result["data"], 1):
+        print(f"\n第 {idx} 筆資料:")
+        for i, value in enumerate(row):
+            # 如果有表頭，使用表頭名稱
+            if headers and len(headers[-1]) > i:  # 使用最後一列表頭
+                print(f"  {headers[-1][i]}: {value}")
+            else:
+                print(f"  欄位{i}: {value}")
+        print("-" * 100)
+
+    output_file = f"twse_data_{result['params']['query_date'].replace('/', '')}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"\n✓ 資料已儲存至: {output_file}")
+
+
+def fetch_twse_html_data(date_str, browser=None, session=None):
+    """
+    抓取台灣證券交易所三大法人買賣超日報
+
+    預設直接請求 rwd/zh/fund/T86（response=html）；傳入 BrowserSession 時改用
+    Selenium 操作網頁查詢，兩者輸出相同結構的 params.headers / data。
+
+    Args:
+        date_str: 日期格式 YYYY/MM/DD (例如: 2025/10/23)
+        browser: BrowserSession，僅在需要瀏覽器備援時傳入
+        session: requests.Session，多個日期共用連線；未傳入時每次各自連線
+
+    Returns:
+        包含表頭和資料的字典
+    """
+    try:
+        if browser is None:
+            print(f"正在抓取 {date_str} 的三大法人買賣超資料（直接請求）...")
+            result = fetch_direct(date_str, session=session)
+        else:
+            result = browser.fetch(date_str)
+
+        if not result:
+            print("查無資料或該日期無交易資料")
+            return None
+
+        print(f"找到 {len(result['params']['headers'])} 列表頭")
+        show_and_save(result)
         return result
 
     except Exception as e:
@@ -138,25 +242,82 @@ def fetch_twse_html_data(date_str):
         traceback.print_exc()
         return None
 
-    finally:
-        if driver:
-            print("\n關閉瀏覽器...")
-            driver.quit()
+
+def stream_twse_html_data(date_str, browser=None, compress=False, echo=False, session=None):
+    """
+    抓取完整的三大法人買賣超日報並寫成 NDJSON（twse_data_YYYYMMDD.ndjson[.gz]）
+
+    保留所有資料列（不只前10筆），不組出整份 JSON，預設不在終端機逐筆顯示。
+    直接模式邊下載邊解析；瀏覽器備援取得表格 HTML 後以同樣方式逐列寫出。
+
+    Returns:
+        {"query_date", "headers", "rows", "output_file"}；失敗或無資料時回傳 None
+    """
+    output_file = ndjson_path(f"twse_data_{date_str.replace('/', '')}", compress)
+    try:
+        if browser is None:
+            print(f"正在抓取 {date_str} 的三大法人買賣超資料（直接請求，NDJSON 串流）...")
+            summary = stream_direct(date_str, output_file, session=session, echo=echo)
+        else:
+            summary = write_table_ndjson(iter_table([browser.fetch_html(date_str)]), output_file,
+                                         date_str, echo=echo)
+
+        if not summary["rows"]:
+            print("查無資料或該日期無交易資料")
+            return None
+
+        print(f"✓ {summary['rows']} 筆資料已儲存至: {summary['output_file']}")
+        return summary
+
+    except Exception as e:
+        print(f"發生錯誤: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+
+def _parse_date(s):
+    for fmt in ("%Y/%m/%d", "%Y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(s, fmt).strftime("%Y/%m/%d")
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"日期格式錯誤: {s}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="三大法人買賣超日報爬蟲 (HTML版本)")
     # 民國114年10月23日 = 2025年10月23日
-    # 日期格式: YYYY/MM/DD
-    date = "2025/10/23"
+    parser.add_argument("dates", nargs="*", type=_parse_date, default=["2025/10/23"],
+                        help="查詢日期（YYYY/MM/DD，可多個）")
+    parser.add_argument("--browser", action="store_true",
+                        help="改用 Selenium 瀏覽器備援（多個日期共用同一個瀏覽器）")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="完整表格以 NDJSON 串流寫入 twse_data_YYYYMMDD.ndjson（不只前10筆）")
+    parser.add_argument("--gzip", action="store_true", help="NDJSON 以 gzip 壓縮（.ndjson.gz，隱含 --ndjson）")
+    parser.add_argument("--echo", action="store_true", help="NDJSON 模式下仍在終端機顯示每筆資料")
+    args = parser.parse_args()
 
     print("=" * 100)
     print("台灣證券交易所 - 三大法人買賣超日報爬蟲 (HTML版本)")
     print("=" * 100)
 
-    result = fetch_twse_html_data(date)
-
-    if result:
-        print("\n✓ 資料抓取成功！")
-        print(f"總共抓取到 {len(result['data'])} 筆資料")
-    else:
-        print("\n✗ 資料抓取失敗，請檢查日期或網路連線")
+    browser = BrowserSession() if args.browser else None
+    session = requests.Session()   # 多個日期共用同一條 keep-alive 連線
+    try:
+        for date in args.dates:
+            if args.ndjson or args.gzip:
+                if not stream_twse_html_data(date, browser=browser, compress=args.gzip, echo=args.echo,
+                                             session=session):
+                    print("\n✗ 資料抓取失敗，請檢查日期或網路連線")
+                continue
+            result = fetch_twse_html_data(date, browser=browser, session=session)
+            if result:
+                print("\n✓ 資料抓取成功！")
+                print(f"總共抓取到 {len(result['data'])} 筆資料")
+            else:
+                print("\n✗ 資料抓取失敗，請檢查日期或網路連線")
+    finally:
+        session.close()
+        if browser is not None:
+            browser.close()
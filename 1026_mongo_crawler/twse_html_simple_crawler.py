@@ -1,11 +1,17 @@
+import argparse
 import requests
-from bs4 import BeautifulSoup
 import json
 import urllib3
 
+from html_table import extract_table, iter_table
+from ndjson_output import ndjson_path, write_table_ndjson
+
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+T86_URL = "https://www.twse.com.tw/rwd/zh/fund/T86"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
 
 def fetch_twse_html_data(date_str):
     """
@@ -18,7 +24,7 @@ def fetch_twse_html_data(date_str):
         包含表頭和資料的字典
     """
     # 使用相同的API端點，但這次我們解析返回的HTML
-    url = "https://www.twse.com.tw/rwd/zh/fund/T86"
+    url = T86_URL
 
     # 請求參數
     params = {
@@ -29,7 +35,7 @@ def fetch_twse_html_data(date_str):
 
     # 設定Headers
     headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        'User-Agent': USER_AGENT
     }
 
     try:
@@ -37,48 +43,15 @@ def fetch_twse_html_data(date_str):
         response = requests.get(url, params=params, headers=headers, verify=False)
         response.raise_for_status()
 
-        # 使用BeautifulSoup解析HTML
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # 尋找表格
-        table = soup.find('table')
+        # 解析第一個表格（有 lxml 時使用 lxml，否則使用串流解析）
+        table = extract_table(response.text)
 
         if not table:
             print("未找到表格數據")
             return None
 
-        # 抓取<thead>中的所有<tr>
-        print("正在抓取表頭...")
-        thead = table.find('thead')
-        headers_data = []
-
-        if thead:
-            thead_rows = thead.find_all('tr')
-            for row in thead_rows:
-                row_data = []
-                # 找所有th標籤
-                ths = row.find_all(['th', 'td'])
-                for th in ths:
-                    row_data.append(th.get_text(strip=True))
-                if row_data:
-                    headers_data.append(row_data)
-
-            print(f"找到 {len(headers_data)} 列表頭")
-
-        # 抓取<tbody>中的所有<tr>內所有<td>的資料
-        print("正在抓取表格資料...")
-        tbody = table.find('tbody')
-        data_rows = []
-
-        if tbody:
-            tbody_rows = tbody.find_all('tr')
-            for row in tbody_rows:
-                row_data = []
-                tds = row.find_all('td')
-                for td in tds:
-                    row_data.append(td.get_text(strip=True))
-                if row_data:
-                    data_rows.append(row_data)
+        headers_data, data_rows = table
+        print(f"找到 {len(headers_data)} 列表頭")
 
         print(f"總共抓取到 {len(data_rows)} 筆資料")
 
@@ -139,20 +112,79 @@ def fetch_twse_html_data(date_str):
         return None
 
 
+def stream_twse_html_data(date_str, compress=False, echo=False):
+    """
+    抓取完整的三大法人買賣超日報，邊下載邊解析並寫成 NDJSON
+
+    與 fetch_twse_html_data 不同：保留所有資料列（不只前10筆）、不在記憶體中
+    組出整份結果，預設也不在終端機逐筆顯示。
+
+    Args:
+        date_str: 日期格式 YYYYMMDD (例如: 20251023)
+        compress: 是否輸出 gzip 壓縮的 .ndjson.gz
+        echo: 是否在終端機顯示每筆資料
+
+    Returns:
+        {"query_date", "headers", "rows", "output_file"}；失敗或無資料時回傳 None
+    """
+    params = {
+        'date': date_str,
+        'selectType': 'ALL',
+        'response': 'html'
+    }
+    output_file = ndjson_path(f"twse_html_data_{date_str}", compress)
+
+    try:
+        print(f"正在抓取 {date_str} 的三大法人買賣超資料（NDJSON 串流）...")
+        response = requests.get(T86_URL, params=params, headers={'User-Agent': USER_AGENT},
+                                verify=False, timeout=30, stream=True)
+        try:
+            response.raise_for_status()
+            if response.encoding is None:
+                response.encoding = "utf-8"
+            rows = iter_table(response.iter_content(chunk_size=65536, decode_unicode=True))
+            summary = write_table_ndjson(rows, output_file, date_str, echo=echo)
+        finally:
+            response.close()
+
+        if not summary["rows"]:
+            print("查無資料或該日期無交易資料")
+            return None
+
+        print(f"✓ {summary['rows']} 筆資料已儲存至: {summary['output_file']}")
+        return summary
+
+    except requests.exceptions.RequestException as e:
+        print(f"網路請求錯誤: {e}")
+        return None
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="三大法人買賣超日報爬蟲 (HTML解析版本)")
     # 民國114年10月23日 = 2025年10月23日
-    # 日期格式: YYYYMMDD
-    date = "20251023"
+    parser.add_argument("dates", nargs="*", default=["20251023"], help="查詢日期（YYYYMMDD，可多個）")
+    parser.add_argument("--ndjson", action="store_true",
+                        help="完整表格以 NDJSON 串流寫入 twse_html_data_YYYYMMDD.ndjson（不只前10筆）")
+    parser.add_argument("--gzip", action="store_true", help="NDJSON 以 gzip 壓縮（.ndjson.gz，隱含 --ndjson）")
+    parser.add_argument("--echo", action="store_true", help="NDJSON 模式下仍在終端機顯示每筆資料")
+    args = parser.parse_args()
 
     print("=" * 100)
     print("台灣證券交易所 - 三大法人買賣超日報爬蟲 (HTML解析版本)")
     print("=" * 100)
 
-    result = fetch_twse_html_data(date)
-
-    if result:
-        print("\n✓ 資料抓取成功！")
-        print(f"表頭列數: {len(result['params']['headers'])}")
-        print(f"資料筆數: {len(result['data'])}")
-    else:
-        print("\n✗ 資料抓取失敗，請檢查日期或網路連線")
+    for date in args.dates:
+        if args.ndjson or args.gzip:
+            summary = stream_twse_html_data(date, compress=args.gzip, echo=args.echo)
+            if not summary:
+                print(f"\n✗ {date} 資料抓取失敗，請檢查日期或網路連線")
+            continue
+
+        result = fetch_twse_html_data(date)
+
+        if result:
+            print("\n✓ 資料抓取成功！")
+            print(f"表頭列數: {len(result['params']['headers'])}")
+            print(f"資料筆數: {len(result['data'])}")
+        else:
+            print("\n✗ 資料抓取失敗，請檢查日期或網路連線")
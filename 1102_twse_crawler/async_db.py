@@ -0,0 +1,174 @@
+"""
+Async MongoDB storage backend.
+
+與 db.py 相同的寫入語意（content hash 跳過未變更資料、rows / wide / timeseries
+三種格式、寫入後通知 query.py 的快取），但以 async client 執行，寫入等待 MongoDB
+回應時不會卡住 event loop，多個交易日可以同時寫入：
+
+    import async_db
+    async_db.configure(pool_size=50)
+    await async_db.ensure_indexes()
+    counts = await async_db.upsert_t86(docs)
+    await async_db.upsert_bfi82u(doc)
+    await async_db.close()
+
+查詢條件與寫入操作（UpdateOne / ReplaceOne）由 db.py 的函式產生，兩邊共用；
+同步 API（db.py）維持原樣，供背景 writer thread 與 --db-backend sync 使用。
+`cli --db-backend async` 的區間抓取以這裡的函式寫入（backfill 的 store）。
+
+需要 pymongo 4.13+（AsyncMongoClient），沒有時改用 motor（pip install motor）。
+連線池大小：TWSE_MONGO_POOL_SIZE（預設 100）或 configure(pool_size=...)。
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo.errors import OperationFailure
+from pymongo.write_concern import WriteConcern
+
+try:
+    from pymongo import AsyncMongoClient   # pymongo 4.13+
+except ImportError:  # 舊版 pymongo：改用 motor
+    AsyncMongoClient = None
+
+try:
+    from .config import get_db_name, get_layout, get_mongo_pool_size, get_mongo_uri
+    from .db import (INDEXES, TIMESERIES_DELETE_ERROR, TIMESERIES_HASH_PROJECTION, WriteCounts, group_by_date,
+                     ingest_ledger_update, notify_write, t86_hash_query, t86_indexes, t86_row_ops, t86_wide_ops,
+                     timeseries_day_query, timeseries_day_split)
+    from .layouts import LAYOUT_TIMESERIES, LAYOUT_WIDE, TIMESERIES_OPTIONS, with_ts
+except ImportError:
+    from config import get_db_name, get_layout, get_mongo_pool_size, get_mongo_uri
+    from db import (INDEXES, TIMESERIES_DELETE_ERROR, TIMESERIES_HASH_PROJECTION, WriteCounts, group_by_date,
+                    ingest_ledger_update, notify_write, t86_hash_query, t86_indexes, t86_row_ops, t86_wide_ops,
+                    timeseries_day_query, timeseries_day_split)
+    from layouts import LAYOUT_TIMESERIES, LAYOUT_WIDE, TIMESERIES_OPTIONS, with_ts
+
+_client: Any = None
+_client_key: Optional[tuple] = None   # (pid, event loop)：async client 只能在建立它的 loop 與行程中使用
+_pool_size: Optional[int] = None
+
+
+def _new_client(pool_size: int) -> Any:
+    if AsyncMongoClient is not None:
+        return AsyncMongoClient(get_mongo_uri(), maxPoolSize=pool_size)
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient
+    except ImportError as e:
+        raise RuntimeError("async_db 需要 pymongo 4.13+（AsyncMongoClient）或 motor："
+                           "pip install -U pymongo") from e
+    return AsyncIOMotorClient(get_mongo_uri(), maxPoolSize=pool_size)
+
+
+def _get_client() -> Any:
+    """Client of the running event loop; a new loop or a forked child gets its own."""
+    global _client, _client_key
+    key = (os.getpid(), asyncio.get_running_loop())
+    if _client is None or _client_key != key:
+        _client = _new_client(_pool_size or get_mongo_pool_size())
+        _client_key = key
+    return _client
+
+
+def configure(pool_size: Optional[int] = None) -> None:
+    """Set the connection pool size; takes effect on the next connection."""
+    global _pool_size, _client, _client_key
+    _pool_size = pool_size
+    _client = _client_key = None
+
+
+def set_client(client: Any) -> None:
+    """Use `client` in the running event loop; None makes the next call connect again."""
+    global _client, _client_key
+    _client = client
+    _client_key = (os.getpid(), asyncio.get_running_loop()) if client is not None else None
+
+
+async def close() -> None:
+    global _client, _client_key
+    if _client is not None:
+        result = _client.close()   # AsyncMongoClient.close() 是 coroutine，motor 的不是
+        if inspect.isawaitable(result):
+            await result
+    _client = _client_key = None
+
+
+def get_collection(name: str, write_concern: Optional[WriteConcern] = None) -> Any:
+    coll = _get_client()[get_db_name()][name]
+    return coll.with_options(write_concern=write_concern) if write_concern else coll
+
+
+async def ensure_t86_indexes(name: str = "t86", layout: Optional[str] = None) -> None:
+    layout = layout or get_layout(name)
+    db = _get_client()[get_db_name()]
+    if layout == LAYOUT_TIMESERIES and name not in await db.list_collection_names(filter={"name": name}):
+        await db.create_collection(name, timeseries=TIMESERIES_OPTIONS)
+    for keys, options in t86_indexes(layout):
+        await db[name].create_index(keys, **options)
+
+
+async def _ensure(name: str) -> None:
+    for keys, options in INDEXES[name]:
+        await get_collection(name).create_index(keys, **options)
+
+
+async def ensure_indexes() -> None:
+    await asyncio.gather(ensure_t86_indexes(), *(_ensure(name) for name in INDEXES))
+
+
+async def write_t86(docs: List[Dict[str, Any]], name: str, layout: str,
+                    write_concern: Optional[WriteConcern] = None) -> WriteCounts:
+    """Async `db.write_t86`: rows whose content hash matches the stored one are not sent."""
+    if not docs:
+        return WriteCounts()
+    coll = get_collection(name, write_concern)
+    if layout == LAYOUT_TIMESERIES:
+        counts = await _replace_t86_timeseries(coll, docs)
+    else:
+        stored = await coll.find(*t86_hash_query(docs, layout)).to_list(None)
+        if layout == LAYOUT_WIDE:
+            ops, counts = t86_wide_ops(docs, stored)
+        else:
+            ops, counts = t86_row_ops(docs, stored)
+        if ops:
+            await coll.bulk_write(ops, ordered=False)
+    if counts.inserted or counts.changed:
+        notify_write(name, (d["date"] for d in docs))
+    return counts
+
+
+async def _replace_t86_timeseries(coll: Any, docs: List[Dict[str, Any]]) -> WriteCounts:
+    inserted = changed = skipped = 0
+    for day, rows in group_by_date(docs).items():
+        stored = await coll.find(timeseries_day_query(day), TIMESERIES_HASH_PROJECTION).to_list(None)
+        fresh, stale = timeseries_day_split(rows, stored)
+        if stale:
+            try:
+                await coll.delete_many(timeseries_day_query(day, [r.get("stock_code") for r in stale]))
+            except OperationFailure as e:
+                raise RuntimeError(TIMESERIES_DELETE_ERROR) from e
+        if fresh or stale:
+            await coll.insert_many(with_ts(fresh + stale), ordered=False)
+        inserted += len(fresh)
+        changed += len(stale)
+        skipped += len(rows) - len(fresh) - len(stale)
+    return WriteCounts(inserted, changed, skipped)
+
+
+async def upsert_t86(docs: Iterable[Dict[str, Any]], write_concern: Optional[WriteConcern] = None) -> WriteCounts:
+    return await write_t86(list(docs), "t86", get_layout("t86"), write_concern)
+
+
+async def upsert_bfi82u(doc: Dict[str, Any], write_concern: Optional[WriteConcern] = None) -> None:
+    coll = get_collection("bfi82u", write_concern)
+    await coll.update_one({"date": doc["date"]}, {"$set": doc}, upsert=True)
+    notify_write("bfi82u", [doc["date"]])
+
+
+async def record_ingest(dataset: str, date: str, rows: int, digest: str) -> None:
+    coll = get_collection("ingest_ledger")
+    await coll.update_one(*ingest_ledger_update(dataset, date, rows, digest), upsert=True)
+
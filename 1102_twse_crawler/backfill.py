@@ -0,0 +1,152 @@
+"""
+Async backfill engine for date ranges.
+
+抓取本身仍是同步函式（requests），這裡以 asyncio 排程、thread pool 執行，
+讓多個 (date, dataset) 工作同時進行：某一工作在等 TWSE 回應時，其他工作可以
+寫入 MongoDB，整體仍受全域每秒請求數限制。寫入預設與抓取一起在 thread 中以
+pymongo 執行；傳入 `store`（例如 async_db 的 coroutine）時改在 event loop 上
+等待 MongoDB 回應，不佔用 thread。
+
+多行程模式（cli --workers N）把工作依日期分給 N 個行程，每個行程各自抓取與寫入，
+透過 SharedRateLimiter 共用同一個每秒請求數上限。
+"""
+from __future__ import annotations
+
+import asyncio
+import multiprocessing
+import time
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+Store = Callable[[dt.date, str, Any], Awaitable[Any]]
+
+
+class RateLimiter:
+    """
+    Global requests-per-second budget shared by every in-flight task.
+
+    Each `acquire()` reserves the next free slot, so requests are spaced at
+    least `1 / rps` seconds apart no matter how many workers are waiting.
+    `rps <= 0` disables the limit.
+    """
+
+    def __init__(self, rps: float):
+        self._interval = 1.0 / rps if rps > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class SharedRateLimiter:
+    """
+    `RateLimiter` for several processes: the next free slot lives in shared
+    memory, so every worker draws from one requests-per-second budget.
+
+    Pass it to the workers at process start (e.g. a pool initializer); the
+    blocking `acquire()` is meant for plain threads, not the event loop.
+    """
+
+    def __init__(self, rps: float, ctx: Any = None):
+        self._interval = 1.0 / rps if rps > 0 else 0.0
+        self._next = (ctx or multiprocessing).Value("d", 0.0)
+
+    def acquire(self) -> None:
+        if not self._interval:
+            return
+        with self._next.get_lock():
+            now = time.monotonic()
+            wait = self._next.value - now
+            self._next.value = max(now, self._next.value) + self._interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def plan_jobs(dates: Sequence[dt.date], datasets: Sequence[str]) -> List[Tuple[dt.date, str]]:
+    return [(d, name) for d in dates for name in datasets]
+
+
+def shard_jobs(jobs: Sequence[Tuple[dt.date, str]], shards: int) -> List[List[Tuple[dt.date, str]]]:
+    """
+    Split jobs into at most `shards` lists by date. Both datasets of a date
+    stay in the same shard, and dates are dealt round-robin so that each
+    shard gets a similar mix of busy and quiet periods.
+    """
+    dates = sorted({d for d, _ in jobs})
+    owner = {d: i % shards for i, d in enumerate(dates)}
+    out: List[List[Tuple[dt.date, str]]] = [[] for _ in range(min(shards, len(dates)))]
+    for job in jobs:
+        out[owner[job[0]]].append(job)
+    return out
+
+
+async def backfill(
+    jobs: Sequence[Tuple[dt.date, str]],
+    step: Callable[[dt.date, str], Any],
+    concurrency: int = 4,
+    rps: float = 0.0,
+    store: Optional[Store] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Run `step(date, dataset)` for every (date, dataset) job with at most
+    `concurrency` jobs in flight.
+
+    With `store`, `step` only fetches and `await store(date, dataset,
+    fetched)` writes the result on the event loop, so the pool threads are
+    free for fetching while MongoDB answers.
+
+    Returns one result dict per date, ordered by date, in the same shape as
+    `cli.run_one`. The first exception raised by a step stops the other
+    workers from starting new jobs, waits for the steps already running and
+    is re-raised, like it would in the sequential loop.
+    """
+    queue: asyncio.Queue[Tuple[dt.date, str]] = asyncio.Queue()
+    for job in jobs:
+        queue.put_nowait(job)
+
+    results: Dict[dt.date, Dict[str, Any]] = {d: {"date": d} for d, _ in sorted(jobs)}
+    limiter = RateLimiter(rps)
+    loop = asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="backfill") as pool:
+
+        async def worker() -> None:
+            while True:
+                try:
+                    d, name = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await limiter.acquire()
+                fetched = await loop.run_in_executor(pool, step, d, name)
+                results[d][name] = await store(d, name, fetched) if store else fetched
+
+        tasks = [asyncio.ensure_future(worker()) for _ in range(max(1, concurrency))]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # gather() leaves the other workers running; stop them before the pool shuts down
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    return list(results.values())
+
+
+def run_range_async(
+    jobs: Sequence[Tuple[dt.date, str]],
+    step: Callable[[dt.date, str], Any],
+    concurrency: int = 4,
+    rps: float = 0.0,
+    store: Optional[Store] = None,
+) -> List[Dict[str, Any]]:
+    return asyncio.run(backfill(jobs, step, concurrency=concurrency, rps=rps, store=store))
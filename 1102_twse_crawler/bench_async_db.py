@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark：同時寫入多個交易日的 T86 —— 同步 pymongo vs async client。
+
+以 synthetic.py 產生 N 個交易日的資料，分別以三種方式寫入各自的 collection：
+- sync：db.write_t86 逐日寫入（原本的路徑）
+- threads：db.write_t86 放進 thread pool，同時 --concurrency 天
+- async：async_db.write_t86 以 asyncio.gather 同時 --concurrency 天（連線池 --pool）
+
+每種方式各跑兩次：首次寫入與重跑（內容未變更，只讀取 hash），輸出 rows/s。需要本機 mongod
+與 pymongo 4.13+（或 motor）。
+
+執行方式：python bench_async_db.py --days 60 --stocks 1000 --concurrency 8 --pool 16
+"""
+import argparse
+import asyncio
+import datetime as dt
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import async_db
+from bench_timeseries import day_docs, trading_days
+from db import ensure_t86_indexes, get_collection, write_t86
+from layouts import LAYOUT_ROWS
+
+NAMES = {"sync": "bench_t86_sync", "threads": "bench_t86_threads", "async": "bench_t86_async"}
+
+
+def run_sync(days: List[List[Dict[str, Any]]], concurrency: int) -> None:
+    for docs in days:
+        write_t86([dict(d) for d in docs], NAMES["sync"], LAYOUT_ROWS)
+
+
+def run_threads(days: List[List[Dict[str, Any]]], concurrency: int) -> None:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda docs: write_t86([dict(d) for d in docs], NAMES["threads"], LAYOUT_ROWS), days))
+
+
+def run_async(days: List[List[Dict[str, Any]]], concurrency: int) -> None:
+    async def main() -> None:
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one(docs: List[Dict[str, Any]]) -> None:
+            async with sem:
+                await async_db.write_t86([dict(d) for d in docs], NAMES["async"], LAYOUT_ROWS)
+
+        try:
+            await asyncio.gather(*(one(docs) for docs in days))
+        finally:
+            await async_db.close()
+
+    asyncio.run(main())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="sync vs async concurrent T86 daily upserts")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--stocks", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8, help="同時寫入的交易日數")
+    parser.add_argument("--pool", type=int, default=16, help="async client 的 maxPoolSize")
+    args = parser.parse_args()
+
+    async_db.configure(pool_size=args.pool)
+    days = [day_docs(d, args.stocks) for d in trading_days(dt.date(2024, 1, 2), args.days)]
+    rows = sum(len(docs) for docs in days)
+
+    report: Dict[str, Any] = {"days": args.days, "stocks": args.stocks, "concurrency": args.concurrency,
+                              "pool": args.pool}
+    for label, run in (("sync", run_sync), ("threads", run_threads), ("async", run_async)):
+        get_collection(NAMES[label]).drop()
+        ensure_t86_indexes(NAMES[label], LAYOUT_ROWS)
+        result = {}
+        for phase in ("first_write", "rerun_unchanged"):
+            t0 = time.perf_counter()
+            run(days, args.concurrency)
+            elapsed = time.perf_counter() - t0
+            result[phase] = {"seconds": round(elapsed, 3), "rows_per_s": round(rows / elapsed)}
+        result["stored"] = get_collection(NAMES[label]).count_documents({})
+        report[label] = result
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
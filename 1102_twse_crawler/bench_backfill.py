@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark：循序抓取 vs async backfill，對本機假 TWSE 伺服器（fake_twse.py）。
+
+MongoDB 寫入以固定延遲模擬，因此不需要實際的 mongod。
+執行方式：python bench_backfill.py --days 20 --latency 0.05 --concurrency 8
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+import datetime as dt
+from typing import Any, Dict
+
+import cli
+import twse_api
+from backfill import plan_jobs, run_range_async
+from db import WriteCounts
+from fake_twse import start_server
+
+
+def _fake_upsert_t86(write_latency: float):
+    def upsert(docs):
+        time.sleep(write_latency)
+        return WriteCounts(inserted=len(docs))
+    return upsert
+
+
+def _fake_upsert_bfi82u(write_latency: float):
+    def upsert(doc):
+        time.sleep(write_latency)
+    return upsert
+
+
+def run_sequential(dates, datasets, sleep_s: float):
+    results = []
+    for d in dates:
+        results.append(cli.run_one(d, want_t86="t86" in datasets, want_bfi82u="bfi82u" in datasets))
+        time.sleep(sleep_s)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sequential vs async backfill throughput")
+    parser.add_argument("--start", default="2024-01-01")
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="假伺服器每個請求延遲秒數")
+    parser.add_argument("--write-latency", type=float, default=0.02, help="模擬 MongoDB 寫入秒數")
+    parser.add_argument("--sleep", type=float, default=0.1, help="循序模式每日間隔秒數")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rps", type=float, default=0.0, help="async 模式每秒請求上限（0 = 不限）")
+    args = parser.parse_args()
+
+    server = start_server(latency=args.latency)
+    twse_api.configure_base_url(server.base_url)
+    cli.upsert_t86 = _fake_upsert_t86(args.write_latency)
+    cli.upsert_bfi82u = _fake_upsert_bfi82u(args.write_latency)
+    cli.record_ingest = lambda *a, **kw: None
+
+    start = dt.datetime.strptime(args.start, "%Y-%m-%d").date()
+    dates = [start + dt.timedelta(days=i) for i in range(args.days)]
+    datasets = ["t86", "bfi82u"]
+    report: Dict[str, Any] = {"days": args.days, "latency": args.latency, "write_latency": args.write_latency}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        transport = twse_api.configure_transport(args.concurrency)
+        t0 = time.perf_counter()
+        seq = run_sequential(dates, datasets, args.sleep)
+        seq_s = time.perf_counter() - t0
+        report["sequential_http"] = transport.stats.snapshot()
+
+        transport = twse_api.configure_transport(args.concurrency)
+        t0 = time.perf_counter()
+        conc = run_range_async(plan_jobs(dates, datasets), cli.run_dataset,
+                               concurrency=args.concurrency, rps=args.rps)
+        conc_s = time.perf_counter() - t0
+        report["async_http"] = transport.stats.snapshot()
+
+    server.shutdown()
+    report["sequential_s"] = round(seq_s, 3)
+    report["async_s"] = round(conc_s, 3)
+    report["speedup"] = round(seq_s / conc_s, 2) if conc_s else None
+    report["same_results"] = seq == conc
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
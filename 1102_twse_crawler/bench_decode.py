@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark：JSON 解碼與列組裝。
+
+以 1026_mongo_crawler 內附的範例資料（見 fixtures.py）組成與 TWSE API 相同格式的
+回應 bytes，T86 可用 --rows 複製成完整市場規模。比較：
+- legacy：r.json() 的作法（bytes → str → json.loads）+ 逐列依索引走訪 fields
+- json / orjson：decode.py，直接從 bytes 解碼 + 預先建立的欄位對應
+
+執行方式：python bench_decode.py --rows 1300 --repeat 200
+"""
+import argparse
+import json
+import time
+import datetime as dt
+from typing import Any, Callable, Dict, List
+
+import decode
+from fixtures import bfi82u_payload, t86_payload
+
+
+def legacy_t86(body: bytes) -> List[Dict[str, Any]]:
+    js = json.loads(body.decode("utf-8"))
+    fields, docs = js["fields"], []
+    for row in js["data"]:
+        m = {fields[idx]: row[idx] for idx in range(min(len(fields), len(row)))}
+        docs.append({**m, "date": "2025-10-23",
+                     "stock_code": m.get("證券代號") or m.get("股票代號"),
+                     "stock_name": m.get("證券名稱") or m.get("股票名稱")})
+    return docs
+
+
+def legacy_bfi82u(body: bytes) -> List[Dict[str, Any]]:
+    js = json.loads(body.decode("utf-8"))
+    fields = js["fields"]
+    return [{fields[idx]: row[idx] for idx in range(min(len(fields), len(row)))} for row in js["data"]]
+
+
+def fast_t86(loads: Callable[[bytes], Any]) -> Callable[[bytes], List[Dict[str, Any]]]:
+    def run(body: bytes) -> List[Dict[str, Any]]:
+        js = loads(body)
+        return decode.t86_records(js["fields"], js["data"], "2025-10-23")
+    return run
+
+
+def fast_bfi82u(loads: Callable[[bytes], Any]) -> Callable[[bytes], List[Dict[str, Any]]]:
+    def run(body: bytes) -> List[Dict[str, Any]]:
+        js = loads(body)
+        return decode.row_records(js["fields"], js["data"])
+    return run
+
+
+def measure(fn: Callable[[bytes], List[Dict[str, Any]]], body: bytes, repeat: int) -> Dict[str, float]:
+    rows = len(fn(body))
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    per_call = (time.perf_counter() - t0) / repeat
+    return {"ms_per_payload": round(per_call * 1000, 4), "rows_per_s": round(rows / per_call)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="TWSE JSON decode + row assembly micro-benchmark")
+    parser.add_argument("--rows", type=int, default=1300, help="T86 列數（0 = 只用範例的 10 列）")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    day = dt.date(2025, 10, 23)
+    t86 = t86_payload(day, args.rows or 10)
+    bfi = bfi82u_payload(day)
+    assert legacy_t86(t86) == fast_t86(json.loads)(t86)
+    assert legacy_bfi82u(bfi) == fast_bfi82u(json.loads)(bfi)
+
+    report: Dict[str, Any] = {"t86_bytes": len(t86), "bfi82u_bytes": len(bfi),
+                              "default_decoder": decode.decoder_name("auto")}
+    for label, body, legacy, fast in (("t86", t86, legacy_t86, fast_t86),
+                                      ("bfi82u", bfi, legacy_bfi82u, fast_bfi82u)):
+        report[label] = {"legacy": measure(legacy, body, args.repeat)}
+        for name, loads in decode.DECODERS.items():
+            report[label][name] = measure(fast(loads), body, args.repeat)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
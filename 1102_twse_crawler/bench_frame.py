@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark：T86 list-of-dicts vs 欄式 T86DayFrame 的記憶體用量。
+
+以 synthetic.py 產生 N 個交易日的回應資料（預設 60 天 × 1000 檔），分別保留成
+fetch_t86 的 raw / typed dict 列表與 T86DayFrame，以 tracemalloc 量測解析後仍
+佔用的記憶體（原始回應資料已釋放），並比較建構與 to_records() 的耗時。
+不需網路與 MongoDB。
+
+執行方式：python bench_frame.py --days 60 --stocks 1000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+import datetime as dt
+from typing import Any, Callable, Dict, List
+
+from bench_timeseries import trading_days
+from decode import t86_records
+from synthetic import T86_FIELDS, t86_rows
+from frame import T86DayFrame
+from schema import type_rows
+
+
+def retained(days: List[dt.date], stocks: int, build: Callable[[List[List[str]], str], Any]) -> Dict[str, Any]:
+    """Bytes still allocated after building and keeping one object per day."""
+    gc.collect()
+    tracemalloc.start()
+    kept = []
+    t0 = time.perf_counter()
+    for d in days:
+        rows = t86_rows(d, stocks)
+        kept.append(build(rows, d.isoformat()))
+        del rows
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"bytes": current, "bytes_per_day": current // len(days), "build_s": round(elapsed, 3), "kept": kept}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="T86 dict rows vs columnar frame memory")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--stocks", type=int, default=1000)
+    args = parser.parse_args()
+
+    days = trading_days(dt.date(2024, 1, 2), args.days)
+    forms = {
+        "dict_raw": lambda rows, iso: t86_records(T86_FIELDS, rows, iso),
+        "dict_typed": lambda rows, iso: t86_records(T86_FIELDS, type_rows(T86_FIELDS, rows), iso),
+        "frame": lambda rows, iso: T86DayFrame.from_payload(T86_FIELDS, rows, iso),
+    }
+    report: Dict[str, Any] = {"days": args.days, "stocks": args.stocks}
+    results = {}
+    for label, build in forms.items():
+        results[label] = retained(days, args.stocks, build)
+        report[label] = {k: v for k, v in results[label].items() if k != "kept"}
+
+    frames = results["frame"]["kept"]
+    assert all(f.to_records() == d for f, d in zip(frames, results["dict_typed"]["kept"]))
+    t0 = time.perf_counter()
+    for f in frames:
+        f.to_records()
+    report["frame"]["to_records_ms_per_day"] = round((time.perf_counter() - t0) * 1000 / len(frames), 3)
+    t0 = time.perf_counter()
+    for f in frames:
+        f.stock("1101")
+    report["frame"]["first_stock_lookup_us"] = round((time.perf_counter() - t0) * 1e6 / len(frames), 2)
+
+    frame_bytes = report["frame"]["bytes"]
+    report["reduction_vs_dict_raw"] = round(report["dict_raw"]["bytes"] / frame_bytes, 1)
+    report["reduction_vs_dict_typed"] = round(report["dict_typed"]["bytes"] / frame_bytes, 1)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
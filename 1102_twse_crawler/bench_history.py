@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark：單一股票歷史查詢（例如 2330 最近 250 天的外資買賣超）。
+
+以 fake_twse.py 產生多年份的 rows 格式 T86（bench_t86_history），比較：
+- date_first：原本唯一的 (date, stock_code) 索引，讀取完整文件
+- stock_first：stock_history 索引 (stock_code, date, ...)，讀取完整文件
+- covered：stock_history 索引，只取 HISTORY_FIELDS（不讀取文件）
+
+輸出每種查詢的延遲（median / p95）與 explain 的 keys / docs examined。需要本機 mongod。
+
+執行方式：python bench_history.py --years 3 --stocks 1000 --window 250 --queries 200
+"""
+import argparse
+import datetime as dt
+import json
+import random
+from typing import Any, Dict, Optional, Sequence
+
+from bench_timeseries import day_docs, latency, storage, trading_days
+from db import HISTORY_FIELDS, HISTORY_INDEX, ensure_t86_indexes, get_collection
+from layouts import LAYOUT_ROWS
+from query import history_query
+
+NAME = "bench_t86_history"
+DATE_FIRST = [("date", 1), ("stock_code", 1)]
+
+
+def plan_summary(code: str, start: str, end: str, fields: Optional[Sequence[str]], hint: Any) -> Dict[str, Any]:
+    plan = get_collection(NAME).find(*history_query(code, start, end, fields)).sort("date", 1).hint(hint).explain()
+    stats = plan["executionStats"]
+    return {"keys_examined": stats["totalKeysExamined"], "docs_examined": stats["totalDocsExamined"],
+            "returned": stats["nReturned"]}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="per-stock T86 history query latency")
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--stocks", type=int, default=1000)
+    parser.add_argument("--window", type=int, default=250, help="查詢天數")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--keep", action="store_true", help="沿用已產生的 bench_t86_history")
+    args = parser.parse_args()
+
+    days = trading_days(dt.date(2021, 1, 4), args.years * 250)
+    coll = get_collection(NAME)
+    if not args.keep or coll.estimated_document_count() == 0:
+        coll.drop()
+        for d in days:
+            coll.insert_many(day_docs(d, args.stocks), ordered=False)
+    ensure_t86_indexes(NAME, LAYOUT_ROWS)
+
+    rng = random.Random(0)
+    codes = [str(1101 + i) for i in range(args.stocks)]
+    windows = []
+    for _ in range(args.queries):
+        i = rng.randrange(0, max(1, len(days) - args.window))
+        windows.append((rng.choice(codes), days[i].isoformat(),
+                        days[min(len(days) - 1, i + args.window - 1)].isoformat()))
+
+    variants = {
+        "date_first": (None, DATE_FIRST),
+        "stock_first": (None, HISTORY_INDEX),
+        "covered": (list(HISTORY_FIELDS), HISTORY_INDEX),
+    }
+    report: Dict[str, Any] = {"days": len(days), "stocks": args.stocks, "window_days": args.window,
+                              "storage": storage(NAME)}
+    for label, (fields, hint) in variants.items():
+        it = iter(windows)
+
+        def run(fields=fields, hint=hint, it=it):
+            code, a, b = next(it)
+            list(coll.find(*history_query(code, a, b, fields)).sort("date", 1).hint(hint))
+
+        report[label] = {"query": latency(run, args.queries), "explain": plan_summary(*windows[0], fields, hint)}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark：raw vs typed schema 的解析成本與 BSON 文件大小。
+
+資料來源為 synthetic.py 依日期產生的完整交易日（預設 1000 檔），不需網路與 MongoDB。
+執行方式：python bench_schema.py --stocks 1000 --repeat 20
+"""
+import argparse
+import json
+import time
+import datetime as dt
+from typing import Any, Dict, List
+
+import bson
+
+from synthetic import T86_FIELDS, t86_rows
+from schema import _parse_int, column_converters, int64_column, type_rows
+
+
+def build_docs(fields: List[str], rows: List[List[Any]], date: str) -> List[Dict[str, Any]]:
+    docs = []
+    for row in rows:
+        m = {fields[idx]: row[idx] for idx in range(min(len(fields), len(row)))}
+        docs.append({**m, "date": date, "stock_code": m.get("證券代號"), "stock_name": m.get("證券名稱")})
+    return docs
+
+
+def per_cell_rows(fields: List[str], rows: List[List[Any]]) -> List[List[Any]]:
+    """Naive alternative: branch on every cell."""
+    convs = column_converters(fields)
+    return [[_parse_int(v) if convs[i] is int64_column else str(v).strip()
+             for i, v in enumerate(row)] for row in rows]
+
+
+def _time(fn, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="raw vs typed T86 schema")
+    parser.add_argument("--stocks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    day = dt.date(2024, 1, 2)
+    rows = t86_rows(day, args.stocks)
+    fields = T86_FIELDS
+    iso = day.isoformat()
+
+    raw_s = _time(lambda: build_docs(fields, rows, iso), args.repeat)
+    typed_s = _time(lambda: build_docs(fields, type_rows(fields, rows), iso), args.repeat)
+    cell_s = _time(lambda: build_docs(fields, per_cell_rows(fields, rows), iso), args.repeat)
+
+    raw_docs = build_docs(fields, rows, iso)
+    typed_docs = build_docs(fields, type_rows(fields, rows), iso)
+    raw_bytes = sum(len(bson.encode(d)) for d in raw_docs)
+    typed_bytes = sum(len(bson.encode(d)) for d in typed_docs)
+
+    report = {
+        "rows_per_day": len(rows),
+        "parse_ms_per_day": {
+            "raw": round(raw_s * 1000, 3),
+            "typed_columnar": round(typed_s * 1000, 3),
+            "typed_per_cell": round(cell_s * 1000, 3),
+        },
+        "bson_bytes_per_day": {"raw": raw_bytes, "typed": typed_bytes},
+        "bson_bytes_per_doc": {
+            "raw": round(raw_bytes / len(raw_docs), 1),
+            "typed": round(typed_bytes / len(typed_docs), 1),
+        },
+        "size_reduction": round(1 - typed_bytes / raw_bytes, 3),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite：fetch / parse / upsert 各階段，完全離線。
+
+資料來自 fixtures.py（以 1026_mongo_crawler 的範例資料合成的完整交易日）：
+- fetch：從預先填入的回應快取（offline 模式）經 twse_api.fetch_* 重播
+- parse：decode.loads + 列組裝（raw / typed），不含磁碟 I/O
+- doc_size：寫入 MongoDB 的 BSON 文件大小（raw / typed）
+- upsert：db.write_t86 / BFI82U bulk upsert，首次寫入與重跑（內容未變）；
+  優先使用本機 mongod，連不上時改用 mongomock（若有安裝，套用 mongomock_compat 修補），否則略過
+
+結果寫成 JSON（--out），可用 --baseline 與之前的結果比較，
+吞吐量（*_per_s）下降或耗時/大小（*_ms、*_bytes）上升超過 --tolerance 即列為退步，
+baseline 有而這次沒有的指標列為缺少；upsert 階段執行失敗時記錄 error。三者結束碼皆為 1。
+
+執行方式：python bench_suite.py --days 20 --rows 1300 --out bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import datetime as dt
+from typing import Any, Callable, Dict, List, Optional
+
+import bson
+
+import db
+import decode
+import twse_api
+from config import get_mongo_uri
+from fixtures import MARKET_ROWS, bfi82u_payload, market_days, t86_payload
+from layouts import LAYOUT_ROWS
+from schema import SCHEMA_RAW, SCHEMA_TYPED, type_rows
+
+T86_BENCH = "bench_t86"
+BFI82U_BENCH = "bench_bfi82u"
+
+
+def _timed(fn: Callable[[], Any]) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def _rate(rows: int, seconds: float) -> Dict[str, float]:
+    return {"rows": rows, "total_ms": round(seconds * 1000, 3),
+            "rows_per_s": round(rows / seconds) if seconds else None}
+
+
+def bench_fetch(days: List[dt.date], rows: int) -> Dict[str, Any]:
+    report: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="twse-bench-") as root:
+        cache = twse_api.configure_cache(root, offline=True)
+        for d in days:
+            cache.put(twse_api.T86_URL, twse_api.t86_params(d), t86_payload(d, rows))
+            cache.put(twse_api.BFI82U_URL, twse_api.bfi82u_params(d), bfi82u_payload(d))
+        for schema in (SCHEMA_RAW, SCHEMA_TYPED):
+            n = 0
+
+            def run() -> None:
+                nonlocal n
+                for d in days:
+                    n += len(twse_api.fetch_t86(d, schema=schema))
+                    n += len(twse_api.fetch_bfi82u(d, schema=schema)["rows"])
+
+            seconds = _timed(run)
+            report[schema] = _rate(n, seconds)
+        report["cache_hits"] = cache.stats()["hits"]
+    twse_api.configure_cache(None)
+    return report
+
+
+def bench_parse(days: List[dt.date], rows: int) -> Dict[str, Any]:
+    bodies = [t86_payload(d, rows) for d in days]
+    report: Dict[str, Any] = {"payload_bytes": sum(map(len, bodies)) // len(bodies)}
+
+    def decode_only() -> None:
+        for b in bodies:
+            decode.loads(b)
+
+    def raw() -> None:
+        for d, b in zip(days, bodies):
+            js = decode.loads(b)
+            decode.t86_records(js["fields"], js["data"], d.isoformat())
+
+    def typed() -> None:
+        for d, b in zip(days, bodies):
+            js = decode.loads(b)
+            decode.t86_records(js["fields"], type_rows(js["fields"], js["data"]), d.isoformat())
+
+    report["decoder"] = decode.decoder_name()
+    report["decode"] = _rate(rows * len(days), _timed(decode_only))
+    report["raw"] = _rate(rows * len(days), _timed(raw))
+    report["typed"] = _rate(rows * len(days), _timed(typed))
+    return report
+
+
+def t86_docs(d: dt.date, rows: int, schema: str) -> List[Dict[str, Any]]:
+    js = decode.loads(t86_payload(d, rows))
+    data = type_rows(js["fields"], js["data"]) if schema == SCHEMA_TYPED else js["data"]
+    return decode.t86_records(js["fields"], data, d.isoformat())
+
+
+def bench_doc_size(day: dt.date, rows: int) -> Dict[str, Any]:
+    report: Dict[str, Any] = {}
+    for schema in (SCHEMA_RAW, SCHEMA_TYPED):
+        docs = [{**d, db.HASH_FIELD: db.row_hash(d)} for d in t86_docs(day, rows, schema)]
+        total = sum(len(bson.encode(d)) for d in docs)
+        report[schema] = {"day_bytes": total, "doc_bytes": round(total / len(docs), 1)}
+    return report
+
+
+def _connect(backend: str) -> Optional[str]:
+    """Point db at a mongod or mongomock client; return the backend used."""
+    if backend in ("auto", "mongod"):
+        from pymongo import MongoClient
+        from pymongo.errors import PyMongoError
+        client = MongoClient(get_mongo_uri(), serverSelectionTimeoutMS=1500)
+        try:
+            client.admin.command("ping")
+            db.set_client(client)
+            return "mongod"
+        except PyMongoError:
+            client.close()
+            if backend == "mongod":
+                return None
+    try:
+        import mongomock
+        from mongomock_compat import patch_mongomock
+    except ImportError:
+        return None
+    patch_mongomock()
+    db.set_client(mongomock.MongoClient())
+    return "mongomock"
+
+
+def bench_upsert(days: List[dt.date], rows: int, backend: str) -> Dict[str, Any]:
+    used = _connect(backend)
+    if used is None:
+        return {"skipped": "no mongod reachable and mongomock is not installed"}
+    report: Dict[str, Any] = {"backend": used}
+    try:
+        for name in (T86_BENCH, BFI82U_BENCH):
+            db.get_collection(name).drop()
+        db.ensure_t86_indexes(T86_BENCH, LAYOUT_ROWS)
+        db.get_collection(BFI82U_BENCH).create_index([("date", 1)], unique=True)
+        per_day = [t86_docs(d, rows, SCHEMA_RAW) for d in days]
+        bfi = [{"date": d.isoformat(), "rows": decode.row_records(js["fields"], js["data"])}
+               for d in days for js in [decode.loads(bfi82u_payload(d))]]
+
+        for label in ("initial", "rerun_unchanged"):
+            counts = []
+            seconds = _timed(lambda: counts.extend(
+                db.write_t86([dict(x) for x in docs], T86_BENCH, LAYOUT_ROWS) for docs in per_day))
+            report[f"t86_{label}"] = {**_rate(rows * len(days), seconds),
+                                      "skipped": sum(c.skipped for c in counts)}
+        ops = [db.bfi82u_op(doc) for doc in bfi]
+        seconds = _timed(lambda: db.get_collection(BFI82U_BENCH).bulk_write(ops, ordered=False))
+        report["bfi82u_bulk"] = _rate(len(ops), seconds)
+    except Exception as e:  # 記錄為失敗，由 main() 回傳 1
+        report["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        for name in (T86_BENCH, BFI82U_BENCH):
+            db.get_collection(name).drop()
+    return report
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+_METRIC_SUFFIXES = ("_per_s", "_ms", "_bytes")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float, path: str = "") -> List[str]:
+    """
+    List metrics that got worse than `baseline` by more than `tolerance`,
+    and metrics of `baseline` that the current run did not produce.
+    """
+    found: List[str] = []
+    for key, old in baseline.items():
+        new = current.get(key)
+        where = f"{path}.{key}" if path else key
+        if isinstance(old, dict):
+            found.extend(compare(old, new if isinstance(new, dict) else {}, tolerance, where))
+        elif key.endswith(_METRIC_SUFFIXES) and isinstance(old, (int, float)) and not isinstance(new, (int, float)):
+            found.append(f"{where}: {old} -> missing")
+        elif isinstance(old, (int, float)) and isinstance(new, (int, float)) and old:
+            if key.endswith("_per_s") and new < old * (1 - tolerance):
+                found.append(f"{where}: {old} -> {new}")
+            elif key.endswith(("_ms", "_bytes")) and new > old * (1 + tolerance):
+                found.append(f"{where}: {old} -> {new}")
+    return found
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline fetch / parse / upsert benchmark suite")
+    parser.add_argument("--days", type=int, default=20)
+    parser.add_argument("--rows", type=int, default=MARKET_ROWS, help="每日 T86 列數")
+    parser.add_argument("--backend", choices=("auto", "mongod", "mongomock"), default="auto",
+                        help="upsert 階段使用的資料庫（auto：mongod 優先）")
+    parser.add_argument("--skip-upsert", action="store_true")
+    parser.add_argument("--out", default="bench_results.json", help="結果 JSON 檔")
+    parser.add_argument("--baseline", help="與之前的結果 JSON 比較")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允許的退步比例（預設 0.2）")
+    args = parser.parse_args()
+
+    days = market_days(dt.date(2024, 1, 2), args.days)
+    report: Dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "decoder": decode.decoder_name(),
+            "created_at": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+        },
+        "params": {"days": args.days, "rows": args.rows},
+        "fetch": bench_fetch(days, args.rows),
+        "parse": bench_parse(days, args.rows),
+        "doc_size": bench_doc_size(days[0], args.rows),
+    }
+    if not args.skip_upsert:
+        report["upsert"] = bench_upsert(days, args.rows, args.backend)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    failed = False
+    if report.get("upsert", {}).get("error"):
+        print(f"[FAILED] upsert: {report['upsert']['error']}", file=sys.stderr)
+        failed = True
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print(f"[REGRESSION] {line}", file=sys.stderr)
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark：T86 rows 格式 vs MongoDB time-series collection。
+
+以 synthetic.py 產生 N 個交易日的資料，分別寫入 bench_t86_rows（目前格式，
+索引 (date, stock_code)）與 bench_t86_ts（time-series，metaField=stock_code），
+比較儲存大小與「單一股票 N 天」查詢延遲。需要本機 mongod（MongoDB 7.0+）。
+
+執行方式：python bench_timeseries.py --days 250 --stocks 1000 --queries 200
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import datetime as dt
+from typing import Any, Dict, List
+
+from db import _get_client, ensure_t86_indexes, get_collection, write_t86
+from config import get_db_name
+from synthetic import T86_FIELDS, t86_rows
+from layouts import LAYOUT_ROWS, LAYOUT_TIMESERIES, day_ts
+from schema import type_rows
+
+ROWS = "bench_t86_rows"
+TS = "bench_t86_ts"
+
+
+def trading_days(start: dt.date, n: int) -> List[dt.date]:
+    days, d = [], start
+    while len(days) < n:
+        if d.weekday() < 5:
+            days.append(d)
+        d += dt.timedelta(days=1)
+    return days
+
+
+def day_docs(d: dt.date, stocks: int) -> List[Dict[str, Any]]:
+    iso = d.isoformat()
+    rows = type_rows(T86_FIELDS, t86_rows(d, stocks))
+    return [{**dict(zip(T86_FIELDS, r)), "date": iso, "stock_code": r[0], "stock_name": r[1]} for r in rows]
+
+
+def storage(name: str) -> Dict[str, Any]:
+    stats = _get_client()[get_db_name()].command("collStats", name)
+    return {
+        "size": stats.get("size"),
+        "storage_size": stats.get("storageSize"),
+        "index_size": stats.get("totalIndexSize"),
+        "indexes": stats.get("nindexes"),
+    }
+
+
+def latency(fn, n: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {"median_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="rows vs time-series T86 layout")
+    parser.add_argument("--days", type=int, default=250)
+    parser.add_argument("--stocks", type=int, default=1000)
+    parser.add_argument("--window", type=int, default=60, help="查詢天數")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    for name in (ROWS, TS):
+        get_collection(name).drop()
+    ensure_t86_indexes(ROWS, LAYOUT_ROWS)
+    ensure_t86_indexes(TS, LAYOUT_TIMESERIES)
+
+    days = trading_days(dt.date(2023, 1, 2), args.days)
+    write_s = {ROWS: 0.0, TS: 0.0}
+    for d in days:
+        docs = day_docs(d, args.stocks)
+        for name, layout in ((ROWS, LAYOUT_ROWS), (TS, LAYOUT_TIMESERIES)):
+            t0 = time.perf_counter()
+            write_t86([dict(x) for x in docs], name, layout)
+            write_s[name] += time.perf_counter() - t0
+
+    rng = random.Random(0)
+    codes = [str(1101 + i) for i in range(args.stocks)]
+    windows = []
+    for _ in range(args.queries):
+        i = rng.randrange(0, max(1, len(days) - args.window))
+        windows.append((rng.choice(codes), days[i], days[min(len(days) - 1, i + args.window - 1)]))
+    it_rows, it_ts = iter(windows * 2), iter(windows * 2)
+
+    def q_rows():
+        code, a, b = next(it_rows)
+        list(get_collection(ROWS).find(
+            {"stock_code": code, "date": {"$gte": a.isoformat(), "$lte": b.isoformat()}}, {"_id": 0}))
+
+    def q_ts():
+        code, a, b = next(it_ts)
+        list(get_collection(TS).find(
+            {"stock_code": code, "ts": {"$gte": day_ts(a.isoformat()), "$lte": day_ts(b.isoformat())}},
+            {"_id": 0}))
+
+    report = {
+        "days": args.days,
+        "stocks": args.stocks,
+        "window_days": args.window,
+        "rows": {"storage": storage(ROWS), "write_s": round(write_s[ROWS], 2), "query": latency(q_rows, args.queries)},
+        "timeseries": {"storage": storage(TS), "write_s": round(write_s[TS], 2), "query": latency(q_ts, args.queries)},
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+On-disk cache of raw TWSE responses.
+
+目錄結構：
+    <root>/keys/ab/<key sha256>.json   端點 + 參數 → 內容 hash 與抓取時間
+    <root>/objects/cd/<content sha256>.gz   gzip 壓縮的原始回應內容
+
+內容以 hash 定址，相同回應（例如所有假日的「查無資料」）只存一份。
+在該日期的公佈時間（台北時間 PUBLISH_CUTOFF）之後抓取的回應不會再變，永不過期；
+公佈前抓取的回應（例如收盤前的「查無資料」）即使日期已過，仍依 TTL 過期。
+offline 模式只讀快取，不發出任何網路請求。
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+import datetime as dt
+from typing import Any, Dict, Mapping, Optional
+
+TAIPEI = dt.timezone(dt.timedelta(hours=8))
+PUBLISH_CUTOFF = dt.time(18, 0)   # T86 / BFI82U 皆於收盤後、此時間前公佈
+
+
+def published(date: dt.date, at: Optional[float] = None) -> bool:
+    """Whether `date`'s reports are final at epoch time `at` (default: now)."""
+    cutoff = dt.datetime.combine(date, PUBLISH_CUTOFF, tzinfo=TAIPEI).timestamp()
+    return (time.time() if at is None else at) >= cutoff
+
+
+def taipei_today() -> dt.date:
+    """Today's date in Taipei, whatever the local timezone of the machine."""
+    return dt.datetime.fromtimestamp(time.time(), TAIPEI).date()
+
+
+def cache_key(url: str, params: Mapping[str, Any]) -> str:
+    canonical = json.dumps([url, sorted((str(k), str(v)) for k, v in params.items())],
+                           ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ResponseCache:
+    def __init__(self, root: str, today_ttl: float = 3600.0, offline: bool = False):
+        self.root = root
+        self.today_ttl = today_ttl
+        self.offline = offline
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _key_path(self, key: str) -> str:
+        return os.path.join(self.root, "keys", key[:2], f"{key}.json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.gz")
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _expired(self, entry: Dict[str, Any], date: dt.date) -> bool:
+        fetched_at = entry.get("fetched_at", 0)
+        if published(date, fetched_at):
+            return False
+        return time.time() - fetched_at > self.today_ttl
+
+    def get(self, url: str, params: Mapping[str, Any], date: dt.date) -> Optional[bytes]:
+        """Return the cached body for (url, params), or None on a miss / expiry."""
+        try:
+            with open(self._key_path(cache_key(url, params)), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if not self.offline and self._expired(entry, date):
+                self._count(False)
+                return None
+            with gzip.open(self._object_path(entry["sha256"]), "rb") as f:
+                body = f.read()
+        except (OSError, ValueError, KeyError):
+            self._count(False)
+            return None
+        self._count(True)
+        return body
+
+    def put(self, url: str, params: Mapping[str, Any], body: bytes) -> None:
+        digest = hashlib.sha256(body).hexdigest()
+        obj = self._object_path(digest)
+        if not os.path.exists(obj):
+            _atomic_write(obj, gzip.compress(body))
+        entry = {
+            "url": url,
+            "params": dict(params),
+            "sha256": digest,
+            "size": len(body),
+            "fetched_at": time.time(),
+        }
+        _atomic_write(self._key_path(cache_key(url, params)),
+                      json.dumps(entry, ensure_ascii=False).encode("utf-8"))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def merge_stats(self, stats: Mapping[str, int]) -> None:
+        """Add hit/miss counts from another process using the same cache directory."""
+        with self._lock:
+            self.hits += stats.get("hits", 0)
+            self.misses += stats.get("misses", 0)
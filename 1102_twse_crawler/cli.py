@@ -0,0 +1,602 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+import datetime as dt
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+from pymongo.write_concern import WriteConcern
+
+try:
+    from .db import (ensure_indexes, upsert_t86, upsert_bfi82u, completed_jobs, record_ingest, content_hash,
+                     migrate_t86_layout, set_client)
+    from .config import get_http_pool_size, get_cache_dir, get_write_batch_size, get_write_concern
+    from .twse_api import fetch_t86, fetch_bfi82u, configure_transport, configure_cache, configure_base_url
+    from .backfill import SharedRateLimiter, backfill, plan_jobs, run_range_async, shard_jobs
+    from . import async_db
+    from .export import export_dataset
+    from .rolling import ensure_rolling_indexes, rebuild as rebuild_rolling, update_rolling
+    from .layouts import LAYOUTS
+    from .schema import SCHEMAS
+    from .trading_calendar import TradingCalendar, FileCalendarStore, MongoCalendarStore, load_holidays
+    from .writer import BulkWriter, parse_write_concern
+    from .metrics import METRICS, serve_metrics
+    from .transport import Transport
+    from .cache import ResponseCache
+except ImportError:
+    from db import (ensure_indexes, upsert_t86, upsert_bfi82u, completed_jobs, record_ingest, content_hash,
+                    migrate_t86_layout, set_client)
+    from config import get_http_pool_size, get_cache_dir, get_write_batch_size, get_write_concern
+    from twse_api import fetch_t86, fetch_bfi82u, configure_transport, configure_cache, configure_base_url
+    from backfill import SharedRateLimiter, backfill, plan_jobs, run_range_async, shard_jobs
+    import async_db
+    from export import export_dataset
+    from rolling import ensure_rolling_indexes, rebuild as rebuild_rolling, update_rolling
+    from layouts import LAYOUTS
+    from schema import SCHEMAS
+    from trading_calendar import TradingCalendar, FileCalendarStore, MongoCalendarStore, load_holidays
+    from writer import BulkWriter, parse_write_concern
+    from metrics import METRICS, serve_metrics
+    from transport import Transport
+    from cache import ResponseCache
+
+
+def parse_date(s: str) -> dt.date:
+    return dt.datetime.strptime(s, "%Y-%m-%d").date()
+
+
+def wanted_datasets(cmd: str) -> List[str]:
+    return [name for name in ("t86", "bfi82u") if cmd in (name, "both")]
+
+
+DB_BACKENDS = ("sync", "async")
+
+
+def fetch_dataset(
+    date: dt.date,
+    dataset: str,
+    calendar: Optional[TradingCalendar] = None,
+    schema: Optional[str] = None,
+) -> Any:
+    """T86 row documents or the BFI82U document of one date (empty / None when there is no data)."""
+    on_no_data = partial(calendar.mark_no_data, dataset=dataset) if calendar else None
+    if dataset == "t86":
+        return fetch_t86(date, on_no_data=on_no_data, schema=schema)
+    return fetch_bfi82u(date, on_no_data=on_no_data, schema=schema)
+
+
+def run_dataset(
+    date: dt.date,
+    dataset: str,
+    calendar: Optional[TradingCalendar] = None,
+    schema: Optional[str] = None,
+    writer: Optional[BulkWriter] = None,
+) -> Any:
+    """
+    Fetch and store one dataset for one date.
+
+    Returns the WriteCounts for T86 (None when there is no data) and
+    True/False for BFI82U. "No data" answers are recorded in `calendar`;
+    stored days are recorded in the ingestion ledger.
+
+    With a `writer` the documents are queued for a background bulk write
+    (T86 then returns the fetched row count) and the ledger entry is written
+    once the batch holding them has been acknowledged.
+    """
+    if dataset == "t86":
+        t86_docs = fetch_dataset(date, dataset, calendar, schema)
+        if t86_docs and writer:
+            done = partial(record_ingest, "t86", date.isoformat(), len(t86_docs), content_hash(t86_docs))
+            writer.submit_t86(t86_docs, on_done=done)
+            print(f"[T86] {date} queued: {len(t86_docs)} rows")
+            return len(t86_docs)
+        if t86_docs:
+            t0 = time.perf_counter()
+            counts = upsert_t86(t86_docs)
+            METRICS.observe("twse_mongo_write_seconds", "t86", time.perf_counter() - t0)
+            record_ingest("t86", date.isoformat(), len(t86_docs), content_hash(t86_docs))
+            print(f"[T86] {date} inserted: {counts.inserted}, changed: {counts.changed}, "
+                  f"skipped: {counts.skipped} rows")
+            return counts
+        print(f"[T86] {date} no data or holiday")
+        return None
+
+    bdoc = fetch_dataset(date, dataset, calendar, schema)
+    if bdoc and writer:
+        writer.submit_bfi82u(bdoc, on_done=partial(record_ingest, "bfi82u", date.isoformat(),
+                                                   len(bdoc["rows"]), content_hash(bdoc)))
+        print(f"[BFI82U] {date} queued")
+        return True
+    if bdoc:
+        t0 = time.perf_counter()
+        upsert_bfi82u(bdoc)
+        METRICS.observe("twse_mongo_write_seconds", "bfi82u", time.perf_counter() - t0)
+        record_ingest("bfi82u", date.isoformat(), len(bdoc["rows"]), content_hash(bdoc))
+        print(f"[BFI82U] {date} upserted")
+        return True
+    print(f"[BFI82U] {date} no data or holiday")
+    return False
+
+
+async def store_dataset_async(date: dt.date, dataset: str, fetched: Any,
+                              write_concern: Optional[WriteConcern] = None) -> Any:
+    """
+    `run_dataset`'s direct write on async_db (--db-backend async): the
+    MongoDB round trips are awaited on the event loop instead of holding a
+    backfill thread. Returns what `run_dataset` returns without a writer.
+    """
+    if dataset == "t86":
+        if not fetched:
+            print(f"[T86] {date} no data or holiday")
+            return None
+        t0 = time.perf_counter()
+        counts = await async_db.upsert_t86(fetched, write_concern)
+        METRICS.observe("twse_mongo_write_seconds", "t86", time.perf_counter() - t0)
+        await async_db.record_ingest("t86", date.isoformat(), len(fetched), content_hash(fetched))
+        print(f"[T86] {date} inserted: {counts.inserted}, changed: {counts.changed}, "
+              f"skipped: {counts.skipped} rows")
+        return counts
+
+    if not fetched:
+        print(f"[BFI82U] {date} no data or holiday")
+        return False
+    t0 = time.perf_counter()
+    await async_db.upsert_bfi82u(fetched, write_concern)
+    METRICS.observe("twse_mongo_write_seconds", "bfi82u", time.perf_counter() - t0)
+    await async_db.record_ingest("bfi82u", date.isoformat(), len(fetched["rows"]), content_hash(fetched))
+    print(f"[BFI82U] {date} upserted")
+    return True
+
+
+def run_one(
+    date: dt.date,
+    want_t86: bool,
+    want_bfi82u: bool,
+    calendar: Optional[TradingCalendar] = None,
+    schema: Optional[str] = None,
+    writer: Optional[BulkWriter] = None,
+) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"date": date}
+    if want_t86:
+        result["t86"] = run_dataset(date, "t86", calendar, schema, writer)
+    if want_bfi82u:
+        result["bfi82u"] = run_dataset(date, "bfi82u", calendar, schema, writer)
+    return result
+
+
+def build_calendar(args: argparse.Namespace) -> TradingCalendar:
+    holidays = load_holidays(args.holidays) if args.holidays else []
+    store = FileCalendarStore(args.calendar_file) if args.calendar_file else MongoCalendarStore()
+    return TradingCalendar(holidays, store=store, skip_weekends=not args.include_weekends)
+
+
+def print_transport_stats(stats: Dict[str, Any]) -> None:
+    print(
+        f"[HTTP] requests: {stats['requests']}, "
+        f"connections opened: {stats['connections_opened']}, "
+        f"reused: {stats['connections_reused']}, "
+        f"TLS resumed: {stats['tls_sessions_resumed']}, "
+        f"handshake: {stats['handshake_s']:.3f}s, response: {stats['response_s']:.3f}s"
+    )
+
+
+def print_range_summary(results: List[Dict[str, Any]]) -> None:
+    """One line per dataset: dates stored vs. dates without data (or whose fetch failed)."""
+    for name in ("t86", "bfi82u"):
+        got = [r[name] for r in results if name in r]
+        if got:
+            stored = sum(1 for v in got if v)
+            print(f"[RANGE] {name} stored: {stored} days, no data: {len(got) - stored} days")
+
+
+def print_write_stats(stats: Dict[str, Any]) -> None:
+    print(
+        f"[WRITE] jobs: {stats['jobs']}, batches: {stats['batches']}, ops: {stats['ops']}, "
+        f"fetchers blocked: {stats['blocked_s']:.3f}s, errors: {stats['errors']}"
+    )
+    for name in ("t86", "bfi82u"):
+        c = stats.get(name)
+        if c and any(c.values()):
+            print(f"[WRITE] {name} inserted: {c['inserted']}, changed: {c['changed']}, skipped: {c['skipped']}")
+
+
+def write_metrics_json(path: str, transport: Transport) -> None:
+    report = {"datasets": METRICS.summary(), "http": transport.stats.snapshot()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[METRICS] summary written to {path}")
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = argv if argv is not None else sys.argv[1:]
+
+    parser = argparse.ArgumentParser(description="TWSE crawler to MongoDB")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    def add_common(p: argparse.ArgumentParser):
+        g = p.add_mutually_exclusive_group(required=True)
+        g.add_argument("--date", help="單日 YYYY-MM-DD")
+        g.add_argument("--start", help="區間起 YYYY-MM-DD")
+        p.add_argument("--end", help="區間迄 YYYY-MM-DD（與 --start 搭配）")
+        p.add_argument("--sleep", type=float, default=0.6, help="每日請求間隔秒數")
+        p.add_argument("--concurrency", type=int, default=1,
+                       help="區間抓取時同時進行的請求數（>1 啟用 async 模式）")
+        p.add_argument("--rps", type=float, default=None,
+                       help="async 模式的全域每秒請求上限（預設 1/--sleep）")
+        p.add_argument("--base-url", default=None,
+                       help="TWSE 來源網址（預設 TWSE_BASE_URL 或 https://www.twse.com.tw；壓測時指向 fake_twse.py）")
+        p.add_argument("--pool-size", type=int, default=None,
+                       help="HTTP 連線池大小（預設 TWSE_HTTP_POOL_SIZE 或 --concurrency）")
+        p.add_argument("--holidays", help="假日清單檔（每行一個日期或 JSON 陣列）")
+        p.add_argument("--calendar-file",
+                       help="將學到的非交易日存到此 JSON 檔（預設存 MongoDB calendar collection）")
+        p.add_argument("--include-weekends", action="store_true", help="不跳過週末")
+        p.add_argument("--cache-dir", default=None,
+                       help="原始回應快取目錄（預設 TWSE_CACHE_DIR；未設定則不快取）")
+        p.add_argument("--cache-ttl", type=float, default=None,
+                       help="當天資料的快取秒數（預設 TWSE_CACHE_TTL 或 3600；歷史日期永不過期）")
+        p.add_argument("--offline", action="store_true", help="只從快取重播，不發出網路請求")
+        p.add_argument("--schema", choices=SCHEMAS, default=None,
+                       help="raw：保留千分位字串；typed：數值欄位轉 int64（預設 TWSE_SCHEMA 或 raw）")
+        p.add_argument("--resume", action=argparse.BooleanOptionalAction, default=True,
+                       help="區間抓取時跳過 ingest_ledger 已完成的 (報表, 日期)（預設開啟）")
+        p.add_argument("--workers", type=int, default=1,
+                       help="區間抓取時依日期分給 N 個行程（各自的 HTTP 連線池與 MongoDB client，共用 --rps 上限）")
+        p.add_argument("--writers", type=int, default=1,
+                       help="背景寫入 thread 數（0 = 抓完立即同步寫入）")
+        p.add_argument("--write-batch", type=int, default=None,
+                       help="每次 bulk_write 最多操作數（預設 TWSE_WRITE_BATCH 或 1000）")
+        p.add_argument("--write-queue", type=int, default=16,
+                       help="等待寫入的 (報表, 日期) 上限，滿了抓取端會暫停")
+        p.add_argument("--write-concern", default=None,
+                       help="寫入確認等級 w，例如 1 或 majority（預設 TWSE_WRITE_CONCERN 或 1）")
+        p.add_argument("--db-backend", choices=DB_BACKENDS, default="sync",
+                       help="區間抓取的 MongoDB 寫入方式：sync 為 pymongo（背景 writer 或 thread pool），"
+                            "async 為 async_db，在 event loop 上等待寫入（不使用 --writers）")
+        p.add_argument("--journal", action=argparse.BooleanOptionalAction, default=True,
+                       help="寫入需等 journal 落盤才確認（預設開啟）")
+        p.add_argument("--metrics-port", type=int, default=None,
+                       help="在 127.0.0.1:PORT/metrics 提供 Prometheus 格式的執行指標")
+        p.add_argument("--metrics-json", default=None, help="結束時將各階段指標摘要寫入此 JSON 檔")
+        p.add_argument("--rolling", action=argparse.BooleanOptionalAction, default=True,
+                       help="T86 匯入後更新 t86_rolling 的 5/20/60 日累計買賣超（預設開啟）")
+
+    p_t86 = sub.add_parser("t86", help="抓取 T86")
+    add_common(p_t86)
+
+    p_b = sub.add_parser("bfi82u", help="抓取 BFI82U")
+    add_common(p_b)
+
+    p_both = sub.add_parser("both", help="兩者皆抓")
+    add_common(p_both)
+
+    p_mig = sub.add_parser("migrate-layout", help="轉換 t86 collection 的儲存格式")
+    p_mig.add_argument("--to", choices=LAYOUTS, required=True, help="目標格式：rows、wide 或 timeseries")
+
+    p_exp = sub.add_parser("export", help="匯出 t86/bfi82u 為 Hive 分割的 Parquet 檔（需要 pyarrow）")
+    p_exp.add_argument("--dataset", choices=("t86", "bfi82u", "both"), default="both")
+    p_exp.add_argument("--out", required=True, help="輸出目錄")
+    p_exp.add_argument("--batch-size", type=int, default=5000, help="MongoDB cursor 每批讀取筆數")
+    p_exp.add_argument("--rows-per-file", type=int, default=100_000,
+                       help="每個 Parquet 檔最多筆數（同時是記憶體中暫存的上限）")
+    p_exp.add_argument("--full", action="store_true", help="忽略 watermark，重新匯出全部日期")
+
+    p_roll = sub.add_parser("rolling", help="t86_rolling 5/20/60 日累計買賣超")
+    roll_sub = p_roll.add_subparsers(dest="rolling_cmd", required=True)
+    p_rebuild = roll_sub.add_parser("rebuild", help="由 t86 最近 60 個交易日重新計算")
+    p_rebuild.add_argument("--end", help="以此日期（YYYY-MM-DD）為視窗最後一天（預設最新）")
+
+    args = parser.parse_args(argv)
+
+    if args.cmd == "rolling":
+        ensure_rolling_indexes()
+        days = rebuild_rolling(end=args.end)
+        print(f"[ROLLING] rebuilt from {days} trading days")
+        return 0
+
+    if args.cmd == "migrate-layout":
+        days = migrate_t86_layout(args.to)
+        print(f"[MIGRATE] t86 -> {args.to}: {days} days")
+        print(f"請設定環境變數 TWSE_LAYOUT_T86={args.to}，之後的寫入才會使用新格式")
+        return 0
+
+    if args.cmd == "export":
+        for name in wanted_datasets(args.dataset):
+            try:
+                res = export_dataset(name, args.out, batch_size=args.batch_size,
+                                     rows_per_file=args.rows_per_file, incremental=not args.full)
+            except RuntimeError as e:
+                print(e, file=sys.stderr)
+                return 2
+            print(f"[EXPORT] {name}: {res['rows']} rows, {res['files']} files, watermark {res['last_date']}")
+        return 0
+
+    ensure_indexes()
+    if args.rolling and "t86" in wanted_datasets(args.cmd):
+        ensure_rolling_indexes()
+    pool_size = args.pool_size or max(get_http_pool_size(), args.concurrency)
+    transport = configure_transport(pool_size)
+    if args.base_url:
+        configure_base_url(args.base_url)
+    cache_dir = args.cache_dir or get_cache_dir()
+    if args.offline and not cache_dir:
+        print("--offline 需要 --cache-dir 或 TWSE_CACHE_DIR", file=sys.stderr)
+        return 2
+    cache = configure_cache(cache_dir, args.cache_ttl, offline=args.offline)
+    if args.offline:
+        args.sleep = 0.0
+    datasets = wanted_datasets(args.cmd)
+    calendar = build_calendar(args)
+
+    metrics_server = serve_metrics(args.metrics_port) if args.metrics_port else None
+    if metrics_server:
+        print(f"[METRICS] http://127.0.0.1:{args.metrics_port}/metrics")
+    try:
+        if args.date:
+            d = parse_date(args.date)
+            run_one(d, want_t86="t86" in datasets, want_bfi82u="bfi82u" in datasets,
+                    calendar=calendar, schema=args.schema)
+            if args.rolling and "t86" in datasets:
+                refresh_rolling([d])
+            return 0
+        return run_range(args, datasets, calendar, transport, cache)
+    finally:
+        if args.metrics_json:
+            write_metrics_json(args.metrics_json, transport)
+        if metrics_server:
+            metrics_server.shutdown()
+
+
+def run_range(
+    args: argparse.Namespace,
+    datasets: List[str],
+    calendar: TradingCalendar,
+    transport: Transport,
+    cache: Optional[ResponseCache],
+) -> int:
+    if not args.start or not args.end:
+        print("--start 與 --end 需同時提供", file=sys.stderr)
+        return 2
+
+    start = parse_date(args.start)
+    end = parse_date(args.end)
+    if end < start:
+        print("end 需 >= start", file=sys.stderr)
+        return 2
+
+    if args.concurrency < 1:
+        print("--concurrency 需 >= 1", file=sys.stderr)
+        return 2
+    if args.workers < 1:
+        print("--workers 需 >= 1", file=sys.stderr)
+        return 2
+
+    dates = list(calendar.trading_days(start, end, datasets))
+    skipped = (end - start).days + 1 - len(dates)
+    if skipped:
+        print(f"[CALENDAR] skipping {skipped} non-trading days")
+
+    jobs = plan_jobs(dates, datasets)
+    if args.resume:
+        done = completed_jobs(datasets, start.isoformat(), end.isoformat())
+        remaining = [(d, name) for d, name in jobs if (name, d.isoformat()) not in done]
+        if len(remaining) < len(jobs):
+            print(f"[RESUME] skipping {len(jobs) - len(remaining)} completed (dataset, date) entries")
+        jobs = remaining
+
+    if args.workers > 1:
+        write_stats = run_workers(args, jobs, calendar, transport, cache)
+    else:
+        write_stats = run_jobs(args, jobs, calendar)
+
+    if args.rolling and "t86" in datasets:
+        refresh_rolling(sorted({d for d, name in jobs if name == "t86"}))
+
+    print_transport_stats(transport.stats.snapshot())
+    if write_stats:
+        print_write_stats(write_stats)
+    if cache:
+        stats = cache.stats()
+        print(f"[CACHE] hits: {stats['hits']}, misses: {stats['misses']}")
+    return 1 if write_stats and write_stats["errors"] else 0
+
+
+def refresh_rolling(dates: List[dt.date]) -> None:
+    """Materialize t86_rolling once the range's writes are acknowledged."""
+    if not dates:
+        return
+    t0 = time.perf_counter()
+    mode = update_rolling(d.isoformat() for d in dates)
+    print(f"[ROLLING] {mode} ({time.perf_counter() - t0:.3f}s)")
+
+
+def request_rps(args: argparse.Namespace) -> float:
+    """Global requests-per-second budget of a range run (0 = unlimited)."""
+    if args.rps is not None and not args.offline:
+        return args.rps
+    return 1.0 / args.sleep if args.sleep > 0 else 0.0
+
+
+def run_jobs(
+    args: argparse.Namespace,
+    jobs: List[Any],
+    calendar: TradingCalendar,
+    limiter: Optional[SharedRateLimiter] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Fetch and store `jobs` in this process; returns the writer stats.
+
+    With a `limiter` (worker processes) every job first takes a slot from
+    the shared budget instead of the per-process --sleep / --rps pacing.
+    """
+    write_concern = parse_write_concern(args.write_concern or get_write_concern(), args.journal)
+    if args.db_backend == "async":
+        return run_jobs_async_db(args, jobs, calendar, write_concern, limiter)
+
+    writer = None
+    if args.writers > 0:
+        writer = BulkWriter(args.write_batch or get_write_batch_size(), write_concern,
+                            max_pending=args.write_queue, threads=args.writers)
+
+    step = partial(run_dataset, calendar=calendar, schema=args.schema, writer=writer)
+    results: List[Dict[str, Any]] = []
+    try:
+        if args.concurrency > 1:
+            if limiter:
+                results = run_range_async(jobs, partial(_limited, limiter, step), concurrency=args.concurrency)
+            else:
+                results = run_range_async(jobs, step, concurrency=args.concurrency, rps=request_rps(args))
+        elif limiter:
+            by_date: Dict[dt.date, Dict[str, Any]] = {}
+            for d, name in jobs:
+                limiter.acquire()
+                by_date.setdefault(d, {"date": d})[name] = step(d, name)
+            results = list(by_date.values())
+        else:
+            pending: Dict[dt.date, List[str]] = {}
+            for d, name in jobs:
+                pending.setdefault(d, []).append(name)
+            for d, names in pending.items():
+                results.append(run_one(d, want_t86="t86" in names, want_bfi82u="bfi82u" in names,
+                                       calendar=calendar, schema=args.schema, writer=writer))
+                time.sleep(args.sleep)
+    finally:
+        write_stats = writer.close() if writer else None
+    print_range_summary(results)
+    return write_stats
+
+
+def run_jobs_async_db(
+    args: argparse.Namespace,
+    jobs: List[Any],
+    calendar: TradingCalendar,
+    write_concern: WriteConcern,
+    limiter: Optional[SharedRateLimiter] = None,
+) -> None:
+    """
+    `run_jobs` with --db-backend async: up to --concurrency fetches run in
+    the backfill thread pool and every write is awaited through async_db.
+    Write errors are raised, as with --writers 0, so there are no writer stats.
+    """
+    step: Any = partial(fetch_dataset, calendar=calendar, schema=args.schema)
+    if limiter:
+        step = partial(_limited, limiter, step)
+    store = partial(store_dataset_async, write_concern=write_concern)
+
+    async def main() -> List[Dict[str, Any]]:
+        try:
+            return await backfill(jobs, step, concurrency=args.concurrency,
+                                  rps=0.0 if limiter else request_rps(args), store=store)
+        finally:
+            await async_db.close()   # the client belongs to this event loop
+
+    print_range_summary(asyncio.run(main()))
+    return None
+
+
+def _limited(limiter: SharedRateLimiter, step: Any, d: dt.date, name: str) -> Any:
+    limiter.acquire()
+    return step(d, name)
+
+
+class _LearnedDays:
+    """Calendar store of a worker: collects no-data answers for the parent to record."""
+
+    def __init__(self) -> None:
+        self.days: List[Any] = []
+
+    def load(self) -> Dict[dt.date, Any]:
+        return {}
+
+    def mark(self, day: dt.date, dataset: str, no_data: Any) -> None:
+        self.days.append((day, dataset))
+
+
+_worker_limiter: Optional[SharedRateLimiter] = None
+
+
+def _init_worker(limiter: SharedRateLimiter) -> None:
+    global _worker_limiter
+    _worker_limiter = limiter
+
+
+def run_shard(args: argparse.Namespace, jobs: List[Any]) -> Dict[str, Any]:
+    """
+    Worker process entry point: run one shard with its own HTTP transport
+    and Mongo client, and return the counters the parent merges.
+    """
+    set_client(None)
+    METRICS.reset()
+    transport = configure_transport(args.pool_size or max(get_http_pool_size(), args.concurrency))
+    if args.base_url:
+        configure_base_url(args.base_url)
+    cache = configure_cache(args.cache_dir or get_cache_dir(), args.cache_ttl, offline=args.offline)
+    learned = _LearnedDays()
+    write_stats = run_jobs(args, jobs, TradingCalendar(store=learned), _worker_limiter)
+    return {
+        "pid": os.getpid(),
+        "jobs": len(jobs),
+        "http": transport.stats.counters(),
+        "cache": cache.stats() if cache else None,
+        "write": write_stats,
+        "metrics": METRICS.state(),
+        "no_data": learned.days,
+    }
+
+
+def merge_write_stats(total: Optional[Dict[str, Any]], stats: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Add one worker's writer stats to the running total (nested per-dataset counts included)."""
+    if not stats:
+        return total
+    if not total:
+        return dict(stats)
+    merged = dict(total)
+    for k, v in stats.items():
+        merged[k] = merge_write_stats(total.get(k), v) if isinstance(v, dict) else total.get(k, 0) + v
+    return merged
+
+
+def run_workers(
+    args: argparse.Namespace,
+    jobs: List[Any],
+    calendar: TradingCalendar,
+    transport: Transport,
+    cache: Optional[ResponseCache],
+) -> Optional[Dict[str, Any]]:
+    """
+    Split `jobs` by date across --workers processes sharing one request
+    budget, then merge their HTTP, cache, write and metrics counters into
+    this process so the usual summary (and --metrics-json) covers the run.
+    """
+    shards = shard_jobs(jobs, args.workers)
+    if not shards:
+        return None
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+    limiter = SharedRateLimiter(request_rps(args), ctx)
+    print(f"[WORKERS] {len(jobs)} jobs across {len(shards)} processes")
+
+    write_stats: Optional[Dict[str, Any]] = None
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=ctx,
+                             initializer=_init_worker, initargs=(limiter,)) as pool:
+        futures = [pool.submit(run_shard, args, shard) for shard in shards]
+        for fut in futures:
+            res = fut.result()
+            transport.stats.merge(res["http"])
+            if cache and res["cache"]:
+                cache.merge_stats(res["cache"])
+            METRICS.merge(res["metrics"])
+            for day, dataset in res["no_data"]:
+                calendar.mark_no_data(day, dataset)
+            write_stats = merge_write_stats(write_stats, res["write"])
+            errors = res["write"]["errors"] if res["write"] else 0
+            if errors:
+                print(f"[WORKERS] pid {res['pid']}: {res['jobs']} jobs, {errors} write errors")
+            else:
+                print(f"[WORKERS] pid {res['pid']}: {res['jobs']} jobs done")
+    return write_stats
@@ -12,3 +12,66 @@ def get_mongo_uri() -> str:
 def get_db_name() -> str:
     return os.getenv("MONGODB_DB", "twse")
 
+
+
+def get_base_url() -> str:
+    """TWSE origin, e.g. a local fake_twse.py server for load testing."""
+    return os.getenv("TWSE_BASE_URL", "https://www.twse.com.tw").rstrip("/")
+
+
+def get_http_pool_size() -> int:
+    return int(os.getenv("TWSE_HTTP_POOL_SIZE", "10"))
+
+
+def get_tls_cache_path() -> str | None:
+    return os.getenv("TWSE_TLS_CACHE") or None
+
+
+def get_cache_dir() -> str | None:
+    return os.getenv("TWSE_CACHE_DIR") or None
+
+
+def get_cache_ttl() -> float:
+    return float(os.getenv("TWSE_CACHE_TTL", "3600"))
+
+
+def get_schema() -> str:
+    return os.getenv("TWSE_SCHEMA", "raw")
+
+
+def get_json_decoder() -> str:
+    """auto (orjson when installed), json or orjson."""
+    return os.getenv("TWSE_JSON_DECODER", "auto")
+
+
+def get_layout(collection: str) -> str:
+    """Storage layout of a collection, e.g. TWSE_LAYOUT_T86=wide."""
+    return os.getenv(f"TWSE_LAYOUT_{collection.upper()}", "rows")
+
+
+def get_write_batch_size() -> int:
+    return int(os.getenv("TWSE_WRITE_BATCH", "1000"))
+
+
+def get_write_concern() -> str:
+    """`w` of the write concern used by the background writer, e.g. "1" or "majority"."""
+    return os.getenv("TWSE_WRITE_CONCERN", "1")
+
+
+def get_query_cache_size() -> int:
+    """Maximum number of cached query results (query.py)."""
+    return int(os.getenv("TWSE_QUERY_CACHE_SIZE", "1024"))
+
+
+def get_query_cache_ttl() -> float:
+    return float(os.getenv("TWSE_QUERY_CACHE_TTL", "300"))
+
+
+def get_query_refresh() -> float:
+    """Seconds between ingest_ledger checks for dates rewritten by other processes (0 = off)."""
+    return float(os.getenv("TWSE_QUERY_REFRESH", "5"))
+
+
+def get_mongo_pool_size() -> int:
+    """maxPoolSize of the async MongoDB client (async_db.py)."""
+    return int(os.getenv("TWSE_MONGO_POOL_SIZE", "100"))
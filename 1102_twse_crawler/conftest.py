@@ -0,0 +1,69 @@
+"""
+共用 pytest fixture：`mongo` 以 mongomock 取代 db.py 的 MongoClient（不需 mongod），
+`async_mongo` 再讓 async_db 以 AsyncMongomock 使用同一個 mongomock client。
+
+mongomock 尚未跟上 pymongo 4.x 的部分介面，由 mongomock_compat.py 在測試期間補上。
+沒有安裝 mongomock 時相關測試略過（pip install mongomock）。
+"""
+import pytest
+
+TEST_DB = "twse_test"
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """A fresh mongomock database used by db.py (and everything built on it)."""
+    mongomock = pytest.importorskip("mongomock")
+    import db
+    from mongomock_compat import patch_mongomock
+
+    patch_mongomock(monkeypatch.setattr)
+    monkeypatch.setenv("MONGODB_DB", TEST_DB)
+    for name in ("t86", "bfi82u"):
+        monkeypatch.delenv(f"TWSE_LAYOUT_{name.upper()}", raising=False)
+    client = mongomock.MongoClient()
+    db.set_client(client)
+    yield client[TEST_DB]
+    db.set_client(None)
+
+
+@pytest.fixture
+def async_mongo(mongo, monkeypatch):
+    """`mongo`, also used by async_db through an awaitable mongomock facade."""
+    import async_db
+    from mongomock_compat import AsyncMongomock
+
+    monkeypatch.setattr(async_db, "_new_client", lambda pool_size: AsyncMongomock(mongo.client))
+    async_db.configure()
+    yield mongo
+    async_db.configure()
+
+
+@pytest.fixture
+def fake_twse(monkeypatch):
+    """
+    Start fake_twse.py servers (keyword arguments as FakeTWSEServer) and
+    point twse_api at the last one; the endpoints, transport and response
+    cache of twse_api are restored afterwards.
+    """
+    import twse_api
+    from fake_twse import start_server
+
+    original = twse_api._transport
+    for name in ("T86_URL", "BFI82U_URL", "_transport", "_cache", "_cache_loaded"):
+        monkeypatch.setattr(twse_api, name, getattr(twse_api, name))
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault("n_stocks", 5)
+        server = start_server(**kwargs)
+        servers.append(server)
+        twse_api.configure_base_url(server.base_url)
+        return server
+
+    yield start
+    if twse_api._transport is not original and twse_api._transport is not None:
+        twse_api._transport.close()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
@@ -1,49 +1,417 @@
-from typing import Iterable, List, Dict, Any
-from pymongo import MongoClient, UpdateOne
+import datetime as dt
+import hashlib
+import json
+import os
+from typing import Callable, Iterable, Iterator, List, Dict, Any, NamedTuple, Optional, Sequence, Set, Tuple
+from pymongo import MongoClient, ReplaceOne, UpdateOne
 from pymongo.collection import Collection
+from pymongo.errors import OperationFailure
+from pymongo.write_concern import WriteConcern
 try:
-    from .config import get_mongo_uri, get_db_name
+    from .config import get_mongo_uri, get_db_name, get_layout
+    from .layouts import (LAYOUT_ROWS, LAYOUT_TIMESERIES, LAYOUT_WIDE, TIMESERIES_OPTIONS, is_wide,
+                          rows_to_wide, wide_to_rows, with_ts)
 except ImportError:
-    from config import get_mongo_uri, get_db_name
+    from config import get_mongo_uri, get_db_name, get_layout
+    from layouts import (LAYOUT_ROWS, LAYOUT_TIMESERIES, LAYOUT_WIDE, TIMESERIES_OPTIONS, is_wide,
+                         rows_to_wide, wide_to_rows, with_ts)
 
 
 _client: MongoClient | None = None
+_client_pid: int | None = None
 
 
 def _get_client() -> MongoClient:
-    global _client
-    if _client is None:
+    """
+    Module-wide client, rebuilt in a forked child: a MongoClient is not
+    fork-safe, so a child never reuses the parent's sockets or monitor threads.
+    """
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
         _client = MongoClient(get_mongo_uri())
+        _client_pid = os.getpid()
     return _client
 
 
+def set_client(client: MongoClient | None) -> None:
+    """Use `client` in this process; None makes the next call connect again."""
+    global _client, _client_pid
+    _client = client
+    _client_pid = os.getpid() if client is not None else None
+
+
+WriteListener = Callable[[str, Optional[Sequence[str]]], None]
+_write_listeners: List[WriteListener] = []
+
+
+def on_write(listener: WriteListener) -> None:
+    """
+    Call `listener(collection, dates)` after documents of `dates` in
+    `collection` were written; `dates` is None when the whole collection
+    was rewritten. Used by query.py to drop cached reads.
+    """
+    _write_listeners.append(listener)
+
+
+def notify_write(name: str, dates: Optional[Iterable[str]]) -> None:
+    days = sorted(set(dates)) if dates is not None else None
+    for listener in list(_write_listeners):
+        listener(name, days)
+
+
 def get_collection(name: str) -> Collection:
     db = _get_client()[get_db_name()]
     return db[name]
 
 
+def _write_collection(name: str, write_concern: Optional[WriteConcern] = None) -> Collection:
+    coll = get_collection(name)
+    return coll.with_options(write_concern=write_concern) if write_concern else coll
+
+
+def _is_timeseries(name: str) -> bool:
+    db = _get_client()[get_db_name()]
+    info = next(iter(db.list_collections(filter={"name": name})), None)
+    return bool(info) and info.get("type") == "timeseries"
+
+
+# 單一股票歷史查詢（query.stock_history）只要求這些欄位時，rows 格式可完全由
+# (stock_code, date, *HISTORY_FIELDS) 索引回答，不必讀取文件
+HISTORY_FIELDS = (
+    "外陸資買賣超股數(不含外資自營商)",
+    "外資自營商買賣超股數",
+    "投信買賣超股數",
+    "自營商買賣超股數",
+    "三大法人買賣超股數",
+)
+HISTORY_INDEX = "stock_history"
+
+
+IndexSpec = Tuple[List[Tuple[str, int]], Dict[str, Any]]
+
+# ensure_indexes() 建立的其他 collection 索引：(keys, create_index 參數)
+INDEXES: Dict[str, List[IndexSpec]] = {
+    "bfi82u": [([("date", 1)], {"unique": True})],
+    "calendar": [([("date", 1)], {"unique": True})],
+    "ingest_ledger": [([("dataset", 1), ("date", 1)], {"unique": True}), ([("ingested_at", 1)], {})],
+}
+
+
+def t86_indexes(layout: str) -> List[IndexSpec]:
+    """(keys, options) of the T86 indexes for `layout`; shared with async_db."""
+    if layout == LAYOUT_TIMESERIES:
+        # time-series collections 不支援 unique index；唯一性由 replace-by-day 寫入保證
+        return [([("stock_code", 1), ("ts", 1)], {}), ([("date", 1)], {})]
+    if layout == LAYOUT_WIDE:
+        return [([("date", 1)], {"unique": True}), ([("stock_codes", 1), ("date", 1)], {})]
+    return [([("date", 1), ("stock_code", 1)], {"unique": True}),
+            ([("stock_code", 1), ("date", 1), *((f, 1) for f in HISTORY_FIELDS)], {"name": HISTORY_INDEX})]
+
+
+def ensure_t86_indexes(name: str = "t86", layout: Optional[str] = None) -> None:
+    layout = layout or get_layout(name)
+    db = _get_client()[get_db_name()]
+    if layout == LAYOUT_TIMESERIES and name not in db.list_collection_names(filter={"name": name}):
+        db.create_collection(name, timeseries=TIMESERIES_OPTIONS)
+    for keys, options in t86_indexes(layout):
+        db[name].create_index(keys, **options)
+
+
 def ensure_indexes() -> None:
-    t86 = get_collection("t86")
-    t86.create_index([("date", 1), ("stock_code", 1)], unique=True)
+    ensure_t86_indexes()
+    for name, specs in INDEXES.items():
+        for keys, options in specs:
+            get_collection(name).create_index(keys, **options)
+
+
+HASH_FIELD = "_hash"
+TIMESERIES_HASH_PROJECTION = {"_id": 0, "stock_code": 1, HASH_FIELD: 1}
+
+
+class WriteCounts(NamedTuple):
+    """Rows written to T86, split by what happened to them."""
+    inserted: int = 0
+    changed: int = 0
+    skipped: int = 0
+
+
+def row_hash(doc: Dict[str, Any]) -> str:
+    """Short content hash of a T86 row, ignoring storage-only fields."""
+    data = {k: v for k, v in doc.items() if k not in ("_id", "ts", HASH_FIELD)}
+    return _digest(data)
+
+
+def _digest(payload: Any) -> str:
+    return hashlib.blake2b(_canonical(payload), digest_size=8).hexdigest()
+
+
+def group_by_date(docs: Iterable[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Rows keyed by their "date", in first-seen order (shared by the sync and async writers)."""
+    by_date: Dict[str, List[Dict[str, Any]]] = {}
+    for d in docs:
+        by_date.setdefault(d["date"], []).append(d)
+    return by_date
+
+
+def upsert_t86(docs: Iterable[Dict[str, Any]]) -> WriteCounts:
+    return write_t86(list(docs), "t86", get_layout("t86"))
+
+
+def write_t86(docs: List[Dict[str, Any]], name: str, layout: str,
+              write_concern: Optional[WriteConcern] = None) -> WriteCounts:
+    """
+    Write T86 row documents into collection `name` using `layout`.
+
+    Rows whose content hash matches the stored one are not sent at all.
+    Writes use `write_concern` when given (reads never need it).
+    """
+    coll = _write_collection(name, write_concern)
+    if layout == LAYOUT_WIDE:
+        counts = _replace_t86_wide(coll, docs)
+    elif layout == LAYOUT_TIMESERIES:
+        counts = _replace_t86_timeseries(coll, docs)
+    else:
+        counts = _upsert_t86_rows(coll, docs)
+    if counts.inserted or counts.changed:
+        notify_write(name, (d["date"] for d in docs))
+    return counts
+
+
+def plan_t86_rows(name: str, docs: List[Dict[str, Any]]) -> Tuple[List[UpdateOne], WriteCounts]:
+    """
+    Build upserts for the new or changed rows only.
+
+    Stored hashes are read with one projection query over the (date,
+    stock_code) index; rows stored before hashes existed count as changed.
+    """
+    if not docs:
+        return [], WriteCounts()
+    return t86_row_ops(docs, get_collection(name).find(*t86_hash_query(docs, LAYOUT_ROWS)))
 
-    bfi82u = get_collection("bfi82u")
-    bfi82u.create_index([("date", 1)], unique=True)
 
+def t86_hash_query(docs: List[Dict[str, Any]], layout: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(filter, projection) reading the stored hashes of `docs`' dates (rows or wide layout)."""
+    keys = {"date": 1, "stock_code": 1} if layout != LAYOUT_WIDE else {"date": 1}
+    return {"date": {"$in": sorted({d["date"] for d in docs})}}, {"_id": 0, **keys, HASH_FIELD: 1}
 
-def upsert_t86(docs: Iterable[Dict[str, Any]]) -> int:
-    coll = get_collection("t86")
+
+def t86_row_ops(docs: List[Dict[str, Any]], stored_docs: Iterable[Dict[str, Any]]
+                ) -> Tuple[List[UpdateOne], WriteCounts]:
+    """Upserts for the rows of `docs` whose hash differs from `stored_docs` (the hash query's result)."""
+    stored = {(d["date"], d.get("stock_code")): d.get(HASH_FIELD) for d in stored_docs}
     ops: List[UpdateOne] = []
+    inserted = changed = 0
     for d in docs:
-        key = {"date": d["date"], "stock_code": d.get("stock_code")}
-        ops.append(UpdateOne(key, {"$set": d}, upsert=True))
-    if not ops:
-        return 0
-    res = coll.bulk_write(ops, ordered=False)
-    # inserted + upserted + modified (counting as success)
-    return (res.upserted_count or 0) + (res.modified_count or 0)
+        key = (d["date"], d.get("stock_code"))
+        h = row_hash(d)
+        if key not in stored:
+            inserted += 1
+        elif stored[key] != h:
+            changed += 1
+        else:
+            continue
+        ops.append(UpdateOne({"date": key[0], "stock_code": key[1]}, {"$set": {**d, HASH_FIELD: h}}, upsert=True))
+    return ops, WriteCounts(inserted, changed, len(docs) - inserted - changed)
+
+
+def _upsert_t86_rows(coll: Collection, docs: List[Dict[str, Any]]) -> WriteCounts:
+    ops, counts = plan_t86_rows(coll.name, docs)
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+    return counts
+
+
+def _replace_t86_wide(coll: Collection, docs: List[Dict[str, Any]]) -> WriteCounts:
+    """
+    Write row documents as one wide document per date.
+
+    The hash covers the whole day, so a day is either skipped or rewritten.
+    """
+    if not docs:
+        return WriteCounts()
+    ops, counts = t86_wide_ops(docs, coll.find(*t86_hash_query(docs, LAYOUT_WIDE)))
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+    return counts
+
+
+def t86_wide_ops(docs: List[Dict[str, Any]], stored_docs: Iterable[Dict[str, Any]]
+                 ) -> Tuple[List[ReplaceOne], WriteCounts]:
+    """One replace per date whose day hash differs from `stored_docs` (the hash query's result)."""
+    by_date = group_by_date(docs)
+    stored = {d["date"]: d.get(HASH_FIELD) for d in stored_docs}
+    ops: List[ReplaceOne] = []
+    inserted = changed = skipped = 0
+    for day, rows in by_date.items():
+        h = _digest([row_hash(r) for r in rows])
+        if day not in stored:
+            inserted += len(rows)
+        elif stored[day] != h:
+            changed += len(rows)
+        else:
+            skipped += len(rows)
+            continue
+        ops.append(ReplaceOne({"date": day}, {**rows_to_wide(rows), HASH_FIELD: h}, upsert=True))
+    return ops, WriteCounts(inserted, changed, skipped)
+
+
+def _replace_t86_timeseries(coll: Collection, docs: List[Dict[str, Any]]) -> WriteCounts:
+    """
+    Time-series collections cannot upsert, so changed measurements are
+    deleted and re-inserted alongside the new ones; readers may briefly miss
+    a changed row. Deleting by a non-meta field needs MongoDB 7.0+.
+    """
+    inserted = changed = skipped = 0
+    for day, rows in group_by_date(docs).items():
+        fresh, stale = timeseries_day_split(rows, coll.find(timeseries_day_query(day), TIMESERIES_HASH_PROJECTION))
+        if stale:
+            try:
+                coll.delete_many(timeseries_day_query(day, [r.get("stock_code") for r in stale]))
+            except OperationFailure as e:
+                raise RuntimeError(TIMESERIES_DELETE_ERROR) from e
+        if fresh or stale:
+            coll.insert_many(with_ts(fresh + stale), ordered=False)
+        inserted += len(fresh)
+        changed += len(stale)
+        skipped += len(rows) - len(fresh) - len(stale)
+    return WriteCounts(inserted, changed, skipped)
+
+
+TIMESERIES_DELETE_ERROR = ("rewriting changed rows of a time-series t86 needs MongoDB 7.0+ "
+                           "(deletes filtered on date); use the rows or wide layout on older servers")
+
+
+def timeseries_day_query(day: str, stock_codes: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Filter on one day's measurements, served by the (date) index; shared with async_db."""
+    query: Dict[str, Any] = {"date": day}
+    if stock_codes is not None:
+        query["stock_code"] = {"$in": stock_codes}
+    return query
+
+
+def timeseries_day_split(rows: List[Dict[str, Any]], stored_docs: Iterable[Dict[str, Any]]
+                         ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """(new, changed) rows of one day, hashed, against that day's stored measurements."""
+    stored = {d.get("stock_code"): d.get(HASH_FIELD) for d in stored_docs}
+    fresh, stale = [], []
+    for r in rows:
+        h = row_hash(r)
+        code = r.get("stock_code")
+        if code not in stored:
+            fresh.append({**r, HASH_FIELD: h})
+        elif stored[code] != h:
+            stale.append({**r, HASH_FIELD: h})
+    return fresh, stale
+
+
+def read_t86_day(date: str, name: str = "t86") -> List[Dict[str, Any]]:
+    """Return one day's T86 rows in row form, whatever the stored layout."""
+    coll = get_collection(name)
+    rows: List[Dict[str, Any]] = []
+    for doc in coll.find({"date": date}, {"_id": 0, "ts": 0, HASH_FIELD: 0}):
+        rows.extend(wide_to_rows(doc) if is_wide(doc) else [doc])
+    return rows
+
+
+def iter_t86_days(name: str = "t86", start: Optional[str] = None, end: Optional[str] = None
+                  ) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    """Yield (date, rows) for each stored day in date order, whatever the layout."""
+    query: Dict[str, Any] = {}
+    if start or end:
+        query["date"] = {k: v for k, v in (("$gte", start), ("$lte", end)) if v}
+    for date in sorted(get_collection(name).distinct("date", query)):
+        yield date, read_t86_day(date, name)
+
+
+def _copy_t86(src: str, dst: str, layout: str) -> int:
+    days = 0
+    for _, rows in iter_t86_days(src):
+        write_t86(rows, dst, layout)
+        days += 1
+    return days
+
+
+def migrate_t86_layout(layout: str, name: str = "t86") -> int:
+    """
+    Rewrite collection `name` into `layout`, one day at a time, and return
+    the number of days migrated.
+
+    Normal collections are built in a temporary collection that is renamed
+    over the original. Time-series collections cannot be renamed, so for
+    that target the original is moved aside first and dropped at the end;
+    later rewrites of changed rows in that layout need MongoDB 7.0+.
+    """
+    if layout == LAYOUT_TIMESERIES:
+        old = f"{name}__old"
+        get_collection(old).drop()
+        get_collection(name).rename(old)
+        ensure_t86_indexes(name, layout)
+        days = _copy_t86(old, name, layout)
+        get_collection(old).drop()
+        notify_write(name, None)
+        return days
+
+    tmp = f"{name}__{layout}"
+    get_collection(tmp).drop()
+    ensure_t86_indexes(tmp, layout)
+    days = _copy_t86(name, tmp, layout)
+    if _is_timeseries(name):
+        get_collection(name).drop()
+        get_collection(tmp).rename(name)
+    else:
+        get_collection(tmp).rename(name, dropTarget=True)
+    notify_write(name, None)
+    return days
+
+
+def bfi82u_op(doc: Dict[str, Any]) -> UpdateOne:
+    return UpdateOne({"date": doc["date"]}, {"$set": doc}, upsert=True)
 
 
 def upsert_bfi82u(doc: Dict[str, Any]) -> None:
     coll = get_collection("bfi82u")
     coll.update_one({"date": doc["date"]}, {"$set": doc}, upsert=True)
+    notify_write("bfi82u", [doc["date"]])
+
+
+def load_no_data_days() -> Dict[str, List[str]]:
+    coll = get_collection("calendar")
+    return {d["date"]: d.get("no_data", []) for d in coll.find({}, {"_id": 0, "date": 1, "no_data": 1})}
+
+
+def mark_no_data_day(date: str, dataset: str) -> None:
+    coll = get_collection("calendar")
+    coll.update_one({"date": date}, {"$addToSet": {"no_data": dataset}}, upsert=True)
+
+
+def _canonical(payload: Any) -> bytes:
+    data = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return data.encode("utf-8")
+
+
+def content_hash(payload: Any) -> str:
+    return hashlib.sha256(_canonical(payload)).hexdigest()
+
+
+def completed_jobs(datasets: Sequence[str], start: str, end: str) -> Set[Tuple[str, str]]:
+    """
+    Return the (dataset, date) pairs already ingested in [start, end],
+    using one query served by the ledger's (dataset, date) index.
+    """
+    coll = get_collection("ingest_ledger")
+    cursor = coll.find(
+        {"dataset": {"$in": list(datasets)}, "date": {"$gte": start, "$lte": end}},
+        {"_id": 0, "dataset": 1, "date": 1},
+    )
+    return {(d["dataset"], d["date"]) for d in cursor}
+
+
+def ingest_ledger_update(dataset: str, date: str, rows: int, digest: str
+                         ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(filter, update) of one ledger entry; shared with async_db."""
+    return ({"dataset": dataset, "date": date},
+            {"$set": {"rows": rows, "hash": digest, "ingested_at": dt.datetime.now(dt.timezone.utc)}})
+
 
+def record_ingest(dataset: str, date: str, rows: int, digest: str) -> None:
+    get_collection("ingest_ledger").update_one(*ingest_ledger_update(dataset, date, rows, digest), upsert=True)
@@ -0,0 +1,86 @@
+"""
+JSON decoding and row assembly for TWSE responses.
+
+有安裝 orjson 時使用 orjson，否則使用標準函式庫 json（可用環境變數
+TWSE_JSON_DECODER=json|orjson 指定）。兩者都直接從回應的 bytes 解碼，
+不先轉成 str。每列資料以事先算好的欄位對應（fields 只處理一次）轉成 dict，
+而不是對每一列重新走訪 fields。
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+try:
+    from .config import get_json_decoder
+except ImportError:
+    from config import get_json_decoder
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+DECODERS: Dict[str, Callable[[bytes], Any]] = {"json": json.loads}
+if orjson is not None:
+    DECODERS["orjson"] = orjson.loads
+
+_loads: Optional[Callable[[bytes], Any]] = None
+
+
+def decoder_name(name: Optional[str] = None) -> str:
+    """Resolve "auto" (or None) to the fastest installed decoder."""
+    name = name or get_json_decoder()
+    if name == "auto":
+        return "orjson" if "orjson" in DECODERS else "json"
+    if name not in DECODERS:
+        raise ValueError(f"JSON decoder {name!r} is not available (installed: {', '.join(DECODERS)})")
+    return name
+
+
+def set_decoder(name: Optional[str] = None) -> str:
+    global _loads
+    resolved = decoder_name(name)
+    _loads = DECODERS[resolved]
+    return resolved
+
+
+def loads(body: bytes) -> Any:
+    """Decode a response body (bytes) with the configured decoder."""
+    if _loads is None:
+        set_decoder()
+    return _loads(body)
+
+
+def _present(fields: Sequence[str], names: Sequence[str]) -> List[str]:
+    return [n for n in names if n in fields]
+
+
+def row_records(fields: Sequence[str], rows: Sequence[Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Map each row onto `fields`; rows are cut to their common width."""
+    keys = tuple(fields)
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def t86_records(fields: Sequence[str], rows: Sequence[Sequence[Any]], date: str) -> List[Dict[str, Any]]:
+    """Row records plus the date / stock_code / stock_name keys stored with T86."""
+    keys = tuple(fields)
+    code_keys = _present(keys, ("證券代號", "股票代號"))
+    name_keys = _present(keys, ("證券名稱", "股票名稱"))
+    docs: List[Dict[str, Any]] = []
+    for row in rows:
+        m = dict(zip(keys, row))
+        code = name = None
+        for k in code_keys:
+            code = m.get(k)
+            if code:
+                break
+        for k in name_keys:
+            name = m.get(k)
+            if name:
+                break
+        m["date"] = date
+        m["stock_code"] = code or None
+        m["stock_name"] = name or None
+        docs.append(m)
+    return docs
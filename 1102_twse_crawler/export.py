@@ -0,0 +1,222 @@
+"""
+Streaming Parquet export of t86 / bfi82u.
+
+以 cursor 分批讀取 MongoDB（依 date 排序），寫成 Hive 分割的 Parquet 檔：
+
+    <out>/<dataset>/year=2024/month=11/part-<run>-00000.parquet
+
+記憶體中最多只保留 `rows_per_file` 筆資料。同一次匯出的所有檔案使用同一個
+schema：匯出前先由 MongoDB 彙整範圍內出現過的所有欄位（T86 在 2017-12 改過欄位），
+代號 / 名稱為字串，其餘數值欄位依 schema.py 轉成 int64。
+
+每個 dataset 目錄下的 `_watermark.json` 記錄已匯出的最後日期，增量匯出只讀取
+更新的日期。檔案先以暫存名稱（`.part-*.parquet.tmp`）寫出，watermark 寫入後才
+改成正式名稱；中途中斷時未提交的暫存檔會在下次匯出時刪除，不會重複匯出。
+需要 pyarrow（選用套件：pip install pyarrow）。
+"""
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from .db import HASH_FIELD, get_collection
+    from .layouts import is_wide, wide_to_rows
+    from .schema import TEXT_COLUMNS, int64_column, text_column
+except ImportError:
+    from db import HASH_FIELD, get_collection
+    from layouts import is_wide, wide_to_rows
+    from schema import TEXT_COLUMNS, int64_column, text_column
+
+WATERMARK_FILE = "_watermark.json"
+TMP_SUFFIX = ".tmp"
+
+# 每個 dataset 匯出檔最前面的欄位（字串），其餘依 TWSE 欄位順序
+KEY_COLUMNS = {"t86": ("date", "stock_code", "stock_name"), "bfi82u": ("date",)}
+_STORAGE_KEYS = frozenset({"_id", "ts", HASH_FIELD})
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("export 需要 pyarrow，請先執行：pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def _read_state(out_dir: str, dataset: str) -> Dict[str, Any]:
+    path = os.path.join(out_dir, dataset, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_watermark(out_dir: str, dataset: str) -> Optional[str]:
+    return _read_state(out_dir, dataset).get("last_date")
+
+
+def write_watermark(out_dir: str, dataset: str, last_date: Optional[str],
+                    pending: Sequence[str] = ()) -> None:
+    """
+    Atomically write the watermark. `pending` lists the committed part files
+    (relative to the dataset directory) still waiting to be renamed from
+    their temporary names.
+    """
+    path = os.path.join(out_dir, dataset, WATERMARK_FILE)
+    state: Dict[str, Any] = {"last_date": last_date, "exported_at": time.time()}
+    if pending:
+        state["pending"] = list(pending)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _tmp_name(part: str) -> str:
+    head, tail = os.path.split(part)
+    return os.path.join(head, f".{tail}{TMP_SUFFIX}")
+
+
+def _publish(root: str, parts: Sequence[str]) -> None:
+    for part in parts:
+        tmp = os.path.join(root, _tmp_name(part))
+        if os.path.exists(tmp):
+            os.replace(tmp, os.path.join(root, part))
+
+
+def recover(out_dir: str, dataset: str) -> None:
+    """
+    Finish the renames of a run that crashed after committing its watermark,
+    and delete part files of runs that crashed before committing.
+    """
+    root = os.path.join(out_dir, dataset)
+    state = _read_state(out_dir, dataset)
+    if state.get("pending"):
+        _publish(root, state["pending"])
+        write_watermark(out_dir, dataset, state.get("last_date"))
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            if name.startswith(".part-") and name.endswith(TMP_SUFFIX):
+                os.remove(os.path.join(dirpath, name))
+
+
+def export_columns(dataset: str, since: Optional[str] = None) -> List[str]:
+    """
+    Every column of `dataset` newer than `since`, in first-seen order.
+
+    Collected with one aggregation (keys of row documents, `fields` of wide
+    T86 / BFI82U documents), so columns that only appear in later dates are
+    part of the schema of the first file too.
+    """
+    query: Dict[str, Any] = {"date": {"$gt": since}} if since else {}
+    keys = {"$map": {"input": {"$objectToArray": "$$ROOT"}, "in": "$$this.k"}}
+    pipeline = [
+        {"$match": query},
+        {"$project": {"_id": 0, "date": 1, "keys": {"$ifNull": ["$fields", keys]}}},
+        {"$unwind": {"path": "$keys", "includeArrayIndex": "pos"}},
+        {"$group": {"_id": "$keys", "date": {"$min": "$date"}, "pos": {"$min": "$pos"}}},
+    ]
+    found = sorted(get_collection(dataset).aggregate(pipeline), key=lambda d: (d["date"], d["pos"]))
+    head = KEY_COLUMNS[dataset]
+    return list(head) + [d["_id"] for d in found if d["_id"] not in head and d["_id"] not in _STORAGE_KEYS]
+
+
+def arrow_schema(pa: Any, dataset: str, columns: Sequence[str]) -> Any:
+    """Key and text columns as strings, every other column as int64."""
+    text = set(KEY_COLUMNS[dataset]) | TEXT_COLUMNS
+    return pa.schema([(c, pa.string() if c in text else pa.int64()) for c in columns])
+
+
+def iter_rows(dataset: str, since: Optional[str] = None, batch_size: int = 5000) -> Iterator[Dict[str, Any]]:
+    """Stream flat rows of `dataset` in date order, newer than `since`; T86 wide documents are expanded."""
+    query: Dict[str, Any] = {"date": {"$gt": since}} if since else {}
+    projection = {"_id": 0, "ts": 0, HASH_FIELD: 0}
+    cursor = get_collection(dataset).find(query, projection).sort("date", 1).batch_size(batch_size)
+    if dataset == "bfi82u":
+        for doc in cursor:
+            for row in doc.get("rows", []):
+                yield {"date": doc["date"], **row}
+        return
+    for doc in cursor:
+        if is_wide(doc):
+            yield from wide_to_rows(doc)
+        else:
+            yield doc
+
+
+def _table(pa: Any, schema: Any, rows: Sequence[Dict[str, Any]]) -> Any:
+    arrays = []
+    for field in schema:
+        values = [row.get(field.name) for row in rows]
+        if pa.types.is_string(field.type):
+            arrays.append(pa.array(text_column(values), type=field.type))
+        else:
+            arrays.append(pa.array(int64_column(values), type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _partition(date: str) -> Tuple[str, str]:
+    return date[:4], date[5:7]
+
+
+def export_dataset(
+    dataset: str,
+    out_dir: str,
+    batch_size: int = 5000,
+    rows_per_file: int = 100_000,
+    incremental: bool = True,
+) -> Dict[str, Any]:
+    """
+    Export one collection; returns {"rows", "files", "last_date"}.
+
+    Only rows with a date after the watermark are read when `incremental`.
+    Part files are written under temporary names and renamed once the
+    watermark (listing them as pending) has been written.
+    """
+    pa, pq = _require_pyarrow()
+    root = os.path.join(out_dir, dataset)
+    os.makedirs(root, exist_ok=True)
+    recover(out_dir, dataset)
+    since = read_watermark(out_dir, dataset) if incremental else None
+    run_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    schema = arrow_schema(pa, dataset, export_columns(dataset, since))
+
+    parts: List[str] = []
+    buffer: List[Dict[str, Any]] = []
+    current: Optional[Tuple[str, str]] = None
+    files = 0
+    rows = 0
+    last_date: Optional[str] = None
+
+    def flush() -> None:
+        nonlocal files, buffer
+        if not buffer or current is None:
+            return
+        year, month = current
+        part = os.path.join(f"year={year}", f"month={month}", f"part-{run_id}-{files:05d}.parquet")
+        os.makedirs(os.path.join(root, os.path.dirname(part)), exist_ok=True)
+        pq.write_table(_table(pa, schema, buffer), os.path.join(root, _tmp_name(part)))
+        parts.append(part)
+        files += 1
+        buffer = []
+
+    for row in iter_rows(dataset, since, batch_size):
+        part = _partition(row["date"])
+        if part != current or len(buffer) >= rows_per_file:
+            flush()
+            current = part
+        buffer.append(row)
+        rows += 1
+        last_date = row["date"]
+    flush()
+
+    if last_date:
+        write_watermark(out_dir, dataset, last_date, pending=parts)
+        _publish(root, parts)
+        write_watermark(out_dir, dataset, last_date)
+    return {"rows": rows, "files": files, "last_date": last_date or since}
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+本機假 TWSE 伺服器：提供 rwd/zh/fund/T86 與 BFI82U 的 JSON / HTML 回應
+（依 response=json|html 參數），資料依日期以固定亂數種子產生，可用於壓測與
+benchmark（不需連網）。可模擬：
+- 延遲：--latency 秒，加上 0 ~ --jitter 秒的隨機延遲
+- 錯誤：--error-rate 比例的請求回傳 --error-status（預設 500）
+- 假日：週末與 --holidays 檔案中的日期回傳「查無資料」
+- 限流：每秒超過 --throttle-rps 個請求時回傳 429（含 Retry-After）
+
+爬蟲端以 --base-url（或 TWSE_BASE_URL）指向此伺服器：
+    python fake_twse.py --port 8765 --latency 0.05 --error-rate 0.05 --throttle-rps 20
+    python crawler.py both --start 2024-01-01 --end 2024-03-31 --base-url http://127.0.0.1:8765
+"""
+import argparse
+import collections
+import html
+import json
+import random
+import threading
+import time
+import datetime as dt
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Collection, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from synthetic import BFI82U_FIELDS, T86_FIELDS, bfi82u_rows, t86_rows
+from trading_calendar import load_holidays
+
+
+NO_DATA_STAT = "很抱歉，沒有符合條件的資料!"
+
+
+def _is_trading_day(d: dt.date, holidays: Collection[dt.date] = ()) -> bool:
+    return d.weekday() < 5 and d not in holidays
+
+
+def _parse_yyyymmdd(s: Optional[str]) -> Optional[dt.date]:
+    try:
+        return dt.datetime.strptime(s or "", "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def build_payload(path: str, query: Dict[str, List[str]], n_stocks: int = 1000,
+                  holidays: Collection[dt.date] = ()) -> Dict[str, Any]:
+    if path.endswith("/T86"):
+        d = _parse_yyyymmdd(query.get("date", [None])[0])
+        if d is None or not _is_trading_day(d, holidays):
+            return {"stat": NO_DATA_STAT, "total": 0}
+        return {
+            "stat": "OK",
+            "date": d.strftime("%Y%m%d"),
+            "title": f"{d.year - 1911}年{d.month:02d}月{d.day:02d}日 三大法人買賣超日報",
+            "fields": T86_FIELDS,
+            "data": t86_rows(d, n_stocks),
+        }
+    d = _parse_yyyymmdd(query.get("dayDate", [None])[0])
+    if d is None or not _is_trading_day(d, holidays):
+        return {"stat": NO_DATA_STAT, "total": 0}
+    return {
+        "stat": "OK",
+        "date": d.strftime("%Y%m%d"),
+        "title": f"{d.year - 1911}年{d.month:02d}月{d.day:02d}日 三大法人買賣金額統計表",
+        "fields": BFI82U_FIELDS,
+        "data": bfi82u_rows(d),
+    }
+
+
+def render_html(payload: Dict[str, Any]) -> str:
+    """Render a payload the way TWSE's response=html does: one table, title row + fields in thead."""
+    if payload.get("stat") != "OK":
+        return f"<html><body><div>{html.escape(payload.get('stat', ''))}</div></body></html>"
+    fields = payload["fields"]
+    head = "".join(f"<th>{html.escape(f)}</th>" for f in fields)
+    body = "".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(v))}</td>" for v in row) + "</tr>"
+        for row in payload["data"]
+    )
+    return (
+        "<html><head><meta charset=\"UTF-8\"></head><body><table>"
+        f"<thead><tr><th colspan=\"{len(fields)}\">{html.escape(payload['title'])}</th></tr>"
+        f"<tr>{head}</tr></thead><tbody>{body}</tbody></table></body></html>"
+    )
+
+
+class FakeTWSEServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        addr: Tuple[str, int],
+        latency: float = 0.0,
+        n_stocks: int = 1000,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        holidays: Collection[dt.date] = (),
+        throttle_rps: float = 0.0,
+        seed: int = 0,
+    ):
+        super().__init__(addr, FakeTWSEHandler)
+        self.latency = latency
+        self.n_stocks = n_stocks
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.holidays = frozenset(holidays)
+        self.throttle_rps = throttle_rps
+        self.request_count = 0
+        self.error_count = 0
+        self.throttled_count = 0
+        self._count_lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._recent: collections.deque = collections.deque()
+
+    def _draw(self) -> Tuple[float, bool]:
+        """Pick this request's extra delay and whether it fails (seeded, thread-safe)."""
+        with self._count_lock:
+            return self._rng.uniform(0, self.jitter), self._rng.random() < self.error_rate
+
+    def _throttled(self) -> bool:
+        """Sliding one-second window over every client."""
+        if self.throttle_rps <= 0:
+            return False
+        now = time.monotonic()
+        with self._count_lock:
+            while self._recent and now - self._recent[0] >= 1.0:
+                self._recent.popleft()
+            if len(self._recent) >= self.throttle_rps:
+                self.throttled_count += 1
+                return True
+            self._recent.append(now)
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        with self._count_lock:
+            return {"requests": self.request_count, "errors": self.error_count, "throttled": self.throttled_count}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class FakeTWSEHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeTWSEServer
+
+    def do_GET(self) -> None:
+        with self.server._count_lock:
+            self.server.request_count += 1
+        url = urlparse(self.path)
+        if url.path not in ("/rwd/zh/fund/T86", "/rwd/zh/fund/BFI82U"):
+            self.send_error(404)
+            return
+        if self.server._throttled():
+            self._send(429, b"Too Many Requests", "text/plain; charset=utf-8", {"Retry-After": "1"})
+            return
+        extra, fail = self.server._draw()
+        if self.server.latency or extra:
+            time.sleep(self.server.latency + extra)
+        if fail:
+            with self.server._count_lock:
+                self.server.error_count += 1
+            self._send(self.server.error_status, b"Internal Server Error", "text/plain; charset=utf-8")
+            return
+        query = parse_qs(url.query)
+        payload = build_payload(url.path, query, self.server.n_stocks, self.server.holidays)
+        if query.get("response", ["json"])[0] == "html":
+            self._send(200, render_html(payload).encode("utf-8"), "text/html; charset=utf-8")
+        else:
+            self._send(200, json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                       "application/json; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str, headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **kwargs: Any) -> FakeTWSEServer:
+    """Start the fake server on a background thread and return it."""
+    server = FakeTWSEServer((host, port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake TWSE endpoint for local load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="每個請求的延遲秒數")
+    parser.add_argument("--stocks", type=int, default=1000, help="T86 每日股票數")
+    parser.add_argument("--jitter", type=float, default=0.0, help="額外隨機延遲上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="回傳錯誤的請求比例（0 ~ 1）")
+    parser.add_argument("--error-status", type=int, default=500, help="錯誤回應的 HTTP 狀態碼")
+    parser.add_argument("--holidays", help="假日清單檔（每行一個日期或 JSON 陣列），回傳查無資料")
+    parser.add_argument("--throttle-rps", type=float, default=0.0,
+                        help="每秒請求上限，超過回傳 429（0 = 不限流）")
+    parser.add_argument("--seed", type=int, default=0, help="延遲與錯誤的亂數種子")
+    args = parser.parse_args()
+
+    server = FakeTWSEServer(
+        (args.host, args.port),
+        latency=args.latency,
+        n_stocks=args.stocks,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        holidays=load_holidays(args.holidays) if args.holidays else (),
+        throttle_rps=args.throttle_rps,
+        seed=args.seed,
+    )
+    print(f"Fake TWSE listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"[FAKE] {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()
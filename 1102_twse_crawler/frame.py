@@ -0,0 +1,236 @@
+"""
+Columnar in-memory form of one day's T86 table.
+
+`fetch_t86` 每天回傳約 1000 個 dict，每個 dict 重複 19 個中文欄位名稱，數值是
+Int64 物件；多年份的資料放在記憶體中分析時會用掉數 GB。`T86DayFrame` 改以「欄」
+存放一天的資料：
+
+- 數值欄位：`array('q')`（int64，每格 8 bytes），無法解析的格子另以遮罩記錄為 None
+- 代號 / 名稱等文字欄位：tuple，字串經 `sys.intern`，多天之間共用同一個物件
+- 欄位名稱每天只存一次
+
+`frame.stock("2330")` 回傳不複製資料的單列檢視，`frame.slice(i, j)` 的數值欄位是
+原陣列的 memoryview（不複製）；需要寫入 MongoDB 時才以 `to_records()` 轉成與
+typed schema 相同的文件。數值欄位的 memoryview 可直接交給 `numpy.asarray`（不複製）。
+
+    from frame import T86DayFrame
+    frame = fetch_t86_frame(dt.date(2024, 11, 1))
+    frame.stock("2330")["投信買賣超股數"]
+    frame.column("外陸資買賣超股數(不含外資自營商)")      # memoryview('q')
+    write_t86(frame.to_records(), "t86", layout)
+"""
+from __future__ import annotations
+
+import sys
+from array import array
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from bson.int64 import Int64
+
+try:
+    from .schema import INT64_MAX, INT64_MIN, TEXT_COLUMNS
+except ImportError:
+    from schema import INT64_MAX, INT64_MIN, TEXT_COLUMNS
+
+CODE_KEYS = ("證券代號", "股票代號")
+NAME_KEYS = ("證券名稱", "股票名稱")
+_ROW_KEYS = ("date", "stock_code", "stock_name")
+# storage-only fields a stored document may carry (the ones db.row_hash ignores)
+_STORAGE_KEYS = ("_id", "ts", "_hash")
+
+Column = Union[memoryview, Tuple[Optional[str], ...]]
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """int value, or None when missing, unparsable or outside int64 (as schema.int64_column)."""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        n = int(value)
+    else:
+        try:
+            n = int(str(value).replace(",", "").strip())
+        except ValueError:
+            return None
+    return n if INT64_MIN <= n <= INT64_MAX else None
+
+
+def _int_column(values: Sequence[Any]) -> Tuple[memoryview, Optional[memoryview]]:
+    """(int64 values, null mask or None); missing cells are stored as 0 and flagged in the mask."""
+    try:
+        if all(type(v) is str for v in values):
+            return memoryview(array("q", map(int, "\n".join(values).replace(",", "").split("\n")))), None
+    except (ValueError, OverflowError):   # blank / "--" cells, or a value outside int64
+        pass
+    parsed = [_to_int(v) for v in values]
+    data = array("q", [0 if v is None else v for v in parsed])
+    if all(v is not None for v in parsed):
+        return memoryview(data), None
+    return memoryview(data), memoryview(bytearray(v is None for v in parsed))
+
+
+def _text_column(values: Sequence[Any]) -> Tuple[Optional[str], ...]:
+    return tuple(None if v is None else sys.intern(str(v).strip()) for v in values)
+
+
+def _first_present(columns: Sequence[Tuple[Optional[str], ...]], n: int) -> Tuple[Optional[str], ...]:
+    """Per row, the first non-empty value among `columns` (as t86_records picks stock_code / stock_name)."""
+    return tuple(next((col[i] for col in columns if col[i]), None) for i in range(n))
+
+
+class T86DayFrame:
+    """
+    One day of T86 in column form.
+
+    `fields` keeps the TWSE column order; numeric fields are int64
+    memoryviews and text fields are tuples of interned strings. `codes` and
+    `names` are the per-row stock_code / stock_name (sharing the text
+    column's string objects).
+    """
+
+    __slots__ = ("date", "fields", "codes", "names", "_columns", "_nulls", "_index")
+
+    def __init__(self, date: str, fields: Sequence[str], columns: Dict[str, Column],
+                 nulls: Optional[Dict[str, memoryview]] = None,
+                 codes: Optional[Tuple[Optional[str], ...]] = None,
+                 names: Optional[Tuple[Optional[str], ...]] = None):
+        self.date = date
+        self.fields: Tuple[str, ...] = tuple(fields)
+        self._columns = columns
+        self._nulls = nulls or {}
+        n = len(columns[self.fields[0]]) if self.fields else 0
+        text = [columns[k] for k in CODE_KEYS if k in columns]
+        self.codes = codes if codes is not None else _first_present(text, n)
+        text = [columns[k] for k in NAME_KEYS if k in columns]
+        self.names = names if names is not None else _first_present(text, n)
+        self._index: Optional[Dict[str, int]] = None
+
+    # -- construction ------------------------------------------------------
+
+    @classmethod
+    def from_payload(cls, fields: Sequence[str], rows: Sequence[Sequence[Any]], date: str) -> "T86DayFrame":
+        """Build from a T86 JSON payload's `fields` / `data` (rows cut to their common width)."""
+        if not rows:
+            return cls(date, (), {})
+        width = min(len(fields), min(len(r) for r in rows))
+        fields = [sys.intern(f) for f in fields[:width]]
+        columns: Dict[str, Column] = {}
+        nulls: Dict[str, memoryview] = {}
+        for name, values in zip(fields, zip(*(r[:width] for r in rows))):
+            if name in TEXT_COLUMNS:
+                columns[name] = _text_column(values)
+            else:
+                columns[name], mask = _int_column(values)
+                if mask is not None:
+                    nulls[name] = mask
+        return cls(date, fields, columns, nulls)
+
+    @classmethod
+    def from_records(cls, docs: Sequence[Dict[str, Any]]) -> "T86DayFrame":
+        """Build from row documents (`fetch_t86` output or `db.read_t86_day`), raw or typed."""
+        if not docs:
+            raise ValueError("from_records needs at least one row")
+        fields = [k for k in docs[0] if k not in _ROW_KEYS and k not in _STORAGE_KEYS]
+        frame = cls.from_payload(fields, [[d.get(f) for f in fields] for d in docs], docs[0]["date"])
+        frame.codes = _text_column([d.get("stock_code") for d in docs])
+        frame.names = _text_column([d.get("stock_name") for d in docs])
+        return frame
+
+    # -- access ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __repr__(self) -> str:
+        return f"T86DayFrame(date={self.date!r}, rows={len(self)}, fields={len(self.fields)})"
+
+    def column(self, name: str) -> Column:
+        """The column as stored: an int64 memoryview (zero-copy) or a tuple of strings."""
+        return self._columns[name]
+
+    def nulls(self, name: str) -> Optional[memoryview]:
+        """Byte mask of cells that could not be parsed (1 = None), or None when there are none."""
+        return self._nulls.get(name)
+
+    def value(self, i: int, name: str) -> Any:
+        if name == "date":
+            return self.date
+        if name == "stock_code":
+            return self.codes[i]
+        if name == "stock_name":
+            return self.names[i]
+        mask = self._nulls.get(name)
+        if mask is not None and mask[i]:
+            return None
+        return self._columns[name][i]
+
+    def index_of(self, code: str) -> Optional[int]:
+        if self._index is None:
+            self._index = {c: i for i, c in enumerate(self.codes) if c is not None}
+        return self._index.get(code)
+
+    def stock(self, code: str) -> Optional["T86Row"]:
+        """A read-only view of one stock's row (no values are copied), or None."""
+        i = self.index_of(code)
+        return None if i is None else T86Row(self, i)
+
+    def slice(self, start: int, stop: int) -> "T86DayFrame":
+        """Rows [start, stop) as a frame whose numeric columns are views of this frame's arrays."""
+        columns = {name: col[start:stop] for name, col in self._columns.items()}
+        nulls = {name: mask[start:stop] for name, mask in self._nulls.items()}
+        return T86DayFrame(self.date, self.fields, columns, nulls, self.codes[start:stop], self.names[start:stop])
+
+    def __iter__(self) -> Iterator["T86Row"]:
+        return (T86Row(self, i) for i in range(len(self)))
+
+    # -- conversion --------------------------------------------------------
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """Row documents identical to `t86_records(fields, type_rows(fields, rows), date)`."""
+        columns = []
+        for name in self.fields:
+            col = self._columns[name]
+            if isinstance(col, tuple):
+                columns.append(col)
+                continue
+            values = list(map(Int64, col.tolist()))
+            mask = self._nulls.get(name)
+            if mask is not None:
+                values = [None if m else v for v, m in zip(values, mask)]
+            columns.append(values)
+        keys = self.fields + _ROW_KEYS
+        return [dict(zip(keys, (*row, self.date, code, name)))
+                for row, code, name in zip(zip(*columns), self.codes, self.names)]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns (numeric buffers plus tuple slots)."""
+        total = sys.getsizeof(self.codes) + sys.getsizeof(self.names)
+        for col in self._columns.values():
+            total += col.nbytes if isinstance(col, memoryview) else sys.getsizeof(col)
+        return total + sum(m.nbytes for m in self._nulls.values())
+
+
+class T86Row(Mapping):
+    """Row `i` of a T86DayFrame, read through to the frame's columns."""
+
+    __slots__ = ("_frame", "_i")
+
+    def __init__(self, frame: T86DayFrame, i: int):
+        self._frame = frame
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        frame = self._frame
+        if key not in frame._columns and key not in _ROW_KEYS:
+            raise KeyError(key)
+        return frame.value(self._i, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._frame.fields + _ROW_KEYS)
+
+    def __len__(self) -> int:
+        return len(self._frame.fields) + len(_ROW_KEYS)
+
+    def __repr__(self) -> str:
+        return f"T86Row({self._frame.date!r}, {self._frame.codes[self._i]!r})"
@@ -0,0 +1,85 @@
+"""
+Storage layouts for T86.
+
+- rows：每 (date, stock_code) 一筆文件（原本的格式）
+- wide：每個交易日一筆文件，欄位存成陣列，並以 stock_codes 陣列作為股票索引：
+
+    {
+      "date": "2024-11-01",
+      "fields": ["證券代號", "證券名稱", ...],
+      "stock_codes": ["2330", "2317", ...],
+      "stock_names": ["台積電", "鴻海", ...],
+      "columns": {"證券代號": [...], "外陸資買進股數(不含外資自營商)": [...], ...}
+    }
+
+中文欄位名稱每天只存一次，索引也只需要 (date)。
+
+- timeseries：MongoDB 原生 time-series collection，timeField 為 ts（交易日的
+  datetime），metaField 為 stock_code，適合「單一股票 N 天」的查詢。
+"""
+from __future__ import annotations
+
+import datetime as dt
+from typing import Any, Dict, List, Sequence
+
+LAYOUT_ROWS = "rows"
+LAYOUT_WIDE = "wide"
+LAYOUT_TIMESERIES = "timeseries"
+LAYOUTS = (LAYOUT_ROWS, LAYOUT_WIDE, LAYOUT_TIMESERIES)
+
+TIMESERIES_OPTIONS = {"timeField": "ts", "metaField": "stock_code", "granularity": "hours"}
+
+_ROW_KEYS = ("date", "stock_code", "stock_name")
+
+
+def is_wide(doc: Dict[str, Any]) -> bool:
+    return "stock_codes" in doc and "columns" in doc
+
+
+def rows_to_wide(docs: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fold one day's row documents into a single wide document."""
+    if not docs:
+        raise ValueError("rows_to_wide needs at least one row")
+    fields = [k for k in docs[0] if k not in _ROW_KEYS and k != "_id"]
+    return {
+        "date": docs[0]["date"],
+        "fields": fields,
+        "stock_codes": [d.get("stock_code") for d in docs],
+        "stock_names": [d.get("stock_name") for d in docs],
+        "columns": {f: [d.get(f) for d in docs] for f in fields},
+    }
+
+
+def wide_to_rows(doc: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand a wide document back into the row documents it was built from."""
+    fields: List[str] = doc["fields"]
+    columns = [doc["columns"][f] for f in fields]
+    date = doc["date"]
+    rows: List[Dict[str, Any]] = []
+    for i, (code, name) in enumerate(zip(doc["stock_codes"], doc["stock_names"])):
+        m = {f: col[i] for f, col in zip(fields, columns)}
+        m["date"] = date
+        m["stock_code"] = code
+        m["stock_name"] = name
+        rows.append(m)
+    return rows
+
+
+def wide_row(doc: Dict[str, Any], stock_code: str) -> Dict[str, Any] | None:
+    """Pick one stock's row out of a wide document."""
+    try:
+        i = doc["stock_codes"].index(stock_code)
+    except ValueError:
+        return None
+    m = {f: doc["columns"][f][i] for f in doc["fields"]}
+    m.update(date=doc["date"], stock_code=stock_code, stock_name=doc["stock_names"][i])
+    return m
+
+
+def day_ts(date: str) -> dt.datetime:
+    """Time-series timestamp for an ISO trading date (midnight UTC)."""
+    return dt.datetime.strptime(date, "%Y-%m-%d").replace(tzinfo=dt.timezone.utc)
+
+
+def with_ts(docs: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [{**d, "ts": day_ts(d["date"])} for d in docs]
@@ -0,0 +1,196 @@
+"""
+Per-stage metrics for crawler runs.
+
+每個階段依 dataset（t86 / bfi82u）記錄：
+- twse_fetch_seconds：每次 HTTP 請求耗時（含重試的每一次）
+- twse_response_bytes：回應大小
+- twse_retries_total / twse_fetch_failures_total：重試次數 / 重試用盡仍失敗的次數
+- twse_decode_seconds / twse_parse_seconds：JSON 解碼 / 列組裝（含 typed 轉換）耗時
+- twse_rows：每日列數
+- twse_mongo_write_seconds：MongoDB 寫入耗時
+
+每次記錄只是一次 lock + bisect，長時間執行也可以一直開著。`serve_metrics(port)`
+在本機提供 Prometheus 文字格式的 /metrics；`summary()` 產生結束時的 JSON 摘要。
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Sequence, Tuple
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 2_500_000, 5_000_000)
+ROWS_BUCKETS = (1, 10, 100, 500, 1_000, 1_500, 2_000, 5_000, 10_000, 20_000)
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile (None past the last bucket)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            count, total = self.count, self.sum
+        return {
+            "count": count,
+            "sum": round(total, 6),
+            "mean": round(total / count, 6) if count else None,
+            "p50_le": self.quantile(0.5),
+            "p95_le": self.quantile(0.95),
+        }
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1) -> None:
+        with self._lock:
+            self.value += n
+
+
+_HELP = {
+    "twse_fetch_seconds": ("histogram", "HTTP request latency per attempt", SECONDS_BUCKETS),
+    "twse_response_bytes": ("histogram", "Response body size", BYTES_BUCKETS),
+    "twse_decode_seconds": ("histogram", "JSON decode time", SECONDS_BUCKETS),
+    "twse_parse_seconds": ("histogram", "Row assembly time", SECONDS_BUCKETS),
+    "twse_rows": ("histogram", "Rows per day", ROWS_BUCKETS),
+    "twse_mongo_write_seconds": ("histogram", "MongoDB write latency", SECONDS_BUCKETS),
+    "twse_retries_total": ("counter", "Request retries", None),
+    "twse_fetch_failures_total": ("counter", "Fetches that failed after all retries", None),
+}
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[Tuple[str, str], Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str, dataset: str) -> Any:
+        key = (name, dataset)
+        m = self._metrics.get(key)
+        if m is None:
+            with self._lock:
+                m = self._metrics.get(key)
+                if m is None:
+                    kind, _, buckets = _HELP[name]
+                    m = Histogram(buckets) if kind == "histogram" else Counter()
+                    self._metrics[key] = m
+        return m
+
+    def observe(self, name: str, dataset: str, value: float) -> None:
+        self._get(name, dataset).observe(value)
+
+    def inc(self, name: str, dataset: str, n: int = 1) -> None:
+        self._get(name, dataset).inc(n)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._metrics.clear()
+
+    def state(self) -> Dict[Tuple[str, str], Any]:
+        """Raw bucket counts and counter values, picklable for `merge()` in another process."""
+        out: Dict[Tuple[str, str], Any] = {}
+        for key, m in list(self._metrics.items()):
+            if isinstance(m, Histogram):
+                with m._lock:
+                    out[key] = (list(m.counts), m.count, m.sum)
+            else:
+                out[key] = m.value
+        return out
+
+    def merge(self, state: Dict[Tuple[str, str], Any]) -> None:
+        """Add another registry's `state()`, e.g. from a worker process."""
+        for (name, dataset), value in state.items():
+            m = self._get(name, dataset)
+            if isinstance(m, Histogram):
+                counts, count, total = value
+                with m._lock:
+                    m.counts = [a + b for a, b in zip(m.counts, counts)]
+                    m.count += count
+                    m.sum += total
+            else:
+                m.inc(value)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """{dataset: {metric: snapshot or value}} for the JSON report."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for (name, dataset), m in sorted(self._metrics.items()):
+            out.setdefault(dataset, {})[name] = m.snapshot() if isinstance(m, Histogram) else m.value
+        return out
+
+    def exposition(self) -> str:
+        """Prometheus text format (version 0.0.4)."""
+        lines: List[str] = []
+        by_name: Dict[str, List[Tuple[str, Any]]] = {}
+        for (name, dataset), m in sorted(self._metrics.items()):
+            by_name.setdefault(name, []).append((dataset, m))
+        for name, series in by_name.items():
+            kind, help_text, _ = _HELP[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for dataset, m in series:
+                label = f'dataset="{dataset}"'
+                if isinstance(m, Counter):
+                    lines.append(f"{name}{{{label}}} {m.value}")
+                    continue
+                with m._lock:
+                    counts, count, total = list(m.counts), m.count, m.sum
+                cumulative = 0
+                for bound, n in zip(m.buckets, counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f"{name}_sum{{{label}}} {total}")
+                lines.append(f"{name}_count{{{label}}} {count}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = Registry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = METRICS.exposition().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics on a background thread; call `.shutdown()` to stop."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
@@ -0,0 +1,92 @@
+"""
+mongomock 與 pymongo 4.x 的相容修補，供 conftest.py 與 bench_suite.py 共用。
+
+mongomock 尚未跟上 pymongo 4.x 的部分介面：bulk 操作的 sort 參數、
+create_collection 的 timeseries 參數、list_collections。修補只影響 mongomock，
+不會改變連到真正 mongod 時的行為。
+
+mongomock 沒有 async client；`AsyncMongomock` 以 AsyncMongoClient 的介面包裝
+同一個 mongomock client，供 async_db 在測試中使用。
+"""
+from __future__ import annotations
+
+import itertools
+from typing import Any, Callable, List, Optional
+
+import mongomock.collection as mcoll
+import mongomock.database as mdb
+
+
+def patch_mongomock(setattr: Callable[[Any, str, Any], None] = setattr) -> None:
+    """
+    Patch mongomock in place. Tests pass `monkeypatch.setattr` so the
+    patches are undone afterwards; calling it again is a no-op.
+    """
+    if getattr(mdb.Database.create_collection, "_compat", False):
+        return
+    for name in ("add_update", "add_replace", "add_delete"):
+        orig = getattr(mcoll.BulkOperationBuilder, name, None)
+        if orig is None:
+            continue
+
+        def without_sort(self, *args, _orig=orig, **kwargs):
+            kwargs.pop("sort", None)
+            return _orig(self, *args, **kwargs)
+
+        setattr(mcoll.BulkOperationBuilder, name, without_sort)
+
+    orig_create = mdb.Database.create_collection
+
+    def create_collection(self, name, **kwargs):
+        kwargs.pop("timeseries", None)
+        return orig_create(self, name, **kwargs)
+
+    create_collection._compat = True
+
+    def list_collections(self, filter=None, **kwargs):
+        names = self.list_collection_names()
+        return iter([{"name": n, "type": "collection"} for n in names
+                     if not filter or n == filter.get("name")])
+
+    setattr(mdb.Database, "create_collection", create_collection)
+    setattr(mdb.Database, "list_collections", list_collections)
+
+
+class AsyncMongomock:
+    """
+    Awaitable view of a mongomock client, database or collection with the
+    AsyncMongoClient calls async_db makes: methods become coroutines,
+    `find()` returns a cursor with `to_list()`, and `[]`, `with_options()`
+    and `close()` stay synchronous.
+    """
+
+    def __init__(self, target: Any):
+        self._target = target
+
+    def __getitem__(self, name: str) -> "AsyncMongomock":
+        return AsyncMongomock(self._target[name])
+
+    def with_options(self, **kwargs: Any) -> "AsyncMongomock":
+        return AsyncMongomock(self._target.with_options(**kwargs))
+
+    def close(self) -> None:
+        self._target.close()
+
+    def find(self, *args: Any, **kwargs: Any) -> "_AsyncCursor":
+        return _AsyncCursor(self._target.find(*args, **kwargs))
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        method = getattr(self._target, name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            return method(*args, **kwargs)
+
+        return call
+
+
+class _AsyncCursor:
+    def __init__(self, cursor: Any):
+        self._cursor = cursor
+
+    async def to_list(self, length: Optional[int] = None) -> List[Any]:
+        return list(itertools.islice(self._cursor, length))
@@ -0,0 +1,310 @@
+"""
+Cached read layer for t86 / bfi82u lookups.
+
+常用查詢（依日期、依單位、依股票）的結果放在行程內的 LRU 快取：
+- 筆數上限（TWSE_QUERY_CACHE_SIZE，預設 1024），超過時淘汰最久未使用的項目
+- 每筆有存活時間（TWSE_QUERY_CACHE_TTL 秒，預設 300）
+- 爬蟲寫入某日期時（db.write_t86 / upsert_bfi82u / BulkWriter），同一行程內涵蓋該日期的
+  快取項目立即失效
+- 其他行程寫入的日期由 ingest_ledger 得知：每 TWSE_QUERY_REFRESH 秒（預設 5）最多查一次
+  `ingested_at` 晚於上次檢查的紀錄，讓對應日期失效
+
+回傳的物件由快取共用，呼叫端請勿修改。
+
+    from query import t86_stock, bfi82u_unit, cache_stats
+    t86_stock("2330", "2024-11-01")
+    stock_history("2330", "2024-01-01", "2024-12-31", ["投信買賣超股數"])
+    bfi82u_unit("外資及陸資(不含外資自營商)", "2024-10-01", "2024-10-31")
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+try:
+    from .config import get_layout, get_query_cache_size, get_query_cache_ttl, get_query_refresh
+    from .db import HASH_FIELD, get_collection, on_write, read_t86_day
+    from .layouts import LAYOUT_TIMESERIES, LAYOUT_WIDE, day_ts, wide_to_rows
+except ImportError:
+    from config import get_layout, get_query_cache_size, get_query_cache_ttl, get_query_refresh
+    from db import HASH_FIELD, get_collection, on_write, read_t86_day
+    from layouts import LAYOUT_TIMESERIES, LAYOUT_WIDE, day_ts, wide_to_rows
+
+_MISS = object()
+
+
+class _Entry(NamedTuple):
+    value: Any
+    expires: float
+    dataset: str
+    lo: Optional[str]   # 涵蓋的日期區間（含端點）；None 表示不設限
+    hi: Optional[str]
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache with a per-entry TTL.
+
+    Each entry remembers the dataset and date range it was read from, so a
+    write to one date only drops the entries that cover that date.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0   # 每次失效 +1；讀取期間若有寫入，結果不放入快取
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value, or `_MISS`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return _MISS
+            if entry.expires <= time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, dataset: str, lo: Optional[str] = None,
+            hi: Optional[str] = None, generation: Optional[int] = None) -> None:
+        """Store `value`; skipped when something was invalidated since `generation` was read."""
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = _Entry(value, time.monotonic() + self.ttl, dataset, lo, hi)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, dataset: str, dates: Optional[Sequence[str]] = None) -> int:
+        """Drop entries of `dataset` covering any of `dates` (all of them when None)."""
+        with self._lock:
+            stale = [
+                key for key, e in self._entries.items()
+                if e.dataset == dataset and (dates is None or any(
+                    (e.lo is None or d >= e.lo) and (e.hi is None or d <= e.hi) for d in dates))
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.generation += 1
+            self._stats["invalidations"] += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+class _LedgerWatch:
+    """
+    Invalidate dates that other processes re-ingested, using the ledger's ingested_at index.
+
+    Timestamps are stored with millisecond precision, so entries at the last
+    seen timestamp are read again and told apart by (dataset, date, hash).
+    """
+
+    def __init__(self, cache: QueryCache, interval: float):
+        self.cache = cache
+        self.interval = interval
+        self._since: Any = None
+        self._seen: Set[Tuple[str, str, Any]] = set()
+        self._next = 0.0
+        self._started = False
+        self._lock = threading.Lock()
+
+    def check(self) -> None:
+        if self.interval <= 0 or time.monotonic() < self._next:
+            return
+        with self._lock:
+            if time.monotonic() < self._next:
+                return
+            self._next = time.monotonic() + self.interval
+            ledger = get_collection("ingest_ledger")
+            fields = {"_id": 0, "dataset": 1, "date": 1, "hash": 1, "ingested_at": 1}
+            if not self._started:
+                latest = ledger.find_one({}, {"_id": 0, "ingested_at": 1}, sort=[("ingested_at", -1)])
+                if latest:
+                    self._since = latest["ingested_at"]
+                    self._seen = {_ledger_key(d) for d in ledger.find({"ingested_at": self._since}, fields)}
+                self._started = True
+                return
+            query = {"ingested_at": {"$gte": self._since}} if self._since is not None else {}
+            changed: Dict[str, List[str]] = {}
+            for doc in ledger.find(query, fields).sort("ingested_at", 1):
+                key = _ledger_key(doc)
+                if doc["ingested_at"] == self._since and key in self._seen:
+                    continue
+                if self._since is None or doc["ingested_at"] > self._since:
+                    self._since, self._seen = doc["ingested_at"], set()
+                self._seen.add(key)
+                changed.setdefault(doc["dataset"], []).append(doc["date"])
+            for dataset, dates in changed.items():
+                self.cache.invalidate(dataset, dates)
+
+
+def _ledger_key(doc: Dict[str, Any]) -> Tuple[str, str, Any]:
+    return doc["dataset"], doc["date"], doc.get("hash")
+
+
+_cache = QueryCache(get_query_cache_size(), get_query_cache_ttl())
+_watch = _LedgerWatch(_cache, get_query_refresh())
+on_write(lambda name, dates: _cache.invalidate(name, dates))
+
+
+def configure_query_cache(maxsize: Optional[int] = None, ttl: Optional[float] = None,
+                          refresh: Optional[float] = None) -> QueryCache:
+    """Replace the cache (e.g. different bounds for a service); returns the new one."""
+    global _cache, _watch
+    _cache = QueryCache(maxsize if maxsize is not None else get_query_cache_size(),
+                        ttl if ttl is not None else get_query_cache_ttl())
+    _watch = _LedgerWatch(_cache, refresh if refresh is not None else get_query_refresh())
+    return _cache
+
+
+def get_query_cache() -> QueryCache:
+    return _cache
+
+
+def cache_stats() -> Dict[str, int]:
+    return _cache.stats()
+
+
+def _cached(key: Hashable, dataset: str, lo: Optional[str], hi: Optional[str], load: Callable[[], Any]) -> Any:
+    _watch.check()
+    cache = _cache
+    value = cache.get(key)
+    if value is _MISS:
+        generation = cache.generation
+        value = load()
+        cache.put(key, value, dataset, lo, hi, generation)
+    return value
+
+
+def _date_range(start: Optional[str], end: Optional[str]) -> Dict[str, Any]:
+    rng = {k: v for k, v in (("$gte", start), ("$lte", end)) if v}
+    return {"date": rng} if rng else {}
+
+
+# -- t86 ----------------------------------------------------------------------
+
+def t86_day(date: str) -> List[Dict[str, Any]]:
+    """All T86 rows of one day."""
+    return _cached(("t86_day", date), "t86", date, date, lambda: read_t86_day(date))
+
+
+def t86_stock(code: str, date: str) -> Optional[Dict[str, Any]]:
+    """One stock's T86 row on `date`, or None."""
+    def load() -> Optional[Dict[str, Any]]:
+        if get_layout("t86") == LAYOUT_WIDE:
+            return next((r for r in read_t86_day(date) if r.get("stock_code") == code), None)
+        return get_collection("t86").find_one({"date": date, "stock_code": code},
+                                              {"_id": 0, "ts": 0, HASH_FIELD: 0})
+    return _cached(("t86_stock", code, date), "t86", date, date, load)
+
+
+def history_query(code: str, start: Optional[str] = None, end: Optional[str] = None,
+                  fields: Optional[Sequence[str]] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    (filter, projection) of a rows-layout history lookup. The projection
+    names only indexed keys when `fields` is a subset of `db.HISTORY_FIELDS`, so
+    MongoDB answers it from the stock_history index without fetching documents.
+    """
+    if fields is None:
+        return {"stock_code": code, **_date_range(start, end)}, {"_id": 0, "ts": 0, HASH_FIELD: 0}
+    return ({"stock_code": code, **_date_range(start, end)},
+            {"_id": 0, "date": 1, "stock_code": 1, **{f: 1 for f in fields}})
+
+
+def _history_rows(code: str, start: Optional[str], end: Optional[str],
+                  fields: Optional[Sequence[str]]) -> List[Dict[str, Any]]:
+    coll = get_collection("t86")
+    layout = get_layout("t86")
+    if layout == LAYOUT_TIMESERIES:
+        ts = {k: day_ts(v) for k, v in (("$gte", start), ("$lte", end)) if v}
+        _, projection = history_query(code, start, end, fields)
+        return list(coll.find({"stock_code": code, **({"ts": ts} if ts else {})}, projection).sort("ts", 1))
+    if layout != LAYOUT_WIDE:
+        return list(coll.find(*history_query(code, start, end, fields)).sort("date", 1))
+
+    # wide：(stock_codes, date) 索引找出當天文件，只取需要的欄位陣列
+    projection = {"_id": 0, HASH_FIELD: 0} if fields is None else {
+        **history_query(code, start, end, fields)[1], "stock_codes": 1, **{f"columns.{f}": 1 for f in fields}}
+    rows: List[Dict[str, Any]] = []
+    for doc in coll.find({**_date_range(start, end), "stock_codes": code}, projection).sort("date", 1):
+        if "stock_codes" not in doc:
+            if doc.get("stock_code") == code:   # 轉換格式途中留下的 rows 文件
+                rows.append(doc)
+        elif fields is None:
+            rows.extend(r for r in wide_to_rows(doc) if r.get("stock_code") == code)
+        else:
+            i = doc["stock_codes"].index(code)
+            rows.append({"date": doc["date"], "stock_code": code,
+                         **{f: col[i] for f, col in doc.get("columns", {}).items()}})
+    return rows
+
+
+def stock_history(code: str, start: Optional[str] = None, end: Optional[str] = None,
+                  fields: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    One stock's T86 rows in [start, end], oldest first.
+
+    With `fields`, each row holds only date, stock_code and those fields;
+    asking for a subset of `db.HISTORY_FIELDS` (the net-buy columns) is a
+    covered query in the rows layout.
+    """
+    key = ("stock_history", code, start, end, tuple(fields) if fields is not None else None)
+    return _cached(key, "t86", start, end, lambda: _history_rows(code, start, end, fields))
+
+
+def t86_stock_rows(code: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """One stock's full T86 rows in [start, end], oldest first."""
+    return stock_history(code, start, end)
+
+
+# -- bfi82u -------------------------------------------------------------------
+
+def bfi82u_day(date: str) -> Optional[Dict[str, Any]]:
+    """The BFI82U document of one day (fields + rows), or None."""
+    return _cached(("bfi82u_day", date), "bfi82u", date, date,
+                   lambda: get_collection("bfi82u").find_one({"date": date}, {"_id": 0}))
+
+
+def bfi82u_unit(unit: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """One unit's row (e.g. "投信") for each day in [start, end], with its date, oldest first."""
+    def load() -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        cursor = get_collection("bfi82u").find(_date_range(start, end), {"_id": 0, "date": 1, "rows": 1})
+        for doc in cursor.sort("date", 1):
+            out.extend({"date": doc["date"], **r} for r in doc.get("rows", []) if r.get("單位名稱") == unit)
+        return out
+    return _cached(("bfi82u_unit", unit, start, end), "bfi82u", start, end, load)
+
+
+# -- dates --------------------------------------------------------------------
+
+def dates(dataset: str) -> List[str]:
+    """Stored dates of "t86" or "bfi82u", ascending."""
+    return _cached(("dates", dataset), dataset, None, None,
+                   lambda: sorted(get_collection(dataset).distinct("date")))
+
+
+def latest_date(dataset: str) -> Optional[str]:
+    def load() -> Optional[str]:
+        doc = get_collection(dataset).find_one({}, {"_id": 0, "date": 1}, sort=[("date", -1)])
+        return doc["date"] if doc else None
+    return _cached(("latest_date", dataset), dataset, None, None, load)
@@ -0,0 +1,192 @@
+"""
+Rolling institutional-flow aggregates for T86.
+
+每檔股票在 `t86_rolling` collection 有一筆文件，記錄最近 5 / 20 / 60 個交易日
+外資（外陸資 + 外資自營商）、投信、自營商的累計買賣超股數：
+
+    {
+      "stock_code": "2330",
+      "stock_name": "台積電",
+      "date": "2024-11-01",                 # 視窗最後一個交易日
+      "foreign_5": 1234, "foreign_20": ..., "foreign_60": ...,
+      "trust_5": ..., "dealer_5": ..., ...
+      "flows": {"foreign": [...], "trust": [...], "dealer": [...]}   # 視窗內每日買賣超（舊 → 新）
+    }
+
+每次匯入新的交易日只需讀取當天資料與 `t86_rolling`：加上新的一天、扣掉滑出視窗的
+那一天，不重新掃描歷史資料。日期不是接在視窗之後（補抓較早的日期、重新匯入視窗
+內的某天）時改為重建；重建只需要最近 60 個交易日的資料。
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import DeleteOne, ReplaceOne
+
+try:
+    from .db import get_collection, read_t86_day
+except ImportError:
+    from db import get_collection, read_t86_day
+
+ROLLING_COLLECTION = "t86_rolling"
+STATE_COLLECTION = "t86_rolling_state"
+WINDOWS = (5, 20, 60)
+MAX_WINDOW = max(WINDOWS)
+
+# 每個分類依序嘗試的欄位組合：第一個全部存在的組合相加（舊版 T86 欄位名稱不同）
+FLOW_FIELDS: Dict[str, Tuple[Tuple[str, ...], ...]] = {
+    "foreign": (("外陸資買賣超股數(不含外資自營商)", "外資自營商買賣超股數"), ("外資買賣超股數",)),
+    "trust": (("投信買賣超股數",),),
+    "dealer": (("自營商買賣超股數",),),
+}
+GROUPS = tuple(FLOW_FIELDS)
+
+
+def _to_int(value: Any) -> int:
+    """Raw ("1,234") and typed (Int64) values alike; blanks count as 0."""
+    if value is None:
+        return 0
+    if isinstance(value, int):
+        return int(value)
+    s = str(value).replace(",", "").strip()
+    try:
+        return int(s)
+    except ValueError:
+        return 0
+
+
+def day_flows(rows: Iterable[Dict[str, Any]]) -> Dict[str, Tuple[Optional[str], Dict[str, int]]]:
+    """{stock_code: (stock_name, {group: net shares})} for one day's T86 rows."""
+    out: Dict[str, Tuple[Optional[str], Dict[str, int]]] = {}
+    for row in rows:
+        code = row.get("stock_code")
+        if not code:
+            continue
+        flows: Dict[str, int] = {}
+        for group, choices in FLOW_FIELDS.items():
+            keys = next((keys for keys in choices if all(k in row for k in keys)), ())
+            flows[group] = sum(_to_int(row[k]) for k in keys)
+        out[code] = (row.get("stock_name"), flows)
+    return out
+
+
+def _sums(flows: Dict[str, List[int]]) -> Dict[str, int]:
+    return {f"{group}_{n}": sum(flows[group][-n:]) for group in GROUPS for n in WINDOWS}
+
+
+def _load_window() -> List[str]:
+    state = get_collection(STATE_COLLECTION).find_one({"_id": "window"})
+    return list(state["dates"]) if state else []
+
+
+def _save_window(dates: Sequence[str]) -> None:
+    get_collection(STATE_COLLECTION).replace_one({"_id": "window"}, {"_id": "window", "dates": list(dates)},
+                                                 upsert=True)
+
+
+def ensure_rolling_indexes() -> None:
+    get_collection(ROLLING_COLLECTION).create_index([("stock_code", 1)], unique=True)
+
+
+def apply_day(date: str, rows: Optional[List[Dict[str, Any]]] = None, source: str = "t86") -> int:
+    """
+    Slide the window forward by one trading day; `date` must be later than
+    the last day already applied. Returns the number of stocks traded that
+    day (0 when the day has no T86 rows).
+
+    Every running sum gains the new day's value and, once the window is
+    full, loses the value that just fell out of it.
+    """
+    rows = read_t86_day(date, source) if rows is None else rows
+    today = day_flows(rows)
+    if not today:
+        return 0
+    dates = _load_window()
+    if dates and date <= dates[-1]:
+        raise ValueError(f"{date} is not after the last rolling day {dates[-1]}")
+    width = min(len(dates), MAX_WINDOW - 1)   # days kept before appending `date`
+
+    coll = get_collection(ROLLING_COLLECTION)
+    ops: List[Any] = []
+    seen = set()
+    for doc in coll.find({}, {"_id": 0}):
+        code = doc["stock_code"]
+        seen.add(code)
+        name, new = today.get(code, (doc.get("stock_name"), dict.fromkeys(GROUPS, 0)))
+        flows = {g: doc["flows"][g][-width:] if width else [] for g in GROUPS}
+        for g in GROUPS:
+            flows[g].append(new[g])
+        if not any(any(v) for v in flows.values()):
+            ops.append(DeleteOne({"stock_code": code}))   # 整個視窗都沒有買賣超
+            continue
+        sums = {}
+        for g in GROUPS:
+            old = doc["flows"][g]
+            for n in WINDOWS:
+                expired = old[-n] if len(old) >= n else 0
+                sums[f"{g}_{n}"] = doc.get(f"{g}_{n}", 0) + new[g] - expired
+        ops.append(ReplaceOne({"stock_code": code}, {"stock_code": code, "stock_name": name or doc.get("stock_name"),
+                                                     "date": date, **sums, "flows": flows}))
+    for code, (name, new) in today.items():
+        if code in seen:
+            continue
+        flows = {g: [0] * width + [new[g]] for g in GROUPS}
+        ops.append(ReplaceOne({"stock_code": code}, {"stock_code": code, "stock_name": name, "date": date,
+                                                     **_sums(flows), "flows": flows}, upsert=True))
+    if ops:
+        coll.bulk_write(ops, ordered=False)
+    _save_window((dates + [date])[-MAX_WINDOW:])
+    return len(today)
+
+
+def rebuild(end: Optional[str] = None, source: str = "t86") -> int:
+    """
+    Recompute `t86_rolling` from the last 60 trading days stored in `source`
+    (up to `end`). Returns the number of days used.
+    """
+    query = {"date": {"$lte": end}} if end else {}
+    days = sorted(get_collection(source).distinct("date", query))[-MAX_WINDOW:]
+
+    by_code: Dict[str, Tuple[Optional[str], Dict[str, List[int]]]] = {}
+    for i, date in enumerate(days):
+        for code, (name, new) in day_flows(read_t86_day(date, source)).items():
+            prev_name, flows = by_code.setdefault(code, (name, {g: [0] * len(days) for g in GROUPS}))
+            if name and not prev_name:
+                by_code[code] = (name, flows)
+            for g in GROUPS:
+                flows[g][i] = new[g]
+
+    coll = get_collection(ROLLING_COLLECTION)
+    coll.delete_many({})
+    docs = [{"stock_code": code, "stock_name": name, "date": days[-1], **_sums(flows), "flows": flows}
+            for code, (name, flows) in by_code.items() if any(any(v) for v in flows.values())]
+    if docs:
+        coll.insert_many(docs, ordered=False)
+    _save_window(days)
+    return len(days)
+
+
+def update_rolling(dates: Iterable[str], source: str = "t86") -> str:
+    """
+    Bring `t86_rolling` up to date after `dates` were ingested.
+
+    Days after the window are applied incrementally; a day inside the
+    window (re-ingest or out-of-order backfill), or more new days than the
+    window holds, triggers one rebuild. Days older than the window do not
+    affect it. Returns "incremental", "rebuild" or "unchanged".
+    """
+    dates = sorted(set(dates))
+    window = _load_window()
+    first = window[-MAX_WINDOW] if len(window) >= MAX_WINDOW else None
+    newer = [d for d in dates if not window or d > window[-1]]
+    inside = [d for d in dates if window and d <= window[-1] and (first is None or d >= first)]
+    if inside or len(newer) > MAX_WINDOW:
+        rebuild(source=source)
+        return "rebuild"
+    applied = sum(1 for d in newer if apply_day(d, source=source))
+    return "incremental" if applied else "unchanged"
+
+
+def get_rolling(code: str) -> Optional[Dict[str, Any]]:
+    """One stock's rolling sums: a single lookup on the stock_code index."""
+    return get_collection(ROLLING_COLLECTION).find_one({"stock_code": code}, {"_id": 0, "flows": 0})
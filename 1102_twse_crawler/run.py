@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """簡單的啟動腳本，替代 python -m . 語法"""
 import sys
-from __main__ import main
+from cli import main
 
 if __name__ == "__main__":
     sys.exit(main())
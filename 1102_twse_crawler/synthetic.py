@@ -0,0 +1,78 @@
+"""
+依日期以固定亂數種子產生的 T86 / BFI82U 假資料（格式與 TWSE JSON 的 fields / data
+相同），供 benchmark 與測試使用，不需連網。
+"""
+import random
+import datetime as dt
+from typing import List, Tuple
+
+
+T86_FIELDS = [
+    "證券代號",
+    "證券名稱",
+    "外陸資買進股數(不含外資自營商)",
+    "外陸資賣出股數(不含外資自營商)",
+    "外陸資買賣超股數(不含外資自營商)",
+    "外資自營商買進股數",
+    "外資自營商賣出股數",
+    "外資自營商買賣超股數",
+    "投信買進股數",
+    "投信賣出股數",
+    "投信買賣超股數",
+    "自營商買賣超股數",
+    "自營商買進股數(自行買賣)",
+    "自營商賣出股數(自行買賣)",
+    "自營商買賣超股數(自行買賣)",
+    "自營商買進股數(避險)",
+    "自營商賣出股數(避險)",
+    "自營商買賣超股數(避險)",
+    "三大法人買賣超股數",
+]
+
+BFI82U_FIELDS = ["單位名稱", "買進金額", "賣出金額", "買賣差額"]
+BFI82U_UNITS = [
+    "自營商(自行買賣)",
+    "自營商(避險)",
+    "投信",
+    "外資及陸資(不含外資自營商)",
+    "外資自營商",
+]
+
+
+def _fmt(n: int) -> str:
+    return f"{n:,}"
+
+
+def _buy_sell(rng: random.Random, scale: int) -> Tuple[int, int, int]:
+    buy = rng.randint(0, scale)
+    sell = rng.randint(0, scale)
+    return buy, sell, buy - sell
+
+
+def t86_rows(d: dt.date, n_stocks: int = 1000) -> List[List[str]]:
+    rng = random.Random(d.toordinal())
+    rows: List[List[str]] = []
+    for i in range(n_stocks):
+        code = str(1101 + i)
+        foreign = _buy_sell(rng, 50_000_000)
+        foreign_dealer = _buy_sell(rng, 100_000)
+        trust = _buy_sell(rng, 5_000_000)
+        self_dealer = _buy_sell(rng, 2_000_000)
+        hedge = _buy_sell(rng, 2_000_000)
+        dealer_net = self_dealer[2] + hedge[2]
+        total = foreign[2] + foreign_dealer[2] + trust[2] + dealer_net
+        values = [*foreign, *foreign_dealer, *trust, dealer_net, *self_dealer, *hedge, total]
+        rows.append([code, f"股票{code}", *(_fmt(v) for v in values)])
+    return rows
+
+
+def bfi82u_rows(d: dt.date) -> List[List[str]]:
+    rng = random.Random(-d.toordinal())
+    rows: List[List[str]] = []
+    totals = [0, 0, 0]
+    for unit in BFI82U_UNITS:
+        buy, sell, net = _buy_sell(rng, 150_000_000_000)
+        totals = [totals[0] + buy, totals[1] + sell, totals[2] + net]
+        rows.append([unit, _fmt(buy), _fmt(sell), _fmt(net)])
+    rows.append(["合計", *(_fmt(v) for v in totals)])
+    return rows
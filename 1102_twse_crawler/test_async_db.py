@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+async_db 測試：與 db.py 相同的寫入語意（筆數統計、content hash 跳過、寫入的文件內容，
+rows / wide / timeseries 三種格式）、write_concern、時序 collection 刪除失敗的錯誤訊息，
+以及多個交易日同時寫入。
+
+以 conftest.py 的 `async_mongo`（mongomock 與 AsyncMongoClient 介面的包裝）執行，不需 mongod；
+對真正 mongod 的比較見 bench_async_db.py。
+"""
+import asyncio
+import datetime as dt
+
+import pytest
+from pymongo.errors import OperationFailure
+from pymongo.write_concern import WriteConcern
+
+import async_db
+import db
+
+STOCKS = 40
+
+
+def _trading_days(n):
+    days, d = [], dt.date(2024, 1, 2)
+    while len(days) < n:
+        if d.weekday() < 5:
+            days.append(d)
+        d += dt.timedelta(days=1)
+    return days
+
+
+def _day_docs(d, bump=None):
+    from synthetic import T86_FIELDS, t86_rows
+
+    docs = [{**dict(zip(T86_FIELDS, r)), "date": d.isoformat(), "stock_code": r[0], "stock_name": r[1]}
+            for r in t86_rows(d, STOCKS)]
+    if bump is not None:
+        docs[0]["投信買賣超股數"] = bump
+    return docs
+
+
+def _run(coro_fn):
+    """Run one test body on a fresh event loop and close the async client afterwards."""
+
+    async def main():
+        try:
+            return await coro_fn()
+        finally:
+            await async_db.close()
+
+    return asyncio.run(main())
+
+
+def _stored(mongo, name):
+    return sorted((d for d in mongo[name].find({}, {"_id": 0})),
+                  key=lambda d: (d["date"], d.get("stock_code") or ""))
+
+
+def test_ensure_indexes(async_mongo):
+    from db import HISTORY_INDEX
+
+    _run(async_db.ensure_indexes)
+    t86 = async_mongo["t86"].index_information()
+    assert HISTORY_INDEX in t86 and t86["date_1_stock_code_1"].get("unique")
+    assert "ingested_at_1" in async_mongo["ingest_ledger"].index_information()
+    assert async_mongo["bfi82u"].index_information()["date_1"].get("unique")
+
+
+@pytest.mark.parametrize("layout", ["rows", "wide", "timeseries"])
+def test_write_t86_matches_sync(async_mongo, layout):
+    days = _trading_days(3)
+    db.ensure_t86_indexes(f"sync_{layout}", layout)
+    _run(lambda: async_db.ensure_t86_indexes(f"async_{layout}", layout))
+
+    def sync_pass(bump=None):
+        return [db.write_t86(_day_docs(d, bump if i == 0 else None), f"sync_{layout}", layout)
+                for i, d in enumerate(days)]
+
+    async def async_pass(bump=None):
+        return [await async_db.write_t86(_day_docs(d, bump if i == 0 else None), f"async_{layout}", layout,
+                                         WriteConcern(w=1))
+                for i, d in enumerate(days)]
+
+    for bump in (None, None, "12345"):   # 首次寫入、未變更、一列變更
+        assert _run(lambda: async_pass(bump)) == sync_pass(bump)
+    assert _stored(async_mongo, f"async_{layout}") == _stored(async_mongo, f"sync_{layout}")
+
+
+def test_timeseries_delete_failure_names_the_server_version(async_mongo, monkeypatch):
+    import mongomock.collection as mcoll
+
+    day = _trading_days(1)[0]
+    _run(lambda: async_db.write_t86(_day_docs(day), "t86", "timeseries"))
+
+    def delete_many(self, *args, **kwargs):
+        raise OperationFailure("Cannot perform an update or delete on a time-series collection", code=72)
+
+    monkeypatch.setattr(mcoll.Collection, "delete_many", delete_many)
+    with pytest.raises(RuntimeError, match="MongoDB 7.0"):
+        _run(lambda: async_db.write_t86(_day_docs(day, bump="1"), "t86", "timeseries"))
+
+
+def test_write_concern_is_applied(async_mongo, monkeypatch):
+    from mongomock_compat import AsyncMongomock
+
+    seen = []
+    real = AsyncMongomock.with_options
+
+    def with_options(self, **kwargs):
+        seen.append(kwargs.get("write_concern"))
+        return real(self, **kwargs)
+
+    monkeypatch.setattr(AsyncMongomock, "with_options", with_options)
+    wc = WriteConcern(w="majority", j=True)
+    doc = {"date": "2024-01-02", "fields": ["單位名稱"], "rows": [{"單位名稱": "投信"}]}
+    _run(lambda: async_db.upsert_t86(_day_docs(_trading_days(1)[0]), wc))
+    _run(lambda: async_db.upsert_bfi82u(doc, wc))
+    _run(lambda: async_db.upsert_bfi82u(doc))
+    assert seen == [wc, wc]
+
+
+def test_concurrent_daily_upserts(async_mongo):
+    days = _trading_days(20)
+
+    async def upsert_all():
+        return await asyncio.gather(*(async_db.upsert_t86(_day_docs(d)) for d in days))
+
+    first = _run(upsert_all)
+    assert sum(c.inserted for c in first) == len(days) * STOCKS
+    again = _run(upsert_all)
+    assert sum(c.skipped for c in again) == len(days) * STOCKS
+    assert async_mongo["t86"].count_documents({}) == len(days) * STOCKS
+
+
+def test_upsert_bfi82u_and_ledger(async_mongo):
+    doc = {"date": "2024-01-02", "fields": ["單位名稱", "買賣差額"], "rows": [{"單位名稱": "投信", "買賣差額": "1"}]}
+    _run(lambda: async_db.upsert_bfi82u(doc))
+    _run(lambda: async_db.upsert_bfi82u({**doc, "rows": [{"單位名稱": "投信", "買賣差額": "2"}]}))
+    stored = list(async_mongo["bfi82u"].find({}, {"_id": 0}))
+    assert stored == [{**doc, "rows": [{"單位名稱": "投信", "買賣差額": "2"}]}]
+
+    _run(lambda: async_db.record_ingest("bfi82u", "2024-01-02", 1, "abc"))
+    assert db.completed_jobs(["bfi82u"], "2024-01-01", "2024-01-31") == {("bfi82u", "2024-01-02")}
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+backfill.py 與 cli.run_jobs 測試：結果依日期排序、RateLimiter 的每秒上限、
+某個工作失敗時其他工作不再開始並拋出例外，store 在 event loop 上執行，以及對
+fake_twse.py（mongomock）循序、並行與 --db-backend async 抓取時寫入的資料、
+[RANGE] 摘要與結束碼相同。
+"""
+import asyncio
+import datetime as dt
+import gc
+import threading
+import time
+
+import pytest
+
+import cli
+from backfill import RateLimiter, backfill, plan_jobs, run_range_async
+from writer import BulkWriter
+
+DAYS = [dt.date(2024, 1, 2) + dt.timedelta(days=i) for i in range(4)]
+START, END, HOLIDAY = "2024-01-04", "2024-01-09", dt.date(2024, 1, 8)   # 含週末與一個假日
+
+
+def test_results_are_ordered_by_date():
+    jobs = plan_jobs(DAYS, ["t86", "bfi82u"])
+
+    def step(d, name):
+        time.sleep(0.01 * (len(DAYS) - DAYS.index(d)))   # 越早的日期越晚完成
+        return d.isoformat(), name
+
+    results = run_range_async(jobs, step, concurrency=4)
+    assert results == [{"date": d, "t86": (d.isoformat(), "t86"), "bfi82u": (d.isoformat(), "bfi82u")}
+                       for d in DAYS]
+
+
+def test_rate_limiter_spaces_requests():
+    rps, n = 50, 10
+
+    async def main():
+        limiter = RateLimiter(rps)
+        stamps = []
+
+        async def one():
+            await limiter.acquire()
+            stamps.append(time.monotonic())
+
+        start = time.monotonic()
+        await asyncio.gather(*(one() for _ in range(n)))
+        return [t - start for t in sorted(stamps)]
+
+    offsets = asyncio.run(main())
+    # 第 k 個請求最早在 k / rps 秒時送出
+    assert all(t >= k / rps - 0.005 for k, t in enumerate(offsets))
+
+
+def test_backfill_respects_rps():
+    jobs = plan_jobs(DAYS[:3], ["t86", "bfi82u"])
+    t0 = time.monotonic()
+    run_range_async(jobs, lambda d, name: None, concurrency=len(jobs), rps=20)
+    assert time.monotonic() - t0 >= (len(jobs) - 1) / 20 - 0.005
+
+
+def test_failing_job_stops_the_run():
+    days = [dt.date(2024, 1, 1) + dt.timedelta(days=i) for i in range(20)]
+    jobs = plan_jobs(days, ["t86", "bfi82u"])
+    lock = threading.Lock()
+    started, finished = [], []
+
+    def step(d, name):
+        with lock:
+            started.append((d, name))
+        if (d, name) == jobs[0]:
+            raise RuntimeError("boom")
+        time.sleep(0.05)
+        with lock:
+            finished.append((d, name))
+
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, ctx: errors.append(ctx))
+        with pytest.raises(RuntimeError, match="boom"):
+            await backfill(jobs, step, concurrency=2)
+        left = len(started)
+        await asyncio.sleep(0.2)
+        gc.collect()
+        others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        return left, others, errors
+
+    left, others, errors = asyncio.run(main())
+    assert others == [] and errors == []      # 其他 worker 已取消，沒有遺留未處理的例外
+    assert len(started) == left < len(jobs)   # 失敗之後不再開始新的工作
+    assert sorted(finished) == sorted(set(started) - {jobs[0]})   # 進行中的工作已完成
+
+
+# -- cli.run_jobs against fake_twse.py ------------------------------------------
+
+
+@pytest.fixture
+def crawl(mongo, fake_twse, tmp_path, capsys):
+    fake_twse(holidays=[HOLIDAY])
+    runs = []
+
+    def crawl(*extra):
+        for name in ("t86", "bfi82u", "ingest_ledger"):
+            mongo[name].drop()
+        runs.append(extra)
+        code = cli.main(["both", "--start", START, "--end", END, "--sleep", "0", "--no-rolling",
+                         "--calendar-file", str(tmp_path / f"calendar{len(runs)}.json"), *extra])
+        out = capsys.readouterr().out
+        return code, _stored(mongo), [line for line in out.splitlines() if line.startswith("[RANGE]")]
+
+    return crawl
+
+
+def _stored(mongo):
+    docs = {name: sorted((({k: v for k, v in d.items() if k != "_id"} for d in mongo[name].find())),
+                         key=lambda d: (d["date"], d.get("stock_code", "")))
+            for name in ("t86", "bfi82u")}
+    docs["ledger"] = sorted((d["dataset"], d["date"], d["rows"], d["hash"]) for d in mongo["ingest_ledger"].find())
+    return docs
+
+
+@pytest.mark.parametrize("writers", ["1", "0"])
+def test_sequential_and_concurrent_runs_store_the_same(crawl, writers):
+    code, stored, summary = crawl("--concurrency", "1", "--writers", writers)
+    assert code == 0
+    assert len(stored["t86"]) == 3 * 5 and len(stored["bfi82u"]) == 3
+    assert summary == ["[RANGE] t86 stored: 3 days, no data: 1 days",
+                       "[RANGE] bfi82u stored: 3 days, no data: 1 days"]
+    assert crawl("--concurrency", "4", "--writers", writers) == (code, stored, summary)
+
+
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_async_db_backend_stores_the_same(crawl, async_mongo, monkeypatch, concurrency):
+    expected = crawl("--concurrency", concurrency, "--writers", "0")
+
+    def sync_write(*args, **kwargs):
+        raise AssertionError("--db-backend async wrote through db.py")
+
+    for name in ("upsert_t86", "upsert_bfi82u", "record_ingest"):
+        monkeypatch.setattr(cli, name, sync_write)
+    assert crawl("--concurrency", concurrency, "--db-backend", "async", "--write-concern", "majority") == expected
+
+
+def test_store_runs_on_the_event_loop():
+    jobs = plan_jobs(DAYS, ["t86"])
+    loop_threads = []
+
+    async def store(d, name, fetched):
+        loop_threads.append(threading.current_thread())
+        await asyncio.sleep(0)
+        return fetched + 1
+
+    results = run_range_async(jobs, lambda d, name: d.day, concurrency=2, store=store)
+    assert [r["t86"] for r in results] == [d.day + 1 for d in DAYS]
+    assert set(loop_threads) == {threading.main_thread()}
+
+
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_write_errors_give_exit_code_1(crawl, monkeypatch, concurrency):
+    real = BulkWriter._collection
+
+    def failing(self, name):
+        if name == "bfi82u":
+            raise RuntimeError("not primary")
+        return real(self, name)
+
+    monkeypatch.setattr(BulkWriter, "_collection", failing)
+    code, stored, _ = crawl("--concurrency", concurrency)
+    assert code == 1
+    assert stored["bfi82u"] == [] and len(stored["t86"]) == 3 * 5
+    assert {dataset for dataset, *_ in stored["ledger"]} == {"t86"}
+
+
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_direct_write_error_is_raised(crawl, monkeypatch, concurrency):
+    def failing(doc):
+        raise RuntimeError("not primary")
+
+    monkeypatch.setattr(cli, "upsert_bfi82u", failing)
+    with pytest.raises(RuntimeError, match="not primary"):
+        crawl("--concurrency", concurrency, "--writers", "0")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+bench_suite 測試：baseline 有而這次沒有的指標列為退步；upsert 階段的錯誤記錄為失敗，
+不會被當成「略過」；沒有 mongod 時每個階段都能在 mongomock 上跑完。
+"""
+import datetime as dt
+import json
+import sys
+
+import pytest
+
+import bench_suite
+import twse_api
+
+
+BASELINE = {
+    "meta": {"commit": "abc123"},
+    "parse": {"raw": {"rows": 100, "total_ms": 10.0, "rows_per_s": 10000}},
+    "upsert": {"backend": "mongod", "t86_initial": {"rows": 100, "total_ms": 20.0, "rows_per_s": 5000}},
+}
+
+
+def test_compare_within_tolerance():
+    current = {"meta": {"commit": "def456"},
+               "parse": {"raw": {"rows": 100, "total_ms": 11.0, "rows_per_s": 9100}},
+               "upsert": {"backend": "mongomock", "t86_initial": {"rows": 100, "total_ms": 21.0, "rows_per_s": 4800}}}
+    assert bench_suite.compare(BASELINE, current, 0.2) == []
+
+
+def test_compare_reports_regressions():
+    current = {"parse": {"raw": {"rows": 100, "total_ms": 20.0, "rows_per_s": 5000}},
+               "upsert": BASELINE["upsert"]}
+    assert bench_suite.compare(BASELINE, current, 0.2) == [
+        "parse.raw.total_ms: 10.0 -> 20.0", "parse.raw.rows_per_s: 10000 -> 5000"]
+
+
+def test_compare_reports_missing_metrics():
+    current = {"parse": BASELINE["parse"], "upsert": {"backend": "mongomock", "error": "TypeError: sort"}}
+    assert bench_suite.compare(BASELINE, current, 0.2) == [
+        "upsert.t86_initial.total_ms: 20.0 -> missing", "upsert.t86_initial.rows_per_s: 5000 -> missing"]
+    assert bench_suite.compare(BASELINE, {"parse": BASELINE["parse"]}, 0.2) == [
+        "upsert.t86_initial.total_ms: 20.0 -> missing", "upsert.t86_initial.rows_per_s: 5000 -> missing"]
+
+
+def test_upsert_error_is_reported(monkeypatch):
+    def broken(*args, **kwargs):
+        raise TypeError("add_update() got an unexpected keyword argument 'sort'")
+
+    monkeypatch.setattr(bench_suite, "_connect", lambda backend: "mongomock")
+    monkeypatch.setattr(bench_suite.db, "get_collection", lambda name: type("C", (), {"drop": lambda self: None})())
+    monkeypatch.setattr(bench_suite.db, "ensure_t86_indexes", broken)
+    report = bench_suite.bench_upsert([dt.date(2024, 1, 2)], 10, "mongomock")
+    assert report["error"].startswith("TypeError")
+    assert "skipped" not in report
+
+
+def test_every_stage_runs_under_mongomock(monkeypatch, tmp_path):
+    pytest.importorskip("mongomock")
+    import mongomock_compat
+
+    real_patch = mongomock_compat.patch_mongomock
+    monkeypatch.setattr(mongomock_compat, "patch_mongomock", lambda: real_patch(monkeypatch.setattr))
+    for name in ("_cache", "_cache_loaded"):
+        monkeypatch.setattr(twse_api, name, getattr(twse_api, name))
+    out = tmp_path / "bench.json"
+    monkeypatch.setattr(sys, "argv", ["bench_suite.py", "--days", "2", "--rows", "20",
+                                      "--backend", "mongomock", "--out", str(out)])
+    try:
+        assert bench_suite.main() == 0
+    finally:
+        bench_suite.db.set_client(None)
+    report = json.loads(out.read_text(encoding="utf-8"))
+    assert {"fetch", "parse", "doc_size", "upsert"} <= set(report)
+    assert report["upsert"]["backend"] == "mongomock" and "error" not in report["upsert"]
+    assert report["upsert"]["t86_rerun_unchanged"]["skipped"] == 2 * 20
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+cache.py 測試：公佈時間之前抓取的回應依 TTL 過期（即使日期已過），公佈後抓取的
+回應永不過期；公佈前的「查無資料」不寫入快取，隔天重抓時不會被當成假日。
+不需網路與 MongoDB。
+"""
+import datetime as dt
+import json
+import types
+
+import pytest
+
+import cache
+import twse_api
+from cache import TAIPEI, ResponseCache
+
+DAY = dt.date(2024, 11, 1)
+URL = "https://www.twse.com.tw/rwd/zh/fund/T86"
+PARAMS = {"response": "json", "date": "20241101", "selectType": "ALL"}
+
+
+def _at(date, hour):
+    return dt.datetime.combine(date, dt.time(hour), tzinfo=TAIPEI).timestamp()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Settable time.time() for cache.py."""
+    now = types.SimpleNamespace(value=_at(DAY, 10))
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=lambda: now.value))
+    return now
+
+
+def test_fetched_before_cutoff_expires_after_the_day(tmp_path, clock):
+    c = ResponseCache(str(tmp_path), today_ttl=3600)
+    c.put(URL, PARAMS, b'{"stat":"no data"}')
+    assert c.get(URL, PARAMS, DAY) is not None
+    clock.value = _at(DAY + dt.timedelta(days=1), 10)
+    assert c.get(URL, PARAMS, DAY) is None
+
+
+def test_fetched_after_cutoff_never_expires(tmp_path, clock):
+    c = ResponseCache(str(tmp_path), today_ttl=3600)
+    clock.value = _at(DAY, 19)
+    c.put(URL, PARAMS, b'{"stat":"OK"}')
+    clock.value = _at(DAY + dt.timedelta(days=400), 10)
+    assert c.get(URL, PARAMS, DAY) == b'{"stat":"OK"}'
+    assert c.stats() == {"hits": 1, "misses": 0}
+
+
+def test_offline_ignores_expiry(tmp_path, clock):
+    ResponseCache(str(tmp_path)).put(URL, PARAMS, b'{"stat":"no data"}')
+    clock.value = _at(DAY + dt.timedelta(days=30), 10)
+    assert ResponseCache(str(tmp_path), offline=True).get(URL, PARAMS, DAY) is not None
+
+
+class _Transport:
+    def __init__(self, *bodies):
+        self.bodies = list(bodies)
+        self.calls = 0
+
+    def get(self, url, params=None, **kwargs):
+        self.calls += 1
+        body = self.bodies.pop(0)
+        return types.SimpleNamespace(status_code=200, ok=True, content=body, json=lambda: json.loads(body))
+
+
+def _ok_body():
+    return json.dumps({"stat": "OK", "fields": ["證券代號", "證券名稱", "三大法人買賣超股數"],
+                       "data": [["2330", "台積電", "1,000"]]}).encode("utf-8")
+
+
+def test_pre_close_no_data_is_not_replayed(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(twse_api, "_cache", None)
+    monkeypatch.setattr(twse_api, "_cache_loaded", False)
+    twse_api.configure_cache(str(tmp_path), today_ttl=3600)
+    skipped = []
+    transport = _Transport('{"stat":"很抱歉，沒有符合條件的資料!"}'.encode("utf-8"), _ok_body())
+    assert twse_api.fetch_t86(DAY, transport=transport, on_no_data=skipped.append) == []
+    clock.value = _at(DAY + dt.timedelta(days=1), 10)
+    docs = twse_api.fetch_t86(DAY, transport=transport, on_no_data=skipped.append)
+    assert transport.calls == 2
+    assert [d["stock_code"] for d in docs] == ["2330"]
+    assert skipped == [DAY]   # 只有收盤前那一次
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+content hash 測試（mongomock）：同一天寫入兩次時第二次全部跳過，只有一列變更時
+只重寫該列；舊資料沒有 _hash 時算成 changed。
+"""
+import datetime as dt
+
+import pytest
+
+from db import HASH_FIELD, WriteCounts, content_hash, row_hash, write_t86
+from synthetic import T86_FIELDS, t86_rows
+from layouts import LAYOUT_ROWS, LAYOUT_TIMESERIES, LAYOUT_WIDE
+
+DAY = dt.date(2024, 1, 2)
+N = 8
+
+
+def _docs():
+    return [{**dict(zip(T86_FIELDS, r)), "date": DAY.isoformat(), "stock_code": r[0], "stock_name": r[1]}
+            for r in t86_rows(DAY, N)]
+
+
+def test_hashes_ignore_key_order_and_storage_fields():
+    doc = _docs()[0]
+    reordered = dict(reversed(list(doc.items())))
+    assert row_hash(doc) == row_hash(reordered) == row_hash({**doc, "_id": 1, "ts": 0, HASH_FIELD: "x"})
+    assert row_hash(doc) != row_hash({**doc, "投信買賣超股數": "1"})
+    assert content_hash([doc]) == content_hash([reordered])
+    assert len(content_hash([doc])) == 64
+
+
+@pytest.mark.parametrize("layout", [LAYOUT_ROWS, LAYOUT_TIMESERIES])
+def test_unchanged_day_is_skipped(mongo, layout):
+    assert write_t86(_docs(), "t86", layout) == WriteCounts(N, 0, 0)
+    assert write_t86(_docs(), "t86", layout) == WriteCounts(0, 0, N)
+    assert mongo["t86"].count_documents({}) == N
+
+
+@pytest.mark.parametrize("layout", [LAYOUT_ROWS, LAYOUT_TIMESERIES])
+def test_one_changed_row(mongo, layout):
+    write_t86(_docs(), "t86", layout)
+    docs = _docs()
+    docs[3] = {**docs[3], "投信買賣超股數": "123,456"}
+    assert write_t86(docs, "t86", layout) == WriteCounts(0, 1, N - 1)
+    stored = mongo["t86"].find_one({"stock_code": docs[3]["stock_code"]})
+    assert stored["投信買賣超股數"] == "123,456" and stored[HASH_FIELD] == row_hash(docs[3])
+    assert mongo["t86"].count_documents({}) == N
+
+
+def test_wide_day_hash(mongo):
+    assert write_t86(_docs(), "t86", LAYOUT_WIDE) == WriteCounts(N, 0, 0)
+    assert write_t86(_docs(), "t86", LAYOUT_WIDE) == WriteCounts(0, 0, N)
+    docs = _docs()
+    docs[0] = {**docs[0], "投信買賣超股數": "1"}
+    assert write_t86(docs, "t86", LAYOUT_WIDE) == WriteCounts(0, N, 0)   # wide 以整天為單位重寫
+
+
+def test_rows_without_hash_count_as_changed(mongo):
+    mongo["t86"].insert_many([dict(d) for d in _docs()])   # hash 功能之前寫入的資料
+    assert write_t86(_docs(), "t86", LAYOUT_ROWS) == WriteCounts(0, N, 0)
+    assert write_t86(_docs(), "t86", LAYOUT_ROWS) == WriteCounts(0, 0, N)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+decode.py 測試：每個已安裝的解碼器（json / orjson）與原本 r.json() + 逐列走訪 fields
+的結果相同、解碼器的選擇（auto / 環境變數 / 未安裝），以及 t86_records 的代號 / 名稱欄位。
+"""
+import datetime as dt
+
+import pytest
+
+import decode
+from bench_decode import legacy_bfi82u, legacy_t86
+from fixtures import bfi82u_payload, t86_payload
+
+DAY = dt.date(2025, 10, 23)
+
+
+@pytest.fixture(autouse=True)
+def reset_decoder(monkeypatch):
+    monkeypatch.setattr(decode, "_loads", None)
+
+
+@pytest.mark.parametrize("name", sorted(decode.DECODERS))
+def test_every_decoder_matches_the_legacy_path(name):
+    t86, bfi = t86_payload(DAY, rows=50), bfi82u_payload(DAY)
+    decode.set_decoder(name)
+    js = decode.loads(t86)
+    assert decode.t86_records(js["fields"], js["data"], DAY.isoformat()) == legacy_t86(t86)
+    js = decode.loads(bfi)
+    assert decode.row_records(js["fields"], js["data"]) == legacy_bfi82u(bfi)
+
+
+def test_decoder_selection(monkeypatch):
+    assert decode.decoder_name("auto") == ("orjson" if "orjson" in decode.DECODERS else "json")
+    monkeypatch.setenv("TWSE_JSON_DECODER", "json")
+    assert decode.set_decoder() == "json"
+    assert decode.loads(b'{"stat": "OK"}') == {"stat": "OK"}
+    with pytest.raises(ValueError, match="not available"):
+        decode.decoder_name("simdjson")
+
+
+def test_t86_records_code_and_name_columns():
+    fields = ["股票代號", "股票名稱", "投信買賣超股數"]
+    docs = decode.t86_records(fields, [["2330", "台積電", "1,000"], ["", "", "0"]], "2024-01-05")
+    assert docs[0] == {"股票代號": "2330", "股票名稱": "台積電", "投信買賣超股數": "1,000",
+                       "date": "2024-01-05", "stock_code": "2330", "stock_name": "台積電"}
+    assert (docs[1]["stock_code"], docs[1]["stock_name"]) == (None, None)   # 空字串存為 null
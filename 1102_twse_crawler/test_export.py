@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+export.py 測試（mongomock + pyarrow）：所有檔案共用同一個 union schema、數值欄位為
+int64、依文件判斷 wide 格式，以及中斷後重新匯出不會產生重複的檔案。
+"""
+import glob
+import os
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+import export  # noqa: E402
+from db import write_t86  # noqa: E402
+from layouts import LAYOUT_ROWS, LAYOUT_WIDE  # noqa: E402
+
+OLD_FIELDS = ["證券代號", "證券名稱", "外資買賣超股數", "投信買賣超股數"]
+NEW_FIELDS = ["證券代號", "證券名稱", "外陸資買賣超股數(不含外資自營商)", "外資自營商買賣超股數", "投信買賣超股數"]
+
+
+def _docs(date, fields, values):
+    return [{**dict(zip(fields, [code, name, *nums])), "date": date, "stock_code": code, "stock_name": name}
+            for code, name, *nums in values]
+
+
+@pytest.fixture
+def t86(mongo):
+    # 2017-12 前後欄位不同；raw 字串與 typed 整數混在同一個 collection；一天以 wide 格式存放
+    write_t86(_docs("2017-11-30", OLD_FIELDS, [("2330", "台積電", "1,000", "-20")]), "t86", LAYOUT_ROWS)
+    write_t86(_docs("2017-12-18", NEW_FIELDS, [("2330", "台積電", 5, 6, 7), ("2317", "鴻海", -1, 0, 2)]),
+              "t86", LAYOUT_ROWS)
+    write_t86(_docs("2018-01-02", NEW_FIELDS, [("2330", "台積電", "8", "--", "9")]), "t86", LAYOUT_WIDE)
+    return mongo
+
+
+def _parts(out):
+    """Every file in the partition directories, temporary (dot) files included."""
+    return sorted(os.path.join(d, name) for d in glob.glob(os.path.join(out, "t86", "year=*", "month=*"))
+                  for name in os.listdir(d))
+
+
+def test_union_schema_and_int64(t86, tmp_path):
+    out = str(tmp_path)
+    res = export.export_dataset("t86", out)
+    assert res == {"rows": 4, "files": 3, "last_date": "2018-01-02"}
+    schemas = {pq.read_schema(p) for p in _parts(out)}
+    assert len(schemas) == 1
+    schema = schemas.pop()
+    assert schema.names[:3] == ["date", "stock_code", "stock_name"]
+    assert sorted(schema.names[3:]) == sorted(set(OLD_FIELDS) | set(NEW_FIELDS))
+    assert schema.field("證券代號").type == pa.string()
+    assert schema.field("投信買賣超股數").type == pa.int64()
+
+    table = pq.read_table(os.path.join(out, "t86")).sort_by([("date", "ascending"), ("stock_code", "ascending")])
+    rows = [{k: v for k, v in r.items() if k not in ("year", "month")} for r in table.to_pylist()]
+    assert rows[0]["外資買賣超股數"] == 1000 and rows[0]["投信買賣超股數"] == -20
+    assert rows[0]["外陸資買賣超股數(不含外資自營商)"] is None
+    assert [r["stock_code"] for r in rows[1:3]] == ["2317", "2330"]
+    assert rows[3] == {"date": "2018-01-02", "stock_code": "2330", "stock_name": "台積電", "證券代號": "2330",
+                       "證券名稱": "台積電", "外資買賣超股數": None, "投信買賣超股數": 9,
+                       "外陸資買賣超股數(不含外資自營商)": 8, "外資自營商買賣超股數": None}
+
+
+def test_incremental_uses_watermark(t86, tmp_path):
+    out = str(tmp_path)
+    export.export_dataset("t86", out)
+    write_t86(_docs("2018-01-03", NEW_FIELDS, [("2330", "台積電", 1, 2, 3)]), "t86", LAYOUT_ROWS)
+    assert export.export_dataset("t86", out) == {"rows": 1, "files": 1, "last_date": "2018-01-03"}
+    assert export.export_dataset("t86", out) == {"rows": 0, "files": 0, "last_date": "2018-01-03"}
+    assert pq.read_table(os.path.join(out, "t86")).num_rows == 5
+
+
+def test_crash_before_watermark_is_not_duplicated(t86, tmp_path, monkeypatch):
+    out = str(tmp_path)
+
+    def crash(*args, **kwargs):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(export, "write_watermark", crash)
+        with pytest.raises(OSError):
+            export.export_dataset("t86", out)
+    assert [os.path.basename(p)[0] for p in _parts(out)] == ["."] * 3   # 只有暫存檔
+    assert export.read_watermark(out, "t86") is None
+
+    export.export_dataset("t86", out)
+    assert len(_parts(out)) == 3
+    assert pq.read_table(os.path.join(out, "t86")).num_rows == 4
+
+
+def test_crash_after_watermark_finishes_renames(t86, tmp_path, monkeypatch):
+    out = str(tmp_path)
+
+    def crash(*args, **kwargs):
+        raise OSError("killed")
+
+    with monkeypatch.context() as m:
+        m.setattr(export, "_publish", crash)
+        with pytest.raises(OSError):
+            export.export_dataset("t86", out)
+    # watermark 已提交但檔案仍是暫存名稱：下次匯出時完成改名，不重新匯出
+    assert export.export_dataset("t86", out)["rows"] == 0
+    assert not any(os.path.basename(p).startswith(".") for p in _parts(out))
+    assert pq.read_table(os.path.join(out, "t86")).num_rows == 4
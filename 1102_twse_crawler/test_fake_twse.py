@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+fake_twse.py 測試：交易日回傳完整資料、週末與假日回傳「查無資料」、
+throttle_rps 超過時回 429 與 Retry-After、error_rate 以 seed 決定且計入 stats()，
+以及 HTML 格式。
+"""
+import datetime as dt
+
+import pytest
+import requests
+
+from fake_twse import NO_DATA_STAT, start_server
+from twse_api import NO_DATA_STAT as API_NO_DATA_STAT
+
+FRI, SAT, MON = dt.date(2024, 1, 5), dt.date(2024, 1, 6), dt.date(2024, 1, 8)
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def serve(**kwargs):
+        server = start_server(**kwargs)
+        servers.append(server)
+        return server
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _t86(server, day, **params):
+    return requests.get(f"{server.base_url}/rwd/zh/fund/T86",
+                        params={"date": day.strftime("%Y%m%d"), "selectType": "ALL", **params}, timeout=5)
+
+
+def _bfi82u(server, day):
+    return requests.get(f"{server.base_url}/rwd/zh/fund/BFI82U",
+                        params={"dayDate": day.strftime("%Y%m%d"), "type": "day"}, timeout=5)
+
+
+def test_trading_days_weekends_and_holidays(serve):
+    server = serve(n_stocks=7, holidays=[MON])
+    js = _t86(server, FRI).json()
+    assert js["stat"] == "OK" and len(js["data"]) == 7 and len(js["fields"]) == len(js["data"][0])
+    assert _bfi82u(server, FRI).json()["stat"] == "OK"
+    for day in (SAT, MON):
+        assert _t86(server, day).json() == {"stat": NO_DATA_STAT, "total": 0}
+        assert _bfi82u(server, day).json()["stat"] == NO_DATA_STAT
+    assert NO_DATA_STAT == API_NO_DATA_STAT   # twse_api 只把這個 stat 記為假日
+    assert _t86(server, FRI).json() == js      # 同一日期內容固定
+
+
+def test_throttle_answers_429_with_retry_after(serve):
+    server = serve(n_stocks=3, throttle_rps=2)
+    codes = [_t86(server, FRI) for _ in range(4)]
+    assert [r.status_code for r in codes] == [200, 200, 429, 429]
+    assert codes[2].headers["Retry-After"] == "1"
+    assert server.stats() == {"requests": 4, "errors": 0, "throttled": 2}
+
+
+def test_error_rate_is_seeded(serve):
+    def statuses(seed):
+        server = serve(n_stocks=3, error_rate=0.5, error_status=503, seed=seed)
+        got = [_t86(server, FRI).status_code for _ in range(20)]
+        assert server.stats()["errors"] == got.count(503)
+        return got
+
+    first = statuses(seed=1)
+    assert set(first) == {200, 503}
+    assert statuses(seed=1) == first
+    assert statuses(seed=2) != first
+
+
+def test_html_response_and_unknown_path(serve):
+    server = serve(n_stocks=3)
+    r = _t86(server, FRI, response="html")
+    assert r.headers["Content-Type"].startswith("text/html") and "<table" in r.text
+    assert requests.get(f"{server.base_url}/rwd/zh/fund/MI_INDEX", timeout=5).status_code == 404
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+frame.py 測試：fetch_t86_frame(...).to_records() 與 fetch_t86(schema="typed") 逐列
+相同；查無資料的日期回傳 None；空白 / "--" 格子、列寬不一致、舊欄位名稱（股票代號）
+與不存在的欄位 / 股票等查詢邊界情況。不需網路與 MongoDB。
+"""
+import datetime as dt
+import json
+import types
+from urllib.parse import urlsplit
+
+import pytest
+
+import twse_api
+from fake_twse import build_payload
+from frame import T86DayFrame
+from schema import type_rows
+from synthetic import T86_FIELDS
+
+DAY = dt.date(2024, 1, 2)
+HOLIDAY = dt.date(2024, 1, 6)
+N = 50
+
+
+class _Transport:
+    """Serves fake_twse payloads without a socket."""
+
+    def get(self, url, params=None, **kwargs):
+        payload = build_payload(urlsplit(url).path, {k: [str(v)] for k, v in params.items()}, n_stocks=N)
+        return types.SimpleNamespace(status_code=200, ok=True, content=json.dumps(payload).encode("utf-8"))
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(twse_api, "_cache", None)
+    monkeypatch.setattr(twse_api, "_cache_loaded", True)
+
+
+def test_frame_matches_fetch_t86_row_for_row():
+    docs = twse_api.fetch_t86(DAY, transport=_Transport(), schema="typed")
+    frame = twse_api.fetch_t86_frame(DAY, transport=_Transport())
+    assert len(frame) == len(docs) == N
+    records = frame.to_records()
+    for got, want in zip(records, docs):
+        assert got == want
+        assert list(got) == list(want)   # 欄位順序也相同
+        assert all(type(got[k]) is type(want[k]) for k in want)
+    assert [dict(row) for row in frame] == docs
+    assert T86DayFrame.from_records(twse_api.fetch_t86(DAY, transport=_Transport(), schema="raw")).to_records() == docs
+
+
+def test_empty_day():
+    skipped = []
+    assert twse_api.fetch_t86_frame(HOLIDAY, transport=_Transport(), on_no_data=skipped.append) is None
+    assert skipped == [HOLIDAY]
+
+    frame = T86DayFrame.from_payload(T86_FIELDS, [], HOLIDAY.isoformat())
+    assert len(frame) == 0 and frame.fields == () and frame.to_records() == []
+    assert frame.stock("2330") is None and list(frame) == []
+    with pytest.raises(ValueError):
+        T86DayFrame.from_records([])
+
+
+def test_blank_cells_are_masked():
+    fields = ["證券代號", "證券名稱", "投信買賣超股數", "自營商買賣超股數"]
+    rows = [["2330", "台積電", "1,000", "--"], ["2317", "鴻海", "", "-3"]]
+    frame = T86DayFrame.from_payload(fields, rows, DAY.isoformat())
+    assert frame.column("投信買賣超股數").tolist() == [1000, 0]
+    assert frame.nulls("投信買賣超股數").tolist() == [0, 1]
+    assert frame.nulls("證券代號") is None
+    assert frame.stock("2330")["自營商買賣超股數"] is None
+    assert frame.stock("2317")["投信買賣超股數"] is None
+    assert frame.to_records() == [dict(zip(fields, r), date=DAY.isoformat(), stock_code=r[0], stock_name=r[1])
+                                  for r in type_rows(fields, rows)]
+
+
+def test_values_outside_int64_are_masked():
+    fields = ["證券代號", "證券名稱", "投信買賣超股數"]
+    rows = [["2330", "台積電", "9,223,372,036,854,775,808"], ["2317", "鴻海", "9,223,372,036,854,775,807"],
+            ["2454", "聯發科", "-9,223,372,036,854,775,809"]]
+    frame = T86DayFrame.from_payload(fields, rows, DAY.isoformat())
+    # 與 schema.int64_column 相同：超出 int64 的值為 None，其他格子照常解析
+    assert frame.nulls("投信買賣超股數").tolist() == [1, 0, 1]
+    assert frame.column("投信買賣超股數")[1] == 2 ** 63 - 1
+    assert frame.to_records() == [dict(zip(fields, r), date=DAY.isoformat(), stock_code=r[0], stock_name=r[1])
+                                  for r in type_rows(fields, rows)]
+    typed = frame.to_records()
+    typed[1]["投信買賣超股數"] = 2 ** 64                # 已是 int 的值也一樣
+    assert T86DayFrame.from_records(typed).stock("2317")["投信買賣超股數"] is None
+
+
+def test_from_records_ignores_storage_fields():
+    docs = twse_api.fetch_t86(DAY, transport=_Transport(), schema="typed")
+    stored = [dict(d, _id=i, ts=DAY, _hash="0123456789abcdef") for i, d in enumerate(docs)]
+    frame = T86DayFrame.from_records(stored)
+    assert "_hash" not in frame.fields and "ts" not in frame.fields
+    assert frame.to_records() == docs
+
+
+def test_rows_cut_to_common_width():
+    rows = [["2330", "台積電", "1", "2"], ["2317", "鴻海", "3"]]
+    frame = T86DayFrame.from_payload(["證券代號", "證券名稱", "投信買賣超股數", "自營商買賣超股數"], rows, "2024-01-02")
+    assert frame.fields == ("證券代號", "證券名稱", "投信買賣超股數")
+    with pytest.raises(KeyError):
+        frame.column("自營商買賣超股數")
+
+
+def test_column_and_row_lookups():
+    fields = ["股票代號", "股票名稱", "外資買賣超股數"]   # 舊版欄位名稱
+    frame = T86DayFrame.from_payload(fields, [[" 2330 ", "台積電", "7"], ["1101", "台泥", "-1"]], "2012-05-02")
+    assert frame.codes == ("2330", "1101") and frame.names == ("台積電", "台泥")
+    assert isinstance(frame.column("股票代號"), tuple)
+    assert isinstance(frame.column("外資買賣超股數"), memoryview)
+    with pytest.raises(KeyError):
+        frame.column("投信買賣超股數")
+
+    row = frame.stock("2330")
+    assert row["date"] == "2012-05-02" and row["stock_code"] == "2330" and row["外資買賣超股數"] == 7
+    assert len(row) == len(list(row)) == len(fields) + 3
+    assert row.get("投信買賣超股數") is None
+    with pytest.raises(KeyError):
+        row["投信買賣超股數"]
+    assert frame.stock("9999") is None and frame.index_of("9999") is None
+
+
+def test_slice_shares_buffers():
+    frame = twse_api.fetch_t86_frame(DAY, transport=_Transport())
+    part = frame.slice(10, 20)
+    name = T86_FIELDS[-1]
+    assert part.to_records() == frame.to_records()[10:20]
+    assert part.column(name).obj is frame.column(name).obj   # memoryview 指向同一個 array
+    assert part.stock(frame.codes[15]) == frame.stock(frame.codes[15])
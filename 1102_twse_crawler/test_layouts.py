@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+T86 儲存格式測試（mongomock）：rows / wide / timeseries 寫入後以 read_t86_day 讀回
+的結果相同，migrate_t86_layout 在 rows→wide→rows、rows→timeseries 之間轉換後資料不變；
+async_db 共用的 t86_wide_ops / timeseries_day_split 只重寫有變更的日期 / 股票；
+timeseries 的讀取與刪除以 (date) 索引篩選。
+"""
+import datetime as dt
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from db import (HASH_FIELD, migrate_t86_layout, read_t86_day, t86_hash_query, t86_indexes, t86_wide_ops,
+                timeseries_day_split, upsert_t86, write_t86)
+from layouts import LAYOUT_ROWS, LAYOUT_TIMESERIES, LAYOUT_WIDE, is_wide, rows_to_wide, wide_to_rows
+from schema import type_rows
+from synthetic import T86_FIELDS, t86_rows
+
+DAYS = [dt.date(2024, 1, 2), dt.date(2024, 1, 3), dt.date(2024, 1, 4)]
+STOCKS = 6
+
+
+def _docs(d, typed=False):
+    rows = t86_rows(d, STOCKS)
+    if typed:
+        rows = type_rows(T86_FIELDS, rows)
+    return [{**dict(zip(T86_FIELDS, r)), "date": d.isoformat(), "stock_code": r[0], "stock_name": r[1]}
+            for r in rows]
+
+
+def _day(date, name="t86"):
+    return sorted(read_t86_day(date, name), key=lambda r: r["stock_code"])
+
+
+@pytest.fixture
+def stored(mongo):
+    """Three days in the rows layout (the last one typed); returns {date: rows} as read back."""
+    for i, d in enumerate(DAYS):
+        upsert_t86(_docs(d, typed=i == 2))
+    return {d.isoformat(): _day(d.isoformat()) for d in DAYS}
+
+
+def test_rows_to_wide_and_back():
+    docs = _docs(DAYS[0])
+    wide = rows_to_wide(docs)
+    assert wide["stock_codes"] == [d["stock_code"] for d in docs]
+    assert wide_to_rows(wide) == docs
+
+
+@pytest.mark.parametrize("layout", [LAYOUT_ROWS, LAYOUT_WIDE, LAYOUT_TIMESERIES])
+def test_every_layout_reads_back_the_same_rows(mongo, monkeypatch, layout):
+    monkeypatch.setenv("TWSE_LAYOUT_T86", layout)
+    for d in DAYS:
+        upsert_t86(_docs(d))
+    for d in DAYS:
+        assert _day(d.isoformat()) == sorted(_docs(d), key=lambda r: r["stock_code"])
+    expected = len(DAYS) if layout == LAYOUT_WIDE else len(DAYS) * STOCKS
+    assert mongo["t86"].count_documents({}) == expected
+
+
+def test_migrate_rows_wide_rows(mongo, stored):
+    assert migrate_t86_layout(LAYOUT_WIDE) == len(DAYS)
+    assert mongo["t86"].count_documents({}) == len(DAYS)
+    assert all(is_wide(doc) for doc in mongo["t86"].find())
+    assert {date: _day(date) for date in stored} == stored
+
+    assert migrate_t86_layout(LAYOUT_ROWS) == len(DAYS)
+    assert mongo["t86"].count_documents({}) == len(DAYS) * STOCKS
+    assert not any(is_wide(doc) for doc in mongo["t86"].find())
+    assert {date: _day(date) for date in stored} == stored
+    assert "t86__wide" not in mongo.list_collection_names()
+
+
+def test_migrate_rows_timeseries(mongo, stored):
+    assert migrate_t86_layout(LAYOUT_TIMESERIES) == len(DAYS)
+    assert mongo["t86"].count_documents({}) == len(DAYS) * STOCKS
+    assert all(isinstance(doc["ts"], dt.datetime) for doc in mongo["t86"].find())
+    assert {date: _day(date) for date in stored} == stored
+    assert "t86__old" not in mongo.list_collection_names()
+    # 轉換後重寫相同資料：全部跳過
+    counts = write_t86(_docs(DAYS[0]), "t86", LAYOUT_TIMESERIES)
+    assert (counts.inserted, counts.changed, counts.skipped) == (0, 0, STOCKS)
+
+
+def test_wide_ops_replace_whole_changed_day(mongo):
+    coll = mongo["t86"]
+    docs = _docs(DAYS[0]) + _docs(DAYS[1])
+    ops, counts = t86_wide_ops(docs, [])
+    assert len(ops) == 2 and counts.inserted == 2 * STOCKS
+    coll.bulk_write(ops)
+    changed = _docs(DAYS[1])
+    changed[0] = {**changed[0], "投信買賣超股數": "1"}
+    docs = _docs(DAYS[0]) + changed
+    ops, counts = t86_wide_ops(docs, coll.find(*t86_hash_query(docs, LAYOUT_WIDE)))
+    assert len(ops) == 1
+    assert (counts.inserted, counts.changed, counts.skipped) == (0, STOCKS, STOCKS)
+    coll.bulk_write(ops)
+    row = next(r for r in read_t86_day(DAYS[1].isoformat()) if r["stock_code"] == changed[0]["stock_code"])
+    assert row["投信買賣超股數"] == "1"
+
+
+def test_timeseries_day_split():
+    rows = _docs(DAYS[0])
+    fresh, stale = timeseries_day_split(rows, [])
+    assert len(fresh) == STOCKS and stale == []
+    stored = [{"stock_code": r["stock_code"], HASH_FIELD: r[HASH_FIELD]} for r in fresh]
+    rows[1] = {**rows[1], "投信買賣超股數": "1"}
+    fresh, stale = timeseries_day_split(rows, stored[1:])
+    assert [r["stock_code"] for r in fresh] == [rows[0]["stock_code"]]
+    assert [r["stock_code"] for r in stale] == [rows[1]["stock_code"]]
+
+
+def test_timeseries_rewrite_filters_on_the_date_index(mongo, monkeypatch):
+    import mongomock.collection as mcoll
+
+    write_t86(_docs(DAYS[0]), "t86", LAYOUT_TIMESERIES)
+    filters = []
+    for method in ("find", "delete_many"):
+        orig = getattr(mcoll.Collection, method)
+
+        def spy(self, filter=None, *args, _orig=orig, **kwargs):
+            filters.append(filter)
+            return _orig(self, filter, *args, **kwargs)
+
+        monkeypatch.setattr(mcoll.Collection, method, spy)
+    changed = _docs(DAYS[0])
+    changed[0] = {**changed[0], "投信買賣超股數": "1"}
+    counts = write_t86(changed, "t86", LAYOUT_TIMESERIES)
+    assert (counts.inserted, counts.changed, counts.skipped) == (0, 1, STOCKS - 1)
+    assert filters
+    indexed = {keys[0][0] for keys, _ in t86_indexes(LAYOUT_TIMESERIES)}
+    assert all(next(iter(f)) == "date" and "date" in indexed for f in filters)
+    assert _day(DAYS[0].isoformat()) == sorted(changed, key=lambda r: r["stock_code"])
+
+
+def test_timeseries_rewrite_before_mongodb_7_is_explained(mongo, monkeypatch):
+    import mongomock.collection as mcoll
+
+    write_t86(_docs(DAYS[0]), "t86", LAYOUT_TIMESERIES)
+
+    def delete_many(self, *args, **kwargs):
+        raise OperationFailure("Cannot perform an update or delete on a time-series collection", code=72)
+
+    monkeypatch.setattr(mcoll.Collection, "delete_many", delete_many)
+    changed = _docs(DAYS[0])
+    changed[0] = {**changed[0], "投信買賣超股數": "1"}
+    with pytest.raises(RuntimeError, match="MongoDB 7.0"):
+        write_t86(changed, "t86", LAYOUT_TIMESERIES)
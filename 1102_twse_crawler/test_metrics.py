@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+metrics.py 測試：Histogram 的 bucket 邊界與分位數、Counter、Registry.merge() 合併
+其他行程的 state() 後與在同一行程記錄相同，以及 Prometheus 文字格式與 /metrics。
+"""
+import pickle
+import re
+
+import pytest
+import requests
+
+import metrics
+from metrics import Histogram, Registry, serve_metrics
+
+SAMPLE = re.compile(r'^(\w+)(?:\{([^}]*)\})? (\S+)$')
+
+
+def _record(reg, values, retries):
+    for v in values:
+        reg.observe("twse_fetch_seconds", "t86", v)
+        reg.observe("twse_rows", "bfi82u", 6)
+    reg.inc("twse_retries_total", "t86", retries)
+
+
+def test_histogram_buckets_and_quantiles():
+    h = Histogram((0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 1.0, 3.0):
+        h.observe(v)
+    assert h.counts == [2, 2, 1]                 # 等於上界的值落在該 bucket（le）
+    assert h.quantile(0.4) == 0.1 and h.quantile(0.8) == 1.0
+    assert h.quantile(1.0) is None               # 最後一筆超過最大的 bucket
+    snap = h.snapshot()
+    assert (snap["count"], snap["sum"], snap["p50_le"]) == (5, 4.65, 1.0)
+    assert Histogram((1.0,)).snapshot()["mean"] is None
+
+
+def test_merge_equals_recording_in_one_process():
+    a, b, together = Registry(), Registry(), Registry()
+    _record(a, [0.002, 0.3], retries=1)
+    _record(b, [0.02, 7.0, 40.0], retries=2)
+    _record(together, [0.002, 0.3, 0.02, 7.0, 40.0], retries=3)
+
+    merged = Registry()
+    for reg in (a, b):
+        merged.merge(pickle.loads(pickle.dumps(reg.state())))   # 跨行程以 pickle 傳遞
+    state, expected = merged.state(), together.state()
+    assert state.keys() == expected.keys()
+    for key, value in expected.items():
+        if isinstance(value, tuple):             # (bucket counts, count, sum)
+            assert state[key][:2] == value[:2] and state[key][2] == pytest.approx(value[2])
+        else:
+            assert state[key] == value
+    assert merged.summary() == together.summary()
+    assert merged.summary()["t86"]["twse_retries_total"] == 3
+
+
+def test_exposition_format():
+    reg = Registry()
+    _record(reg, [0.002, 0.3, 40.0], retries=2)
+    lines = reg.exposition().splitlines()
+    assert lines[:2] == ["# HELP twse_fetch_seconds HTTP request latency per attempt",
+                         "# TYPE twse_fetch_seconds histogram"]
+    samples = {}
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        m = SAMPLE.match(line)
+        assert m, line
+        samples[(m.group(1), m.group(2))] = float(m.group(3))
+
+    buckets = [v for (name, labels), v in samples.items()
+               if name == "twse_fetch_seconds_bucket" and 'le="+Inf"' not in labels]
+    assert buckets == sorted(buckets)            # 累計值
+    assert samples[("twse_fetch_seconds_bucket", 'dataset="t86",le="0.005"')] == 1
+    assert samples[("twse_fetch_seconds_bucket", 'dataset="t86",le="+Inf"')] == 3
+    assert samples[("twse_fetch_seconds_count", 'dataset="t86"')] == 3
+    assert samples[("twse_fetch_seconds_sum", 'dataset="t86"')] == pytest.approx(40.302)
+    assert samples[("twse_retries_total", 'dataset="t86"')] == 2
+    assert "# TYPE twse_retries_total counter" in lines
+
+
+def test_serve_metrics(monkeypatch):
+    reg = Registry()
+    reg.inc("twse_fetch_failures_total", "bfi82u")
+    monkeypatch.setattr(metrics, "METRICS", reg)
+    server = serve_metrics(0)
+    try:
+        base = "http://127.0.0.1:%d" % server.server_address[1]
+        r = requests.get(base + "/metrics", timeout=5)
+        assert r.status_code == 200
+        assert r.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        assert r.text == reg.exposition()
+        assert requests.get(base + "/other", timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+query.py 測試（mongomock）：T86 / BFI82U 寫入時（db.notify_write）涵蓋該日期的快取
+項目失效、其他日期保留；TTL 到期與 LRU 淘汰；其他行程寫入時由 ingest_ledger 失效。
+"""
+import datetime as dt
+import types
+
+import pytest
+
+import query
+from db import record_ingest, upsert_bfi82u, write_t86
+from decode import t86_records
+from synthetic import T86_FIELDS, t86_rows
+from layouts import LAYOUT_ROWS
+from writer import BulkWriter
+
+D1, D2 = dt.date(2024, 1, 2), dt.date(2024, 1, 3)
+
+
+def _t86(d, bump=None):
+    docs = t86_records(T86_FIELDS, t86_rows(d, 4), d.isoformat())
+    if bump is not None:
+        docs[0] = {**docs[0], "投信買賣超股數": bump}
+    return docs
+
+
+def _bfi82u(d, value="1"):
+    return {"date": d.isoformat(), "fields": ["單位名稱", "買賣差額"], "rows": [{"單位名稱": "投信", "買賣差額": value}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = types.SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(query, "time", types.SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+@pytest.fixture
+def cache(mongo, clock):
+    cache = query.configure_query_cache(maxsize=100, ttl=60, refresh=0)
+    for d in (D1, D2):
+        write_t86(_t86(d), "t86", LAYOUT_ROWS)
+        upsert_bfi82u(_bfi82u(d))
+    cache.clear()
+    yield cache
+    query.configure_query_cache()
+
+
+def _code():
+    return _t86(D1)[0]["stock_code"]
+
+
+def test_repeated_reads_hit(cache):
+    first = query.t86_day(D1.isoformat())
+    assert query.t86_day(D1.isoformat()) is first
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_t86_write_evicts_covering_entries(cache):
+    day1 = query.t86_day(D1.isoformat())
+    day2 = query.t86_day(D2.isoformat())
+    history = query.stock_history(_code(), D1.isoformat(), D2.isoformat())
+    dates = query.dates("t86")
+    bfi = query.bfi82u_day(D1.isoformat())
+
+    write_t86(_t86(D1, bump="999"), "t86", LAYOUT_ROWS)
+    assert query.t86_day(D2.isoformat()) is day2   # 其他日期保留
+    assert query.bfi82u_day(D1.isoformat()) is bfi   # 其他 dataset 保留
+    assert query.t86_stock(_code(), D1.isoformat())["投信買賣超股數"] == "999"
+    assert query.t86_day(D1.isoformat()) is not day1
+    assert query.stock_history(_code(), D1.isoformat(), D2.isoformat())[0]["投信買賣超股數"] == "999"
+    assert query.stock_history(_code(), D1.isoformat(), D2.isoformat()) is not history
+    assert query.dates("t86") is not dates   # 不限日期的項目一律失效
+    assert cache.stats()["invalidations"] >= 3
+
+
+def test_unchanged_write_keeps_cache(cache):
+    day1 = query.t86_day(D1.isoformat())
+    write_t86(_t86(D1), "t86", LAYOUT_ROWS)   # content hash 相同：沒有寫入，也不失效
+    assert query.t86_day(D1.isoformat()) is day1
+
+
+def test_bfi82u_write_evicts(cache):
+    unit = query.bfi82u_unit("投信", D1.isoformat(), D2.isoformat())
+    day2 = query.bfi82u_day(D2.isoformat())
+    upsert_bfi82u(_bfi82u(D1, value="42"))
+    assert query.bfi82u_day(D2.isoformat()) is day2
+    assert [r["買賣差額"] for r in query.bfi82u_unit("投信", D1.isoformat(), D2.isoformat())] == ["42", "1"]
+    assert query.bfi82u_unit("投信", D1.isoformat(), D2.isoformat()) is not unit
+
+
+def test_bulk_writer_evicts(cache):
+    day1 = query.t86_day(D1.isoformat())
+    bfi = query.bfi82u_day(D1.isoformat())
+    w = BulkWriter(linger=0)
+    w.submit_t86(_t86(D1, bump="7"))
+    w.submit_bfi82u(_bfi82u(D1, value="8"))
+    w.close()
+    assert query.t86_day(D1.isoformat()) is not day1
+    assert query.bfi82u_day(D1.isoformat())["rows"][0]["買賣差額"] == "8"
+    assert query.bfi82u_day(D1.isoformat()) is not bfi
+
+
+def test_ttl_expiry(cache, clock):
+    first = query.t86_day(D1.isoformat())
+    clock.value += 59
+    assert query.t86_day(D1.isoformat()) is first
+    clock.value += 2
+    assert query.t86_day(D1.isoformat()) is not first
+    assert cache.stats()["expirations"] == 1
+
+
+def test_lru_eviction(mongo, clock):
+    cache = query.configure_query_cache(maxsize=2, ttl=60, refresh=0)
+    try:
+        cache.put("a", 1, "t86")
+        cache.put("b", 2, "t86")
+        assert cache.get("a") == 1   # a 變成最近使用
+        cache.put("c", 3, "t86")
+        assert cache.get("b") is query._MISS
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+    finally:
+        query.configure_query_cache()
+
+
+def test_stale_read_is_not_cached(cache):
+    # 讀取期間有寫入（generation 改變）時，讀到的舊結果不放入快取
+    generation = cache.generation
+    cache.invalidate("t86", [D1.isoformat()])
+    cache.put(("t86_day", D1.isoformat()), "stale", "t86", D1.isoformat(), D1.isoformat(), generation)
+    assert cache.get(("t86_day", D1.isoformat())) is query._MISS
+
+
+def test_ledger_watch_evicts_other_process_writes(mongo, clock):
+    cache = query.configure_query_cache(maxsize=100, ttl=600, refresh=5)
+    try:
+        write_t86(_t86(D1), "t86", LAYOUT_ROWS)
+        record_ingest("t86", D1.isoformat(), 4, "h1")
+        first = query.t86_day(D1.isoformat())   # 第一次檢查只記錄目前的 ingested_at
+
+        # 其他行程重新匯入 D1：直接改資料庫（不經過本行程的 notify_write）並寫入 ledger
+        mongo["t86"].update_many({"date": D1.isoformat()}, {"$set": {"投信買賣超股數": "555"}})
+        record_ingest("t86", D1.isoformat(), 4, "h2")
+        assert query.t86_day(D1.isoformat()) is first   # 尚未到下次檢查時間
+        clock.value += 6
+        assert query.t86_day(D1.isoformat())[0]["投信買賣超股數"] == "555"
+        assert cache.stats()["invalidations"] == 1
+    finally:
+        query.configure_query_cache()
+
+
+def test_ledger_watch_sees_reingest_in_same_millisecond(mongo, clock):
+    cache = query.configure_query_cache(maxsize=100, ttl=600, refresh=5)
+    try:
+        write_t86(_t86(D1), "t86", LAYOUT_ROWS)
+        record_ingest("t86", D1.isoformat(), 4, "h1")
+        at = mongo["ingest_ledger"].find_one({"date": D1.isoformat()})["ingested_at"]
+        first = query.t86_day(D1.isoformat())
+
+        # ingested_at 只到毫秒：其他行程在同一毫秒內重新匯入，以 hash 區分
+        mongo["t86"].update_many({"date": D1.isoformat()}, {"$set": {"投信買賣超股數": "555"}})
+        record_ingest("t86", D1.isoformat(), 4, "h2")
+        mongo["ingest_ledger"].update_one({"date": D1.isoformat()}, {"$set": {"ingested_at": at}})
+        clock.value += 6
+        assert query.t86_day(D1.isoformat()) is not first
+        clock.value += 6
+        second = query.t86_day(D1.isoformat())
+        clock.value += 6
+        assert query.t86_day(D1.isoformat()) is second   # 已處理過的項目不會重複失效
+        assert cache.stats()["invalidations"] == 1
+    finally:
+        query.configure_query_cache()
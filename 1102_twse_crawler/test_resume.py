@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+ingest_ledger 續跑測試（mongomock）：重跑同一區間時跳過已完成的 (報表, 日期)，
+只重新抓取上次失敗的工作；--no-resume 則全部重抓。抓取以假資料取代，不需網路。
+"""
+import pytest
+
+import cli
+from db import completed_jobs, record_ingest
+from synthetic import BFI82U_FIELDS, T86_FIELDS, bfi82u_rows, t86_rows
+
+DAYS = ["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"]
+
+
+class _Fetcher:
+    """Stand-in for twse_api.fetch_t86 / fetch_bfi82u that records calls and can fail given dates."""
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+
+    def t86(self, date, on_no_data=None, schema=None):
+        self.calls.append(("t86", date.isoformat()))
+        if ("t86", date.isoformat()) in self.fail:
+            return []   # 請求失敗：不是「查無資料」，不記入 ledger
+        return [{**dict(zip(T86_FIELDS, r)), "date": date.isoformat(), "stock_code": r[0], "stock_name": r[1]}
+                for r in t86_rows(date, 5)]
+
+    def bfi82u(self, date, on_no_data=None, schema=None):
+        self.calls.append(("bfi82u", date.isoformat()))
+        if ("bfi82u", date.isoformat()) in self.fail:
+            return None
+        rows = [dict(zip(BFI82U_FIELDS, r)) for r in bfi82u_rows(date)]
+        return {"date": date.isoformat(), "fields": BFI82U_FIELDS, "rows": rows}
+
+
+@pytest.fixture
+def run(mongo, monkeypatch, tmp_path):
+    def run(fetcher, *extra):
+        monkeypatch.setattr(cli, "fetch_t86", fetcher.t86)
+        monkeypatch.setattr(cli, "fetch_bfi82u", fetcher.bfi82u)
+        argv = ["both", "--start", DAYS[0], "--end", DAYS[-1], "--sleep", "0",
+                "--calendar-file", str(tmp_path / "calendar.json"), *extra]
+        return cli.main(argv)
+    return run
+
+
+def test_completed_jobs_reads_ledger(mongo):
+    record_ingest("t86", "2024-01-02", 10, "h1")
+    record_ingest("bfi82u", "2024-01-02", 5, "h2")
+    record_ingest("t86", "2024-02-01", 10, "h3")
+    assert completed_jobs(["t86"], "2024-01-01", "2024-01-31") == {("t86", "2024-01-02")}
+    assert completed_jobs(["t86", "bfi82u"], "2024-01-02", "2024-02-01") == {
+        ("t86", "2024-01-02"), ("bfi82u", "2024-01-02"), ("t86", "2024-02-01")}
+
+
+@pytest.mark.parametrize("writers", ["1", "0"])
+@pytest.mark.parametrize("concurrency", ["1", "4"])
+def test_rerun_skips_completed_and_retries_failed(run, mongo, concurrency, writers):
+    failed = {("t86", "2024-01-03"), ("bfi82u", "2024-01-05")}
+    first = _Fetcher(fail=failed)
+    assert run(first, "--concurrency", concurrency, "--writers", writers) == 0
+    assert len(first.calls) == 8
+    assert completed_jobs(["t86", "bfi82u"], DAYS[0], DAYS[-1]) == {
+        (name, d) for d in DAYS for name in ("t86", "bfi82u")} - failed
+
+    second = _Fetcher()
+    assert run(second, "--concurrency", concurrency, "--writers", writers) == 0
+    assert sorted(second.calls) == sorted(failed)
+    assert len(completed_jobs(["t86", "bfi82u"], DAYS[0], DAYS[-1])) == 8
+    assert mongo["t86"].count_documents({}) == 4 * 5
+
+    third = _Fetcher()
+    assert run(third, "--concurrency", concurrency, "--writers", writers) == 0
+    assert third.calls == []
+
+
+def test_no_resume_fetches_everything(run):
+    run(_Fetcher())
+    again = _Fetcher()
+    run(again, "--no-resume")
+    assert len(again.calls) == 8
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+rolling.py 測試（mongomock）：逐日增量更新的 5 / 20 / 60 日累計與 rebuild() 從頭
+計算的結果完全相同（視窗未滿、剛滿、滑動之後），重新匯入視窗內的某天時改為重建。
+"""
+import datetime as dt
+
+import pytest
+
+import rolling
+from db import write_t86
+from decode import t86_records
+from synthetic import T86_FIELDS, t86_rows
+from layouts import LAYOUT_ROWS
+from schema import type_rows
+
+
+def _trading_days(n):
+    days, d = [], dt.date(2024, 1, 2)
+    while len(days) < n:
+        if d.weekday() < 5:
+            days.append(d)
+        d += dt.timedelta(days=1)
+    return days
+
+
+DAYS = _trading_days(70)
+
+
+def _docs(i, d):
+    # 每天的股票數不同（有股票中途出現 / 消失），raw 與 typed 交錯
+    rows = t86_rows(d, 6 + i % 5)
+    return t86_records(T86_FIELDS, type_rows(T86_FIELDS, rows) if i % 2 else rows, d.isoformat())
+
+
+def _snapshot(mongo):
+    return {doc["stock_code"]: doc for doc in mongo[rolling.ROLLING_COLLECTION].find({}, {"_id": 0})}
+
+
+def _rebuilt(mongo):
+    rolling.rebuild()
+    return _snapshot(mongo)
+
+
+def test_day_flows_raw_and_legacy_fields():
+    rows = [{"stock_code": "2330", "stock_name": "台積電", "外陸資買賣超股數(不含外資自營商)": "1,000",
+             "外資自營商買賣超股數": "-10", "投信買賣超股數": "5", "自營商買賣超股數": "--"},
+            {"stock_code": "2317", "stock_name": "鴻海", "外資買賣超股數": 7, "投信買賣超股數": 0,
+             "自營商買賣超股數": -3}]
+    assert rolling.day_flows(rows) == {
+        "2330": ("台積電", {"foreign": 990, "trust": 5, "dealer": 0}),
+        "2317": ("鴻海", {"foreign": 7, "trust": 0, "dealer": -3})}
+
+
+def test_incremental_matches_rebuild(mongo):
+    checkpoints = {3, 5, 20, 59, 60, 61, 70}
+    for i, d in enumerate(DAYS, 1):
+        write_t86(_docs(i, d), "t86", LAYOUT_ROWS)
+        assert rolling.update_rolling([d.isoformat()]) == "incremental"
+        if i in checkpoints:
+            incremental = _snapshot(mongo)
+            assert incremental == _rebuilt(mongo), f"day {i}"
+            assert all(len(doc["flows"]["trust"]) == min(i, rolling.MAX_WINDOW) for doc in incremental.values())
+    some = next(iter(incremental.values()))
+    for n in rolling.WINDOWS:
+        assert some[f"trust_{n}"] == sum(some["flows"]["trust"][-n:])
+
+
+def test_reapplied_day_rebuilds(mongo):
+    for i, d in enumerate(DAYS[:25], 1):
+        write_t86(_docs(i, d), "t86", LAYOUT_ROWS)
+        rolling.update_rolling([d.isoformat()])
+    with pytest.raises(ValueError):
+        rolling.apply_day(DAYS[10].isoformat())
+
+    # 重新匯入視窗內的一天（資料有變更）：改為重建，結果反映新的資料
+    docs = _docs(11, DAYS[10])
+    docs[0] = {**docs[0], "投信買賣超股數": "1,000,000"}
+    write_t86(docs, "t86", LAYOUT_ROWS)
+    before = _snapshot(mongo)[docs[0]["stock_code"]]
+    assert rolling.update_rolling([DAYS[10].isoformat()]) == "rebuild"
+    after = _snapshot(mongo)
+    assert after[docs[0]["stock_code"]]["trust_20"] != before["trust_20"]
+    assert after == _rebuilt(mongo)
+
+    # 接著的新交易日照常增量更新，仍與重建一致
+    write_t86(_docs(26, DAYS[25]), "t86", LAYOUT_ROWS)
+    assert rolling.update_rolling([DAYS[25].isoformat()]) == "incremental"
+    assert _snapshot(mongo) == _rebuilt(mongo)
+
+
+def test_old_and_empty_days(mongo):
+    for i, d in enumerate(DAYS[:65], 1):
+        write_t86(_docs(i, d), "t86", LAYOUT_ROWS)
+    rolling.rebuild()
+    before = _snapshot(mongo)
+    assert rolling.update_rolling([DAYS[0].isoformat()]) == "unchanged"   # 早於視窗
+    assert rolling.update_rolling(["2030-01-02"]) == "unchanged"          # 沒有資料的日期
+    assert _snapshot(mongo) == before
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+schema.py 測試：千分位與正負號解析為 int64、空白與 "--" 為 None、代號 / 名稱等
+文字欄位不做數值轉換、超出 int64 範圍的值為 None、
+整欄轉換與逐格轉換結果相同，以及整天資料依欄批次轉換。
+"""
+from bson.int64 import Int64
+
+from schema import _parse_int, column_converters, int64_column, text_column, type_rows
+
+
+def test_commas_and_signs():
+    values = int64_column(["1,234,567", "-2,000", "+15", "0", " 42 "])
+    assert values == [1234567, -2000, 15, 0, 42]
+    assert all(type(v) is Int64 for v in values)
+
+
+def test_int64_range():
+    assert int64_column(["9,223,372,036,854,775,807"]) == [2 ** 63 - 1]
+    # 超出 int64 的值 BSON 無法儲存，與無法解析的值一樣轉為 None
+    assert int64_column(["9,223,372,036,854,775,808", "-9,223,372,036,854,775,809", "1"]) == [None, None, 1]
+    assert int64_column(["-9,223,372,036,854,775,808", "--"]) == [-(2 ** 63), None]
+
+
+def test_fast_path_matches_per_cell_parsing():
+    clean = ["1,234,567", "-2,000", "+15", "0", " 42 ", "9,223,372,036,854,775,807"]
+    assert int64_column(clean) == [_parse_int(v) for v in clean]   # 整欄一次轉換
+    mixed = clean + ["--"]
+    assert int64_column(mixed) == [_parse_int(v) for v in mixed]   # 有一格失敗時逐格轉換
+    assert int64_column(mixed)[:-1] == int64_column(clean)
+
+
+def test_blank_and_placeholder_become_none():
+    assert int64_column(["1,000", "", "  ", "--", "-"]) == [1000, None, None, None, None]
+
+
+def test_non_numeric_values_are_rejected():
+    assert int64_column(["12.5", "N/A", "1,2a3", "1e3"]) == [None, None, None, None]
+    assert int64_column([None, 7, Int64(8), "9"]) == [None, 7, 8, 9]
+
+
+def test_text_columns_are_not_converted():
+    fields = ["證券代號", "證券名稱", "單位名稱", "投信買賣超股數"]
+    assert [c.__name__ for c in column_converters(fields)] == ["text_column", "text_column", "text_column",
+                                                               "int64_column"]
+    assert text_column(["0050  ", " 元大台灣50", None]) == ["0050", "元大台灣50", None]
+
+
+def test_type_rows_column_by_column():
+    fields = ["證券代號", "證券名稱", "投信買賣超股數", "三大法人買賣超股數"]
+    rows = [["2330 ", "台積電 ", "1,000", "-3,500"],
+            ["00715L", "期街口布蘭特正2", "--", "182,289,217", "extra"]]
+    assert type_rows(fields, rows) == [("2330", "台積電", 1000, -3500),
+                                       ("00715L", "期街口布蘭特正2", None, 182289217)]
+    assert type_rows(fields, []) == []
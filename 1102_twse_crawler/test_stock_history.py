@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+stock_history 的索引測試：以 explain() 確認單一股票歷史查詢不會掃描整個 collection，
+只要求 HISTORY_FIELDS 時完全由索引回答（不讀取文件）。
+
+需要本機 mongod（MONGODB_URI），連不上時略過；使用獨立的 twse_test_history 資料庫。
+"""
+import datetime as dt
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from config import get_mongo_uri
+
+TEST_DB = "twse_test_history"
+DAYS = 40
+STOCKS = 30
+
+
+def _mongod_available():
+    try:
+        MongoClient(get_mongo_uri(), serverSelectionTimeoutMS=500).admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not _mongod_available(), reason="需要本機 mongod")
+
+
+def _trading_days(n):
+    days, d = [], dt.date(2023, 1, 2)
+    while len(days) < n:
+        if d.weekday() < 5:
+            days.append(d)
+        d += dt.timedelta(days=1)
+    return days
+
+
+@pytest.fixture(scope="module")
+def history(monkeypatch_module):
+    monkeypatch_module.setenv("MONGODB_DB", TEST_DB)
+    monkeypatch_module.setenv("TWSE_LAYOUT_T86", "rows")
+    import db
+    from synthetic import T86_FIELDS, t86_rows
+
+    client = MongoClient(get_mongo_uri())
+    client.drop_database(TEST_DB)
+    db.set_client(client)
+    db.ensure_t86_indexes("t86", "rows")
+    days = _trading_days(DAYS)
+    for d in days:
+        docs = [{**dict(zip(T86_FIELDS, r)), "date": d.isoformat(), "stock_code": r[0], "stock_name": r[1]}
+                for r in t86_rows(d, STOCKS)]
+        db.write_t86(docs, "t86", "rows")
+    yield days
+    client.drop_database(TEST_DB)
+    db.set_client(None)
+
+
+@pytest.fixture(scope="module")
+def monkeypatch_module():
+    mp = pytest.MonkeyPatch()
+    yield mp
+    mp.undo()
+
+
+def _stages(plan):
+    """Every stage name in an explain plan (classic and SBE formats)."""
+    if isinstance(plan, dict):
+        found = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            found.extend(_stages(value))
+        return found
+    if isinstance(plan, list):
+        return [s for item in plan for s in _stages(item)]
+    return []
+
+
+def _explain(code, start, end, fields):
+    import db
+    from query import history_query
+
+    return db.get_collection("t86").find(*history_query(code, start, end, fields)).sort("date", 1).explain()
+
+
+def test_covered_history(history):
+    import db
+
+    start, end = history[5].isoformat(), history[-5].isoformat()
+    plan = _explain("1101", start, end, db.HISTORY_FIELDS[:2])
+    stages = _stages(plan["queryPlanner"]["winningPlan"])
+    assert "COLLSCAN" not in stages
+    assert "SORT" not in stages
+    assert plan["executionStats"]["totalDocsExamined"] == 0
+    assert plan["executionStats"]["nReturned"] == len(history) - 9
+
+
+def test_full_rows_use_stock_index(history):
+    plan = _explain("1101", history[0].isoformat(), history[9].isoformat(), None)
+    stages = _stages(plan["queryPlanner"]["winningPlan"])
+    assert "COLLSCAN" not in stages
+    assert plan["executionStats"]["totalDocsExamined"] == 10
+
+
+def test_stock_history_results(history):
+    import db
+    from query import configure_query_cache, stock_history
+
+    configure_query_cache(refresh=0)
+    fields = list(db.HISTORY_FIELDS)
+    rows = stock_history("1102", history[0].isoformat(), history[2].isoformat(), fields)
+    assert [r["date"] for r in rows] == [d.isoformat() for d in history[:3]]
+    assert set(rows[0]) == {"date", "stock_code", *fields}
+    full = stock_history("1102", history[0].isoformat(), history[2].isoformat())
+    assert [{k: r[k] for k in ("date", "stock_code", *fields)} for r in full] == rows
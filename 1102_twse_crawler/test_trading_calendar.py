@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+trading_calendar.py 測試：假日清單載入、跳過週末、「查無資料」只記錄（台北時間）過去的日期、
+只有 TWSE 的「查無資料」stat 才記為假日，以及本機 JSON 檔與 MongoDB（mongomock）兩種儲存的讀寫。
+"""
+import datetime as dt
+import json
+import types
+
+import pytest
+
+import cache
+import twse_api
+from cache import TAIPEI, taipei_today
+from trading_calendar import FileCalendarStore, MongoCalendarStore, TradingCalendar, load_holidays, parse_day
+
+FRI, SAT, SUN, MON = (dt.date(2024, 1, 5) + dt.timedelta(days=i) for i in range(4))
+
+
+def test_parse_day_formats():
+    assert parse_day("2024-01-02") == parse_day(" 20240102\n") == dt.date(2024, 1, 2)
+    with pytest.raises(ValueError):
+        parse_day("2024/01/02")
+
+
+def test_load_holidays_text_and_json(tmp_path):
+    text = tmp_path / "holidays.txt"
+    text.write_text("# 2024 休市日\n2024-01-01\n\n20240208  # 農曆除夕前\n", encoding="utf-8")
+    assert load_holidays(str(text)) == [dt.date(2024, 1, 1), dt.date(2024, 2, 8)]
+    js = tmp_path / "holidays.json"
+    js.write_text(json.dumps(["2024-01-01", 20240208]), encoding="utf-8")
+    assert load_holidays(str(js)) == [dt.date(2024, 1, 1), dt.date(2024, 2, 8)]
+
+
+def test_weekends_and_holidays_are_skipped():
+    cal = TradingCalendar(holidays=[MON])
+    assert list(cal.trading_days(FRI, MON + dt.timedelta(days=1))) == [FRI, MON + dt.timedelta(days=1)]
+    assert list(TradingCalendar(skip_weekends=False).trading_days(FRI, MON)) == [FRI, SAT, SUN, MON]
+
+
+def test_no_data_is_per_dataset():
+    cal = TradingCalendar()
+    cal.mark_no_data(FRI, "bfi82u")
+    assert cal.is_trading_day(FRI, ["t86", "bfi82u"])   # T86 仍可能有資料
+    assert not cal.is_trading_day(FRI, ["bfi82u"])
+    cal.mark_no_data(FRI, "t86")
+    assert not cal.is_trading_day(FRI, ["t86", "bfi82u"])
+    assert cal.is_trading_day(FRI)   # 未指定報表時只看週末與假日
+
+
+def test_mark_no_data_ignores_today_and_future(tmp_path):
+    store = FileCalendarStore(str(tmp_path / "calendar.json"))
+    cal = TradingCalendar(store=store, skip_weekends=False)
+    today = taipei_today()
+    for day in (today, today + dt.timedelta(days=1)):
+        cal.mark_no_data(day, "t86")
+        assert cal.is_trading_day(day, ["t86"])
+    assert not (tmp_path / "calendar.json").exists()
+    cal.mark_no_data(today - dt.timedelta(days=1), "t86")
+    assert not cal.is_trading_day(today - dt.timedelta(days=1), ["t86"])
+
+
+def test_today_is_taken_in_taipei(monkeypatch):
+    # 台北週六 01:00 = UTC 週五 17:00：週五已經結束，週六還沒
+    at = dt.datetime.combine(SAT, dt.time(1), tzinfo=TAIPEI).timestamp()
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=lambda: at))
+    cal = TradingCalendar(skip_weekends=False)
+    cal.mark_no_data(FRI, "t86")
+    cal.mark_no_data(SAT, "t86")
+    assert not cal.is_trading_day(FRI, ["t86"])
+    assert cal.is_trading_day(SAT, ["t86"])
+
+
+class _Transport:
+    def __init__(self, *payloads):
+        self.payloads = list(payloads)
+
+    def get(self, url, params=None, **kwargs):
+        body = json.dumps(self.payloads.pop(0), ensure_ascii=False).encode("utf-8")
+        return types.SimpleNamespace(status_code=200, ok=True, content=body)
+
+
+def test_only_the_no_data_stat_marks_a_holiday(monkeypatch):
+    monkeypatch.setattr(twse_api, "_cache", None)
+    monkeypatch.setattr(twse_api, "_cache_loaded", True)
+    cal = TradingCalendar()
+    for fetch, name in ((twse_api.fetch_t86, "t86"), (twse_api.fetch_bfi82u, "bfi82u")):
+        transport = _Transport({"stat": "查詢日期小於93年2月11日，請重新查詢!"}, {"stat": twse_api.NO_DATA_STAT})
+        on_no_data = lambda day, name=name: cal.mark_no_data(day, name)
+        assert not fetch(FRI, transport=transport, on_no_data=on_no_data)
+        assert cal.is_trading_day(FRI, [name])          # 錯誤訊息不是假日
+        assert not fetch(FRI, transport=transport, on_no_data=on_no_data)
+        assert not cal.is_trading_day(FRI, [name])
+
+
+def test_file_store_round_trip(tmp_path):
+    path = str(tmp_path / "calendar.json")
+    cal = TradingCalendar(store=FileCalendarStore(path))
+    cal.mark_no_data(FRI, "t86")
+    cal.mark_no_data(FRI, "bfi82u")
+    cal.mark_no_data(MON, "t86")
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f) == {"2024-01-05": ["bfi82u", "t86"], "2024-01-08": ["t86"]}
+    assert FileCalendarStore(path).load() == {FRI: {"t86", "bfi82u"}, MON: {"t86"}}
+    again = TradingCalendar(store=FileCalendarStore(path))
+    assert list(again.trading_days(FRI, MON, ["t86"])) == []
+
+
+def test_mongo_store_round_trip(mongo):
+    cal = TradingCalendar(store=MongoCalendarStore())
+    cal.mark_no_data(FRI, "t86")
+    cal.mark_no_data(FRI, "t86")   # 重複回報不會重複寫入
+    cal.mark_no_data(MON, "bfi82u")
+    assert sorted(mongo["calendar"].find({}, {"_id": 0}), key=lambda d: d["date"]) == [
+        {"date": "2024-01-05", "no_data": ["t86"]}, {"date": "2024-01-08", "no_data": ["bfi82u"]}]
+    assert MongoCalendarStore().load() == {FRI: {"t86"}, MON: {"bfi82u"}}
+    again = TradingCalendar(store=MongoCalendarStore())
+    assert list(again.trading_days(FRI, MON, ["t86"])) == [MON]
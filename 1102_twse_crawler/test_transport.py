@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+transport.py 測試（對本機 fake_twse.py 的 HTTP / 自簽憑證 HTTPS 伺服器）：
+連線重複使用的計數、依主機記住 TLS 驗證模式並寫入 JSON 檔、
+TLS 1.2 重新連線時恢復 session，以及 fork 後子行程重建連線池。
+"""
+import json
+import multiprocessing
+import shutil
+import ssl
+import subprocess
+import threading
+
+import pytest
+
+from fake_twse import FakeTWSEServer, start_server
+from transport import TLS_INSECURE, TLS_VERIFIED, Transport, _load_tls_modes
+
+pytestmark = pytest.mark.filterwarnings("ignore::urllib3.exceptions.InsecureRequestWarning")
+
+T86_PATH = "/rwd/zh/fund/T86?date=20240105&selectType=ALLBUT0999&response=json"
+
+
+@pytest.fixture
+def http_server():
+    server = start_server(n_stocks=3)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def self_signed(tmp_path_factory):
+    if shutil.which("openssl") is None:
+        pytest.skip("需要 openssl 產生自簽憑證")
+    d = tmp_path_factory.mktemp("tls")
+    cert, key = d / "cert.pem", d / "key.pem"
+    subprocess.run(["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+                    "-nodes", "-keyout", str(key), "-out", str(cert), "-days", "1", "-subj", "/CN=127.0.0.1"],
+                   check=True, capture_output=True)
+    return str(cert), str(key)
+
+
+@pytest.fixture
+def https_server(self_signed):
+    """fake_twse over TLS 1.2 (so session resumption is decided during the handshake)."""
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.maximum_version = ssl.TLSVersion.TLSv1_2
+    ctx.load_cert_chain(*self_signed)
+    server = FakeTWSEServer(("127.0.0.1", 0), n_stocks=3)
+    server.socket = ctx.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield f"{host}:{port}", f"https://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_keep_alive_connection_is_reused(http_server):
+    t = Transport()
+    for _ in range(5):
+        assert t.get(http_server.base_url + T86_PATH, timeout=5).json()["stat"] == "OK"
+    snap = t.stats.snapshot()
+    assert (snap["requests"], snap["connections_opened"], snap["connections_reused"]) == (5, 1, 4)
+    t.close()
+
+
+def test_threads_share_one_pool(http_server):
+    t = Transport(pool_size=4)
+    barrier = threading.Barrier(4)
+
+    def work():
+        barrier.wait()
+        for _ in range(5):
+            t.get(http_server.base_url + T86_PATH, timeout=5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert t.stats.requests == 20
+    assert 1 <= t.stats.connections_opened <= 4
+    t.close()
+
+
+def test_unverifiable_host_falls_back_once_and_is_persisted(https_server, tmp_path):
+    host, base = https_server
+    path = str(tmp_path / "tls.json")
+    t = Transport(tls_cache_path=path)
+    assert t.tls_mode(host) is None
+    for _ in range(2):
+        assert t.get(base + T86_PATH, timeout=5).status_code == 200
+    assert t.tls_mode(host) == TLS_INSECURE
+    assert t.stats.requests == 3                 # 只有第一次先嘗試驗證
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {host: TLS_INSECURE}
+    t.close()
+
+    again = Transport(tls_cache_path=path)       # 下一次執行直接使用非驗證連線
+    assert again.get(base + T86_PATH, timeout=5).status_code == 200
+    assert again.stats.requests == 1
+    again.close()
+
+
+def test_tls_cache_file_ignores_unknown_modes(tmp_path):
+    path = tmp_path / "tls.json"
+    path.write_text(json.dumps({"a:443": TLS_VERIFIED, "b:443": TLS_INSECURE, "c:443": "maybe"}), encoding="utf-8")
+    assert _load_tls_modes(str(path)) == {"a:443": TLS_VERIFIED, "b:443": TLS_INSECURE}
+    path.write_text("{not json", encoding="utf-8")
+    assert _load_tls_modes(str(path)) == {}
+    assert _load_tls_modes(str(tmp_path / "missing.json")) == {}
+
+
+def test_reconnect_resumes_tls_session(https_server, tmp_path):
+    host, base = https_server
+    path = tmp_path / "tls.json"
+    path.write_text(json.dumps({host: TLS_INSECURE}), encoding="utf-8")
+    t = Transport(tls_cache_path=str(path))
+    for _ in range(3):
+        # Connection: close 讓每個請求都開新連線
+        assert t.get(base + T86_PATH, headers={"Connection": "close"}, timeout=5).status_code == 200
+    assert t.stats.connections_opened == 3
+    assert t.stats.tls_sessions_resumed == 2
+    t.close()
+
+
+def _child_request(t, url, queue):
+    t.get(url, timeout=5)
+    queue.put(t.stats.connections_opened)
+
+
+def test_pool_is_rebuilt_after_fork(http_server):
+    url = http_server.base_url + T86_PATH
+    t = Transport()
+    t.get(url, timeout=5)
+    assert t.stats.connections_opened == 1
+
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    p = ctx.Process(target=_child_request, args=(t, url, queue))
+    p.start()
+    opened_in_child = queue.get(timeout=10)
+    p.join(10)
+    assert p.exitcode == 0
+    assert opened_in_child == 2                  # 子行程開了自己的連線，沒有沿用父行程的 socket
+
+    t.get(url, timeout=5)                        # 父行程的連線池不受影響
+    assert t.stats.connections_opened == 1
+    t.close()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+--workers 多行程回補測試：shard_jobs 完整且不重疊地分配工作（同一日期在同一個行程）、
+merge_write_stats 合併各行程的寫入統計、SharedRateLimiter 在行程之間共用同一個
+每秒上限，以及 run_workers 把各行程的 HTTP / metrics / 查無資料合併回父行程。
+"""
+import argparse
+import collections
+import datetime as dt
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import cli
+from backfill import SharedRateLimiter, plan_jobs, shard_jobs
+from metrics import METRICS, Registry
+from trading_calendar import TradingCalendar
+from transport import Transport
+
+DAYS = [dt.date(2024, 1, 1) + dt.timedelta(days=i) for i in range(23)]
+
+pytestmark = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="需要 fork")
+
+
+@pytest.mark.parametrize("shards", [1, 2, 3, 8, 40])
+def test_shard_jobs_is_a_partition_by_date(shards):
+    jobs = plan_jobs(DAYS, ["t86", "bfi82u"]) + plan_jobs(DAYS[:5], ["t86"])   # 重複的工作也要保留
+    out = shard_jobs(jobs, shards)
+    assert len(out) == min(shards, len(DAYS))
+    assert collections.Counter(j for shard in out for j in shard) == collections.Counter(jobs)
+    owners = {}
+    for i, shard in enumerate(out):
+        assert shard == [j for j in jobs if j in set(shard)]   # 保留原本的順序
+        for d, _ in shard:
+            assert owners.setdefault(d, i) == i                # 同一日期只在一個行程
+    per_shard = collections.Counter(owners.values())
+    assert max(per_shard.values()) - min(per_shard.values()) <= 1
+    assert shard_jobs([], shards) == []
+
+
+def test_merge_write_stats():
+    a = {"jobs": 2, "batches": 1, "ops": 10, "blocked_s": 0.5, "errors": 0,
+         "t86": {"inserted": 8, "changed": 0, "skipped": 0}, "bfi82u": {"inserted": 2, "changed": 0, "skipped": 0}}
+    b = {"jobs": 1, "batches": 1, "ops": 3, "blocked_s": 0.25, "errors": 1,
+         "t86": {"inserted": 0, "changed": 1, "skipped": 2}}
+    assert cli.merge_write_stats(cli.merge_write_stats(None, a), b) == {
+        "jobs": 3, "batches": 2, "ops": 13, "blocked_s": 0.75, "errors": 1,
+        "t86": {"inserted": 8, "changed": 1, "skipped": 2}, "bfi82u": {"inserted": 2, "changed": 0, "skipped": 0}}
+    assert cli.merge_write_stats(a, None) is a
+
+
+def _acquire_many(limiter, n, queue):
+    stamps = []
+    for _ in range(n):
+        limiter.acquire()
+        stamps.append(time.monotonic())
+    queue.put(stamps)
+
+
+def test_shared_rate_limiter_spans_processes():
+    rps, procs, n = 40, 3, 4
+    ctx = multiprocessing.get_context("fork")
+    limiter = SharedRateLimiter(rps, ctx)
+    queue = ctx.Queue()
+    workers = [ctx.Process(target=_acquire_many, args=(limiter, n, queue)) for _ in range(procs)]
+    for p in workers:
+        p.start()
+    stamps = sorted(t for _ in workers for t in queue.get(timeout=10))
+    for p in workers:
+        p.join(10)
+    # 三個行程合計仍是每 1/rps 秒一個請求，而不是每個行程各自 rps
+    assert len(stamps) == procs * n
+    assert all(t - stamps[0] >= k / rps - 0.005 for k, t in enumerate(stamps))
+
+
+def _fake_shard(args, jobs):
+    """Stands in for run_shard in the worker: takes budget slots and reports counters."""
+    for _ in jobs:
+        cli._worker_limiter.acquire()
+    reg = Registry()
+    for d, name in jobs:
+        reg.observe("twse_rows", name, d.day)
+    t86 = sum(1 for _, name in jobs if name == "t86")
+    return {
+        "pid": os.getpid(),
+        "jobs": len(jobs),
+        "http": {"requests": len(jobs), "connections_opened": 1},
+        "cache": None,
+        "write": {"jobs": len(jobs), "batches": 1, "ops": len(jobs), "blocked_s": 0.0, "errors": 0,
+                  "t86": {"inserted": t86, "changed": 0, "skipped": 0}},
+        "metrics": reg.state(),
+        "no_data": [(d, name) for d, name in jobs if d.weekday() == 0],
+    }
+
+
+def test_run_workers_merges_every_shard(monkeypatch, capsys):
+    monkeypatch.setattr(cli, "run_shard", _fake_shard)
+    METRICS.reset()
+    jobs = plan_jobs(DAYS[:6], ["t86", "bfi82u"])
+    args = argparse.Namespace(workers=3, rps=None, offline=False, sleep=0.0)
+    transport, calendar = Transport(), TradingCalendar(skip_weekends=False)
+    try:
+        stats = cli.run_workers(args, jobs, calendar, transport, None)
+        summary = METRICS.summary()
+    finally:
+        METRICS.reset()
+
+    assert stats["jobs"] == len(jobs) and stats["t86"]["inserted"] == 6 and stats["errors"] == 0
+    assert transport.stats.requests == len(jobs) and transport.stats.connections_opened == 3
+    assert summary["t86"]["twse_rows"]["count"] == 6 and summary["bfi82u"]["twse_rows"]["count"] == 6
+    assert not calendar.is_trading_day(dt.date(2024, 1, 1), ["t86", "bfi82u"])   # 子行程學到的假日
+    pids = {line.split()[2] for line in capsys.readouterr().out.splitlines() if " pid " in line}
+    assert len(pids) == 3 and str(os.getpid()) not in pids
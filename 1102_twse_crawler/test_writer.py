@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+writer.py 測試（mongomock）：佇列滿時 submit 阻塞（backpressure）、close() 等所有
+批次寫完、失敗的批次計入 errors 且不寫入 ingest ledger、各報表分開統計，以及
+wide 格式也使用指定的 write concern。
+"""
+import threading
+import time
+from functools import partial
+
+from pymongo.write_concern import WriteConcern
+
+import writer
+from db import content_hash, record_ingest
+from writer import BulkWriter
+
+
+def _t86(date, n=3):
+    return [{"證券代號": f"{1100 + i}", "證券名稱": f"股{i}", "三大法人買賣超股數": str(i),
+             "date": date, "stock_code": f"{1100 + i}", "stock_name": f"股{i}"} for i in range(n)]
+
+
+def _bfi82u(date):
+    return {"date": date, "fields": ["單位名稱", "買賣差額"], "rows": [{"單位名稱": "投信", "買賣差額": "1"}]}
+
+
+def _ledger(mongo):
+    return sorted((d["dataset"], d["date"]) for d in mongo["ingest_ledger"].find())
+
+
+def test_full_queue_blocks_submit(monkeypatch):
+    release = threading.Event()
+    written = []
+
+    def slow_write(self, batch):
+        release.wait(5)
+        written.extend(batch)
+
+    monkeypatch.setattr(BulkWriter, "_write", slow_write)
+    w = BulkWriter(max_pending=1, linger=0)
+    submitted = []
+
+    def produce():
+        for i in range(4):
+            w.submit_bfi82u(_bfi82u(f"2024-01-0{i + 2}"))
+            submitted.append(i)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    time.sleep(0.3)
+    # writer 正在寫第 1 個、佇列中 1 個，第 3 個 submit 阻塞
+    assert len(submitted) == 2 and producer.is_alive()
+    release.set()
+    producer.join(5)
+    stats = w.close()
+    assert len(submitted) == 4 and len(written) == 4
+    assert stats["jobs"] == 4 and stats["blocked_s"] > 0.1
+
+
+def test_close_flushes_everything(mongo):
+    w = BulkWriter(batch_size=100, linger=0.05)
+    for date in ("2024-01-02", "2024-01-03"):
+        docs = _t86(date)
+        w.submit_t86(docs, on_done=partial(record_ingest, "t86", date, len(docs), content_hash(docs)))
+        doc = _bfi82u(date)
+        w.submit_bfi82u(doc, on_done=partial(record_ingest, "bfi82u", date, 1, content_hash(doc)))
+    stats = w.close()
+    assert mongo["t86"].count_documents({}) == 6
+    assert mongo["bfi82u"].count_documents({}) == 2
+    assert _ledger(mongo) == [("bfi82u", "2024-01-02"), ("bfi82u", "2024-01-03"),
+                              ("t86", "2024-01-02"), ("t86", "2024-01-03")]
+    assert stats["t86"] == {"inserted": 6, "changed": 0, "skipped": 0}
+    assert stats["bfi82u"] == {"inserted": 2, "changed": 0, "skipped": 0}
+    assert stats["errors"] == 0
+
+
+def test_rerun_counts_skipped_per_dataset(mongo):
+    for _ in range(2):
+        w = BulkWriter(linger=0)
+        w.submit_t86(_t86("2024-01-02"))
+        w.submit_bfi82u(_bfi82u("2024-01-02"))
+        stats = w.close()
+    assert stats["t86"] == {"inserted": 0, "changed": 0, "skipped": 3}
+    assert stats["bfi82u"] == {"inserted": 0, "changed": 0, "skipped": 1}
+    assert stats["ops"] == 1   # 只有 BFI82U 的 upsert，T86 未變更的列不送出
+
+
+def test_failed_batch_counts_error_and_skips_ledger(mongo, monkeypatch):
+    real = BulkWriter._collection
+
+    def failing(self, name):
+        if name == "t86":
+            raise RuntimeError("not primary")
+        return real(self, name)
+
+    monkeypatch.setattr(BulkWriter, "_collection", failing)
+    w = BulkWriter(linger=0)
+    docs = _t86("2024-01-02")
+    w.submit_t86(docs, on_done=partial(record_ingest, "t86", "2024-01-02", 3, content_hash(docs)))
+    doc = _bfi82u("2024-01-02")
+    w.submit_bfi82u(doc, on_done=partial(record_ingest, "bfi82u", "2024-01-02", 1, content_hash(doc)))
+    stats = w.close()
+    assert stats["errors"] == 1
+    assert mongo["t86"].count_documents({}) == 0
+    assert _ledger(mongo) == [("bfi82u", "2024-01-02")]   # 失敗的 T86 不記入 ledger，--resume 會重抓
+
+
+def test_wide_layout_uses_write_concern(mongo, monkeypatch):
+    monkeypatch.setenv("TWSE_LAYOUT_T86", "wide")
+    seen = []
+    real = writer.write_t86
+
+    def spy(docs, name, layout, write_concern=None):
+        seen.append((layout, write_concern))
+        return real(docs, name, layout, write_concern)
+
+    monkeypatch.setattr(writer, "write_t86", spy)
+    concern = WriteConcern(w=1, j=True)
+    w = BulkWriter(write_concern=concern, linger=0)
+    w.submit_t86(_t86("2024-01-02"))
+    stats = w.close()
+    assert seen == [("wide", concern)]
+    assert stats["t86"]["inserted"] == 3
+    assert mongo["t86"].find_one({}, {"_id": 0, "stock_codes": 1})["stock_codes"] == ["1100", "1101", "1102"]
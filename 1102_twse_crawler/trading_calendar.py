@@ -0,0 +1,135 @@
+"""
+Trading calendar: 跳過非交易日，避免對週末與假日發出注定「查無資料」的請求。
+
+- 週末預設跳過
+- 可匯入假日清單（文字檔每行一個日期，或 JSON 陣列；YYYY-MM-DD 或 YYYYMMDD）
+- 從 TWSE「查無資料」回應學習：記錄 (日期, 報表)，存到 MongoDB 或本機 JSON 檔，
+  之後的執行不再請求這些日期
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import datetime as dt
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set
+
+try:
+    from .cache import taipei_today
+except ImportError:
+    from cache import taipei_today
+
+
+def parse_day(s: str) -> dt.date:
+    s = s.strip()
+    fmt = "%Y%m%d" if len(s) == 8 and s.isdigit() else "%Y-%m-%d"
+    return dt.datetime.strptime(s, fmt).date()
+
+
+def load_holidays(path: str) -> List[dt.date]:
+    """Read a holiday list from a JSON array or a one-date-per-line text file."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if text.lstrip().startswith("["):
+        items = json.loads(text)
+    else:
+        items = [line.split("#", 1)[0] for line in text.splitlines()]
+    return [parse_day(str(x)) for x in items if str(x).strip()]
+
+
+class FileCalendarStore:
+    """Learned no-data days in a local JSON file: {"YYYY-MM-DD": ["t86", ...]}."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[dt.date, Set[str]]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return {parse_day(k): set(v) for k, v in data.items()}
+
+    def save(self, no_data: Dict[dt.date, Set[str]]) -> None:
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({d.isoformat(): sorted(v) for d, v in sorted(no_data.items())},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def mark(self, day: dt.date, dataset: str, no_data: Dict[dt.date, Set[str]]) -> None:
+        self.save(no_data)
+
+
+class MongoCalendarStore:
+    """Learned no-data days in the `calendar` collection (see db.py)."""
+
+    def load(self) -> Dict[dt.date, Set[str]]:
+        try:
+            from .db import load_no_data_days
+        except ImportError:
+            from db import load_no_data_days
+        return {parse_day(k): set(v) for k, v in load_no_data_days().items()}
+
+    def mark(self, day: dt.date, dataset: str, no_data: Dict[dt.date, Set[str]]) -> None:
+        try:
+            from .db import mark_no_data_day
+        except ImportError:
+            from db import mark_no_data_day
+        mark_no_data_day(day.isoformat(), dataset)
+
+
+class TradingCalendar:
+    """
+    Decide which dates are worth requesting.
+
+    A date is skipped when it is a weekend (unless `skip_weekends=False`),
+    an imported holiday, or every requested dataset has already answered
+    "no data" for it. No-data answers are tracked per dataset because T86 and
+    BFI82U do not start on the same historical date.
+    """
+
+    def __init__(
+        self,
+        holidays: Iterable[dt.date] = (),
+        store: Optional[FileCalendarStore | MongoCalendarStore] = None,
+        skip_weekends: bool = True,
+    ):
+        self.holidays: Set[dt.date] = set(holidays)
+        self.store = store
+        self.skip_weekends = skip_weekends
+        self._lock = threading.Lock()
+        self._no_data: Dict[dt.date, Set[str]] = store.load() if store else {}
+
+    def is_trading_day(self, day: dt.date, datasets: Sequence[str] = ()) -> bool:
+        if self.skip_weekends and day.weekday() >= 5:
+            return False
+        if day in self.holidays:
+            return False
+        known = self._no_data.get(day)
+        if known and datasets and all(name in known for name in datasets):
+            return False
+        return True
+
+    def trading_days(self, start: dt.date, end: dt.date, datasets: Sequence[str] = ()) -> Iterator[dt.date]:
+        d = start
+        delta = dt.timedelta(days=1)
+        while d <= end:
+            if self.is_trading_day(d, datasets):
+                yield d
+            d += delta
+
+    def mark_no_data(self, day: dt.date, dataset: str) -> None:
+        """
+        Record a "no data" answer. Today and future dates (in Taipei) are
+        ignored, since TWSE publishes the current day's report only after the close.
+        """
+        if day >= taipei_today():
+            return
+        with self._lock:
+            known = self._no_data.setdefault(day, set())
+            if dataset in known:
+                return
+            known.add(dataset)
+            if self.store:
+                self.store.mark(day, dataset, self._no_data)
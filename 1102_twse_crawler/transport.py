@@ -0,0 +1,252 @@
+"""
+Long-lived pooled HTTP transport for the TWSE API.
+
+一個 Transport 持有一組 urllib3 連線池（HTTPAdapter），跨日期、跨報表重複使用
+keep-alive 連線；每個 thread 有自己的 requests.Session（header / cookie），
+但共用同一個連線池。fork 之後子行程會自動重建連線池，不會沿用父行程的 socket。
+
+TLS 驗證模式依主機只決定一次：第一次以 certifi 驗證失敗時改用 verify=False，
+之後同一主機直接使用非驗證連線（可寫入檔案，跨執行保留）。
+"""
+from __future__ import annotations
+
+import json
+import os
+import ssl
+import threading
+import time
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import certifi
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+TLS_VERIFIED = "verified"
+TLS_INSECURE = "insecure"
+
+
+class TransportStats:
+    """Thread-safe counters for requests, pooled connections and timings."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.tls_sessions_resumed = 0
+        self.handshake_seconds = 0.0
+        self.request_seconds = 0.0
+
+    def incr(self, name: str, n: float = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    COUNTERS = ("requests", "connections_opened", "tls_sessions_resumed", "handshake_seconds", "request_seconds")
+
+    def counters(self) -> Dict[str, float]:
+        """Raw counter values, e.g. to hand a worker process's totals to the parent."""
+        with self._lock:
+            return {name: getattr(self, name) for name in self.COUNTERS}
+
+    def merge(self, counters: Mapping[str, float]) -> None:
+        for name, n in counters.items():
+            self.incr(name, n)
+
+    @property
+    def connections_reused(self) -> int:
+        return max(0, self.requests - self.connections_opened)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": max(0, self.requests - self.connections_opened),
+                "tls_sessions_resumed": self.tls_sessions_resumed,
+                "handshake_s": round(self.handshake_seconds, 4),
+                "response_s": round(max(0.0, self.request_seconds - self.handshake_seconds), 4),
+            }
+
+
+class _ResumingSSLContext(ssl.SSLContext):
+    """
+    SSLContext that offers the last TLS session of a host when a new pooled
+    connection to that host is opened, so reconnects can skip the full
+    handshake. (With TLS 1.3 the ticket may arrive after the handshake; the
+    server then simply falls back to a full handshake.)
+    """
+
+    def wrap_socket(self, sock, *args: Any, server_hostname: Optional[str] = None,
+                    session: Optional[ssl.SSLSession] = None, **kwargs: Any):
+        with self._sessions_lock:
+            session = session or self._sessions.get(server_hostname)
+        ssock = super().wrap_socket(sock, *args, server_hostname=server_hostname,
+                                    session=session, **kwargs)
+        if ssock.session_reused:
+            self._stats.incr("tls_sessions_resumed")
+        with self._sessions_lock:
+            self._sessions[server_hostname] = ssock.session
+        return ssock
+
+
+def _tls_context(verify: bool, stats: TransportStats) -> ssl.SSLContext:
+    ctx = _ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    ctx._sessions = {}
+    ctx._sessions_lock = threading.Lock()
+    ctx._stats = stats
+    if verify:
+        ctx.load_verify_locations(certifi.where())
+    else:
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    return ctx
+
+
+def _counting_pool(base: type, stats: TransportStats) -> type:
+    class TimedConnection(base.ConnectionCls):  # type: ignore[misc, name-defined]
+        def connect(self) -> None:
+            # 在 connect() 計數：伺服器關閉 keep-alive 後，urllib3 會以同一個連線物件重新連線
+            stats.incr("connections_opened")
+            t0 = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                stats.incr("handshake_seconds", time.perf_counter() - t0)
+
+    class CountingPool(base):  # type: ignore[misc, valid-type]
+        ConnectionCls = TimedConnection
+
+    return CountingPool
+
+
+class _CountingAdapter(HTTPAdapter):
+    def __init__(self, stats: TransportStats, **kwargs: Any):
+        self._stats = stats
+        self._contexts = {True: _tls_context(True, stats), False: _tls_context(False, stats)}
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _counting_pool(HTTPConnectionPool, self._stats),
+            "https": _counting_pool(HTTPSConnectionPool, self._stats),
+        }
+
+    def build_connection_pool_key_attributes(self, request, verify, cert=None):
+        host_params, pool_kwargs = super().build_connection_pool_key_attributes(request, verify, cert)
+        if host_params.get("scheme") == "https" and cert is None:
+            # CA 已載入共用的 context，避免每條新連線重新讀取 certifi
+            pool_kwargs.pop("ca_certs", None)
+            pool_kwargs.pop("ca_cert_dir", None)
+            pool_kwargs["ssl_context"] = self._contexts[verify is not False]
+        return host_params, pool_kwargs
+
+
+def _load_tls_modes(path: Optional[str]) -> Dict[str, str]:
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {h: m for h, m in data.items() if m in (TLS_VERIFIED, TLS_INSECURE)}
+
+
+class Transport:
+    """
+    Shared HTTP transport with a bounded keep-alive connection pool.
+
+    Safe to call from many threads; after `fork()` the child transparently
+    builds its own pool on first use. `tls_cache_path` persists the TLS
+    mode chosen for each host across runs.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 10,
+        headers: Optional[Mapping[str, str]] = None,
+        tls_cache_path: Optional[str] = None,
+    ):
+        self.pool_size = pool_size
+        self.headers = dict(headers or {})
+        self.tls_cache_path = tls_cache_path
+        self.stats = TransportStats()
+        self._lock = threading.Lock()
+        self._tls_modes = _load_tls_modes(tls_cache_path)
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pid = os.getpid()
+        self._adapter = _CountingAdapter(
+            self.stats,
+            pool_connections=4,
+            pool_maxsize=self.pool_size,
+        )
+        self._local = threading.local()
+
+    def session(self) -> requests.Session:
+        """Return this thread's Session, mounted on the shared pool."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+        s = getattr(self._local, "session", None)
+        if s is None:
+            s = requests.Session()
+            s.headers.update(self.headers)
+            s.mount("http://", self._adapter)
+            s.mount("https://", self._adapter)
+            self._local.session = s
+        return s
+
+    def tls_mode(self, host: str) -> Optional[str]:
+        return self._tls_modes.get(host)
+
+    def _remember_tls_mode(self, host: str, mode: str) -> None:
+        with self._lock:
+            if self._tls_modes.get(host) == mode:
+                return
+            self._tls_modes[host] = mode
+            modes = dict(self._tls_modes)
+        if self.tls_cache_path:
+            tmp = f"{self.tls_cache_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(modes, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.tls_cache_path)
+
+    def _send(self, url: str, params: Optional[Dict[str, Any]], verify: bool,
+              **kwargs: Any) -> requests.Response:
+        self.stats.incr("requests")
+        t0 = time.perf_counter()
+        try:
+            return self.session().get(url, params=params, verify=verify, **kwargs)
+        finally:
+            self.stats.incr("request_seconds", time.perf_counter() - t0)
+
+    def get(self, url: str, params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> requests.Response:
+        """
+        GET `url` with the TLS mode remembered for its host.
+
+        Unknown hosts are tried with certifi verification first; on
+        `SSLError` the host is switched to `verify=False` once and for all.
+        """
+        parts = urlsplit(url)
+        if parts.scheme != "https":
+            return self._send(url, params, True, **kwargs)
+
+        host = parts.netloc
+        if self.tls_mode(host) == TLS_INSECURE:
+            return self._send(url, params, False, **kwargs)
+        try:
+            r = self._send(url, params, True, **kwargs)
+        except requests.exceptions.SSLError:
+            print(f"⚠️ {host} SSL 憑證驗證失敗，之後改用非驗證連線（verify=False）")
+            self._remember_tls_mode(host, TLS_INSECURE)
+            return self._send(url, params, False, **kwargs)
+        self._remember_tls_mode(host, TLS_VERIFIED)
+        return r
+
+    def close(self) -> None:
+        self._adapter.close()
@@ -2,16 +2,46 @@ from __future__ import annotations
 
 import time
 import datetime as dt
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 import requests
 import urllib3
-import certifi
 
-# 關閉 SSL 警告（避免噪音，但仍會使用 certifi 驗證）
+try:
+    from .config import get_base_url, get_http_pool_size, get_tls_cache_path, get_cache_dir, get_cache_ttl, get_schema
+    from .transport import Transport
+    from .cache import ResponseCache, published
+    from .schema import SCHEMA_TYPED, type_rows
+    from .decode import loads, row_records, t86_records
+    from .frame import T86DayFrame
+    from .metrics import METRICS
+except ImportError:
+    from config import get_base_url, get_http_pool_size, get_tls_cache_path, get_cache_dir, get_cache_ttl, get_schema
+    from transport import Transport
+    from cache import ResponseCache, published
+    from schema import SCHEMA_TYPED, type_rows
+    from decode import loads, row_records, t86_records
+    from frame import T86DayFrame
+    from metrics import METRICS
+
+# 關閉 SSL 警告（避免噪音；驗證模式由 Transport 依主機決定）
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-T86_URL = "https://www.twse.com.tw/rwd/zh/fund/T86"
-BFI82U_URL = "https://www.twse.com.tw/rwd/zh/fund/BFI82U"
+T86_PATH = "/rwd/zh/fund/T86"
+BFI82U_PATH = "/rwd/zh/fund/BFI82U"
+
+# TWSE 對假日 / 週末的回應；其他非 OK 的 stat（例如查詢錯誤）不代表當天沒有資料
+NO_DATA_STAT = "很抱歉，沒有符合條件的資料!"
+
+T86_URL = get_base_url() + T86_PATH
+BFI82U_URL = get_base_url() + BFI82U_PATH
+
+
+def configure_base_url(base_url: str) -> None:
+    """Point both endpoints at another origin (e.g. http://127.0.0.1:8765 for fake_twse.py)."""
+    global T86_URL, BFI82U_URL
+    base_url = base_url.rstrip("/")
+    T86_URL = base_url + T86_PATH
+    BFI82U_URL = base_url + BFI82U_PATH
 
 _UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -19,16 +49,54 @@ _UA = (
     "Chrome/127.0.0.0 Safari/537.36"
 )
 
-def _session() -> requests.Session:
-    s = requests.Session()
-    s.headers.update({
-        "User-Agent": _UA,
-        "Accept": "application/json, text/plain, */*",
-        "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
-        "Connection": "keep-alive",
-        "Referer": "https://www.twse.com.tw/",
-    })
-    return s
+_HEADERS = {
+    "User-Agent": _UA,
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "zh-TW,zh;q=0.9,en;q=0.8",
+    "Connection": "keep-alive",
+    "Referer": "https://www.twse.com.tw/",
+}
+
+_transport: Transport | None = None
+
+
+def get_transport() -> Transport:
+    global _transport
+    if _transport is None:
+        _transport = Transport(pool_size=get_http_pool_size(), headers=_HEADERS,
+                               tls_cache_path=get_tls_cache_path())
+    return _transport
+
+
+def configure_transport(pool_size: int) -> Transport:
+    """Replace the shared transport, e.g. to size the pool for a concurrent run."""
+    global _transport
+    if _transport is not None:
+        _transport.close()
+    _transport = Transport(pool_size=pool_size, headers=_HEADERS, tls_cache_path=get_tls_cache_path())
+    return _transport
+
+_cache: ResponseCache | None = None
+_cache_loaded = False
+
+
+def get_cache() -> ResponseCache | None:
+    global _cache, _cache_loaded
+    if not _cache_loaded:
+        root = get_cache_dir()
+        _cache = ResponseCache(root, today_ttl=get_cache_ttl()) if root else None
+        _cache_loaded = True
+    return _cache
+
+
+def configure_cache(root: Optional[str], today_ttl: Optional[float] = None,
+                    offline: bool = False) -> ResponseCache | None:
+    """Set (or, with root=None, disable) the raw response cache."""
+    global _cache, _cache_loaded
+    ttl = today_ttl if today_ttl is not None else get_cache_ttl()
+    _cache = ResponseCache(root, today_ttl=ttl, offline=offline) if root else None
+    _cache_loaded = True
+    return _cache
 
 def _yyyymmdd(d: dt.date) -> str:
     return d.strftime("%Y%m%d")
@@ -36,80 +104,167 @@ def _yyyymmdd(d: dt.date) -> str:
 def _iso_date(d: dt.date) -> str:
     return d.strftime("%Y-%m-%d")
 
-def _safe_get(session: requests.Session, url: str, params: Dict[str, Any]) -> Optional[requests.Response]:
+def t86_params(d: dt.date) -> Dict[str, Any]:
+    return {"response": "json", "date": _yyyymmdd(d), "selectType": "ALL"}
+
+def bfi82u_params(d: dt.date) -> Dict[str, Any]:
+    return {"response": "json", "dayDate": _yyyymmdd(d), "type": "day"}
+
+def _retry_after(r: requests.Response, default: float, cap: float = 30.0) -> float:
+    """Seconds to wait after a 429, from the Retry-After header when it is a number."""
+    try:
+        return min(float(r.headers.get("Retry-After", default)), cap)
+    except ValueError:
+        return default
+
+def _safe_get(transport: Transport, url: str, params: Dict[str, Any]) -> Optional[requests.Response]:
     """
-    嘗試以 certifi 驗證憑證；若驗證失敗，改用 verify=False。
+    以主機記住的 TLS 模式送出請求：第一次以 certifi 驗證，
+    驗證失敗才改用 verify=False，之後同一主機不再重試驗證（見 transport.py）。
     """
-    try:
-        return session.get(url, params=params, timeout=20, verify=certifi.where())
-    except requests.exceptions.SSLError:
-        print("⚠️ SSL 憑證驗證失敗，改用非驗證連線（verify=False）")
-        return session.get(url, params=params, timeout=20, verify=False)
+    return transport.get(url, params=params, timeout=20)
 
-def fetch_t86(date: dt.date, retry: int = 3, sleep_s: float = 0.6) -> List[Dict[str, Any]]:
+def _fetch_json(
+    url: str,
+    params: Dict[str, Any],
+    date: dt.date,
+    retry: int,
+    sleep_s: float,
+    transport: Optional[Transport],
+    dataset: str,
+) -> Optional[Dict[str, Any]]:
     """
-    Fetch T86 (三大法人買賣超日報表) for the given date.
+    Return the decoded JSON payload for (url, params), served from the raw
+    response cache when possible. None means the request failed (or, in
+    offline mode, the response is not cached). Request, size and decode
+    metrics are recorded under `dataset`.
     """
-    params = {
-        "response": "json",
-        "date": _yyyymmdd(date),
-        "selectType": "ALL",
-    }
-    s = _session()
-    for _ in range(retry):
-        r = _safe_get(s, T86_URL, params)
+    cache = get_cache()
+    if cache:
+        body = cache.get(url, params, date)
+        if body is not None:
+            return _decode(body, dataset)
+        if cache.offline:
+            return None
+    t = transport or get_transport()
+    for attempt in range(retry):
+        if attempt:
+            METRICS.inc("twse_retries_total", dataset)
+        t0 = time.perf_counter()
+        r = _safe_get(t, url, params)
+        METRICS.observe("twse_fetch_seconds", dataset, time.perf_counter() - t0)
+        if r is not None and r.status_code == 429:
+            time.sleep(_retry_after(r, sleep_s))
+            continue
         if not r:
             continue
         if r.ok:
-            js = r.json()
-            if js.get("stat") == "OK" and js.get("data"):
-                fields: List[str] = js.get("fields", [])
-                rows: List[List[Any]] = js.get("data", [])
-                docs: List[Dict[str, Any]] = []
-                for row in rows:
-                    m = {fields[idx]: row[idx] for idx in range(min(len(fields), len(row)))}
-                    stock_code = m.get("證券代號") or m.get("股票代號")
-                    stock_name = m.get("證券名稱") or m.get("股票名稱")
-                    m_out: Dict[str, Any] = {
-                        **m,
-                        "date": _iso_date(date),
-                        "stock_code": stock_code,
-                        "stock_name": stock_name,
-                    }
-                    docs.append(m_out)
-                return docs
-            return []
+            js = _decode(r.content, dataset)
+            # 公佈前的「查無資料」不寫入快取，避免之後被當成假日的回應重播
+            if cache and (js.get("stat") == "OK" or published(date)):
+                cache.put(url, params, r.content)
+            return js
         time.sleep(sleep_s)
+    METRICS.inc("twse_fetch_failures_total", dataset)
+    return None
+
+def _decode(body: bytes, dataset: str) -> Any:
+    METRICS.observe("twse_response_bytes", dataset, len(body))
+    t0 = time.perf_counter()
+    js = loads(body)
+    METRICS.observe("twse_decode_seconds", dataset, time.perf_counter() - t0)
+    return js
+
+def fetch_t86(
+    date: dt.date,
+    retry: int = 3,
+    sleep_s: float = 0.6,
+    transport: Optional[Transport] = None,
+    on_no_data: Optional[Callable[[dt.date], None]] = None,
+    schema: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Fetch T86 (三大法人買賣超日報表) for the given date.
+
+    `on_no_data(date)` is called when TWSE answers with `NO_DATA_STAT` for
+    the date (holiday / weekend), as opposed to a failed request or another
+    error stat. With
+    `schema="typed"` (default: TWSE_SCHEMA) numeric columns are int64.
+    """
+    js = _fetch_json(T86_URL, t86_params(date), date, retry, sleep_s, transport, "t86")
+    if js is None:
+        return []
+    if js.get("stat") == "OK" and js.get("data"):
+        t0 = time.perf_counter()
+        fields: List[str] = js.get("fields", [])
+        rows: List[List[Any]] = js.get("data", [])
+        if (schema or get_schema()) == SCHEMA_TYPED:
+            rows = type_rows(fields, rows)
+        docs = t86_records(fields, rows, _iso_date(date))
+        METRICS.observe("twse_parse_seconds", "t86", time.perf_counter() - t0)
+        METRICS.observe("twse_rows", "t86", len(docs))
+        return docs
+    if on_no_data and js.get("stat") == NO_DATA_STAT:
+        on_no_data(date)
     return []
 
-def fetch_bfi82u(date: dt.date, retry: int = 3, sleep_s: float = 0.6) -> Optional[Dict[str, Any]]:
+def fetch_t86_frame(
+    date: dt.date,
+    retry: int = 3,
+    sleep_s: float = 0.6,
+    transport: Optional[Transport] = None,
+    on_no_data: Optional[Callable[[dt.date], None]] = None,
+) -> Optional[T86DayFrame]:
+    """
+    Fetch T86 as a columnar `T86DayFrame` instead of a list of dicts.
+
+    Numeric columns are always int64; `frame.to_records()` gives the same
+    documents as `fetch_t86(date, schema="typed")`. Returns None when the
+    request failed or TWSE has no data for the date.
+    """
+    js = _fetch_json(T86_URL, t86_params(date), date, retry, sleep_s, transport, "t86")
+    if js is None:
+        return None
+    if js.get("stat") == "OK" and js.get("data"):
+        t0 = time.perf_counter()
+        frame = T86DayFrame.from_payload(js.get("fields", []), js.get("data", []), _iso_date(date))
+        METRICS.observe("twse_parse_seconds", "t86", time.perf_counter() - t0)
+        METRICS.observe("twse_rows", "t86", len(frame))
+        return frame
+    if on_no_data and js.get("stat") == NO_DATA_STAT:
+        on_no_data(date)
+    return None
+
+def fetch_bfi82u(
+    date: dt.date,
+    retry: int = 3,
+    sleep_s: float = 0.6,
+    transport: Optional[Transport] = None,
+    on_no_data: Optional[Callable[[dt.date], None]] = None,
+    schema: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
     """
     Fetch BFI82U (三大法人買賣金額統計表) for the given date.
+
+    `on_no_data` and `schema` have the same meaning as in `fetch_t86`.
     """
-    params = {
-        "response": "json",
-        "dayDate": _yyyymmdd(date),
-        "type": "day",
-    }
-    s = _session()
-    for _ in range(retry):
-        r = _safe_get(s, BFI82U_URL, params)
-        if not r:
-            continue
-        if r.ok:
-            js = r.json()
-            if js.get("stat") == "OK" and js.get("data"):
-                fields: List[str] = js.get("fields", [])
-                rows: List[List[Any]] = js.get("data", [])
-                doc: Dict[str, Any] = {
-                    "date": _iso_date(date),
-                    "fields": fields,
-                    "rows": [
-                        {fields[idx]: row[idx] for idx in range(min(len(fields), len(row)))}
-                        for row in rows
-                    ],
-                }
-                return doc
-            return None
-        time.sleep(sleep_s)
+    js = _fetch_json(BFI82U_URL, bfi82u_params(date), date, retry, sleep_s, transport, "bfi82u")
+    if js is None:
+        return None
+    if js.get("stat") == "OK" and js.get("data"):
+        t0 = time.perf_counter()
+        fields: List[str] = js.get("fields", [])
+        rows: List[List[Any]] = js.get("data", [])
+        if (schema or get_schema()) == SCHEMA_TYPED:
+            rows = type_rows(fields, rows)
+        doc: Dict[str, Any] = {
+            "date": _iso_date(date),
+            "fields": fields,
+            "rows": row_records(fields, rows),
+        }
+        METRICS.observe("twse_parse_seconds", "bfi82u", time.perf_counter() - t0)
+        METRICS.observe("twse_rows", "bfi82u", len(doc["rows"]))
+        return doc
+    if on_no_data and js.get("stat") == NO_DATA_STAT:
+        on_no_data(date)
     return None
@@ -0,0 +1,207 @@
+"""
+Write-behind stage between fetchers and MongoDB.
+
+抓取端把整天的資料交給 `BulkWriter` 後立刻繼續抓下一天；背景 writer thread
+從有上限的佇列取出工作，合併成每批最多 `batch_size` 個操作的 `bulk_write`
+（不同日期的 BFI82U upsert 會併入同一批）。佇列滿時 `submit_*` 會阻塞，
+讓抓取端放慢速度（backpressure）。每個工作的 `on_done`（例如寫入 ingest
+ledger）只在該工作所屬的批次被 MongoDB 確認後才執行；`close()` 會等所有
+批次寫完才返回。
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from pymongo.write_concern import WriteConcern
+
+try:
+    from .config import get_layout
+    from .db import WriteCounts, bfi82u_op, get_collection, notify_write, plan_t86_rows, write_t86
+    from .layouts import LAYOUT_ROWS
+    from .metrics import METRICS
+except ImportError:
+    from config import get_layout
+    from db import WriteCounts, bfi82u_op, get_collection, notify_write, plan_t86_rows, write_t86
+    from layouts import LAYOUT_ROWS
+    from metrics import METRICS
+
+_STOP = object()
+DATASETS = ("t86", "bfi82u")
+
+
+class _Job(NamedTuple):
+    collection: str
+    ops: List[Any]
+    docs: Optional[List[Dict[str, Any]]]
+    on_done: Optional[Callable[[], Any]]
+    dates: Tuple[str, ...] = ()
+
+    @property
+    def size(self) -> int:
+        return len(self.docs) if self.docs is not None else len(self.ops)
+
+
+def parse_write_concern(w: str, journal: bool = True) -> WriteConcern:
+    """Build a WriteConcern from a `w` spec such as "1", "0" or "majority"."""
+    # w=0 is unacknowledged and cannot be combined with journaling
+    return WriteConcern(w=int(w) if w.isdigit() else w, j=(journal and w != "0") or None)
+
+
+class BulkWriter:
+    """
+    Background bulk writer for t86 / bfi82u.
+
+    `max_pending` bounds the number of queued jobs (one job = one day of one
+    dataset). A writer waits up to `linger` seconds for more jobs before
+    sending a batch that is smaller than `batch_size`. T86 rows are checked
+    against their stored content hashes on the writer thread, so unchanged
+    rows are never sent. In the wide or time-series layout T86 is written
+    per job with `write_t86`, since those layouts replace whole days.
+    Inserted / changed / skipped counts are kept per dataset.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        write_concern: Optional[WriteConcern] = None,
+        max_pending: int = 16,
+        threads: int = 1,
+        linger: float = 0.2,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.write_concern = write_concern
+        self.linger = linger
+        self.t86_layout = get_layout("t86")
+        self.errors: List[BaseException] = []
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_pending))
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {"jobs": 0, "batches": 0, "ops": 0, "blocked_s": 0.0}
+        self._counts = {name: WriteCounts() for name in DATASETS}
+        self._threads = [
+            threading.Thread(target=self._run, name=f"bulk-writer-{i}", daemon=True)
+            for i in range(max(1, threads))
+        ]
+        for t in self._threads:
+            t.start()
+
+    # -- producer side -----------------------------------------------------
+
+    def submit_t86(self, docs: Iterable[Dict[str, Any]], on_done: Optional[Callable[[], Any]] = None) -> None:
+        docs = list(docs)
+        self._put(_Job("t86", [], docs, on_done, tuple({d["date"] for d in docs})))
+
+    def submit_bfi82u(self, doc: Dict[str, Any], on_done: Optional[Callable[[], Any]] = None) -> None:
+        self._put(_Job("bfi82u", [bfi82u_op(doc)], None, on_done, (doc["date"],)))
+
+    def _put(self, job: _Job) -> None:
+        t0 = time.perf_counter()
+        self._queue.put(job)
+        waited = time.perf_counter() - t0
+        with self._lock:
+            self._stats["jobs"] += 1
+            self._stats["blocked_s"] += waited
+
+    def flush(self) -> None:
+        """Block until every submitted job has been written (or failed)."""
+        self._queue.join()
+
+    def close(self) -> Dict[str, Any]:
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, **{name: c._asdict() for name, c in self._counts.items()},
+                    "errors": len(self.errors)}
+
+    # -- writer side -------------------------------------------------------
+
+    def _run(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is _STOP:
+                self._queue.task_done()
+                return
+            batch = [job]
+            stop = self._gather(batch)
+            try:
+                self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if stop:
+                self._queue.task_done()
+                return
+
+    def _gather(self, batch: List[_Job]) -> bool:
+        """Pull more queued jobs into `batch` until it is full or the queue stays idle."""
+        size = batch[0].size
+        deadline = time.monotonic() + self.linger
+        while size < self.batch_size:
+            try:
+                nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                return False
+            if nxt is _STOP:
+                return True
+            batch.append(nxt)
+            size += nxt.size
+        return False
+
+    def _collection(self, name: str):
+        coll = get_collection(name)
+        return coll.with_options(write_concern=self.write_concern) if self.write_concern else coll
+
+    def _write(self, batch: List[_Job]) -> None:
+        for name in DATASETS:
+            jobs = [j for j in batch if j.collection == name]
+            if not jobs:
+                continue
+            t0 = time.perf_counter()
+            try:
+                ops = [op for j in jobs for op in j.ops]
+                docs = [d for j in jobs if j.docs is not None for d in j.docs]
+                if docs and self.t86_layout == LAYOUT_ROWS:
+                    planned, counts = plan_t86_rows(name, docs)
+                    ops.extend(planned)
+                    self._count(name, WriteCounts(skipped=counts.skipped))
+                elif docs:
+                    self._count(name, write_t86(docs, name, self.t86_layout, self.write_concern))
+                for i in range(0, len(ops), self.batch_size):
+                    self._bulk(name, ops[i:i + self.batch_size])
+                METRICS.observe("twse_mongo_write_seconds", name, time.perf_counter() - t0)
+            except Exception as e:
+                print(f"[WRITE] {name} 批次寫入失敗：{e}")
+                self.errors.append(e)
+                continue
+            if ops:
+                notify_write(name, (d for j in jobs for d in j.dates))
+            for j in jobs:
+                if j.on_done is None:
+                    continue
+                try:
+                    j.on_done()
+                except Exception as e:
+                    print(f"[WRITE] {name} 寫入後處理失敗：{e}")
+                    self.errors.append(e)
+
+    def _count(self, name: str, counts: WriteCounts) -> None:
+        with self._lock:
+            self._counts[name] = WriteCounts(*(a + b for a, b in zip(self._counts[name], counts)))
+
+    def _bulk(self, name: str, ops: List[Any]) -> None:
+        res = self._collection(name).bulk_write(ops, ordered=False)
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["ops"] += len(ops)
+        if res.acknowledged:
+            # a $set that matches the stored document is a no-op on the server
+            self._count(name, WriteCounts(res.upserted_count or 0, res.modified_count or 0,
+                                          (res.matched_count or 0) - (res.modified_count or 0)))